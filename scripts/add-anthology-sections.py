@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 """
-Add section metadata to anthology volumes.
-This script adds explicit section boundaries to anthology .meta.yaml files.
+Hand-curated section metadata for anthology volumes.
+metadata_compiler.py merges these explicit section boundaries into the
+anthology .meta.yaml files; running this script runs the compiler.
 """
 
-import yaml
+import sys
 from pathlib import Path
-from datetime import date
 
 # Define sections for each anthology volume
 # Format: {volume_id: [{author, title, start_marker, notes}, ...]}
@@ -48,43 +48,20 @@ ANTHOLOGY_SECTIONS = {
         {"author": "Justin Martyr", "title": "Fragments on the Resurrection",
          "start_marker": "Fragments of the Lost Work of Justin on the Resurrection"},
         {"author": "Irenaeus", "title": "Fragments from Lost Writings",
-         "start_marker": "Fragments from the Lost Writings of IrenÃ¦us"},
+         "start_marker": "Fragments from the Lost Writings of IrenÃ¦us",
+         # Not in the earlier temporal pass, so its fields are declared here
+         "composition_year": 180, "composition_uncertainty": "high",
+         "author_region": "Western", "author_location": "Lyon"},
     ],
 
     # I'll add more volumes as needed - this demonstrates the pattern
 }
 
-def add_sections_to_metadata(volume_id: str, sections: list):
-    """Add section metadata to a volume's .meta.yaml file."""
-    meta_path = Path(f"sources/{volume_id}.meta.yaml")
-
-    if not meta_path.exists():
-        print(f"⚠ Skipping {volume_id} - metadata file not found")
-        return False
-
-    # Load existing metadata
-    with open(meta_path, 'r', encoding='utf-8') as f:
-        metadata = yaml.safe_load(f)
-
-    # Add anthology flag and sections
-    metadata['text_info']['is_anthology'] = True
-    metadata['text_info']['sections'] = sections
-
-    # Save updated metadata
-    with open(meta_path, 'w', encoding='utf-8') as f:
-        yaml.dump(metadata, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
-
-    print(f"✓ Added {len(sections)} sections to {volume_id}")
-    return True
-
 def main():
-    """Process all anthology volumes."""
-    print("Adding section metadata to anthology volumes...\n")
-
-    for volume_id, sections in ANTHOLOGY_SECTIONS.items():
-        add_sections_to_metadata(volume_id, sections)
-
-    print(f"\n✅ Processed {len(ANTHOLOGY_SECTIONS)} anthology volumes")
+    """Compile all metadata files."""
+    sys.path.append(str(Path(__file__).parent))
+    from metadata_compiler import main as compile_metadata
+    compile_metadata()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Separate footnotes and apparatus from the body text of CCEL volumes.
+
+One streaming pass over a volume's lines splits it into body text and a
+parallel stream of annotations:
+
+    note_ref   inline footnote markers: "[12]"
+    scripture  bracketed or parenthesized references: "(Matt. v. 3)", "[John 3:16; Rom 5:1]"
+    url        http(s) links
+    page       page lines ("Page 12", "p. 12") and inline "[pg 12]" markers
+    heading    "Footnotes" headings
+    footnote   notes of a footnote block ("12. ..." or "[12] ...") with
+               their continuation lines and paragraphs; the block runs
+               from the heading to the next chapter or heading line
+
+Each annotation keeps the exact bytes removed, their offset in the source
+and the body offset they were removed at, so the body plus its
+annotations restores the source byte for byte (see `verify`).
+
+`build` writes build/apparatus/<ID>.body.txt and <ID>.notes.bin: the
+annotation kinds and offsets as uint32 arrays followed by the removed
+bytes, memory-mapped by Apparatus. A volume is rebuilt only when the
+sha256 of its text or SPLIT_VERSION changes. `embedding_cache.py ingest
+--body-only` embeds body text while keeping chunk offsets in source
+coordinates, so Apparatus.notes(start_offset, end_offset) re-attaches a
+chunk's notes for display.
+
+Usage:
+    python scripts/apparatus.py build                  # all manifest texts
+    python scripts/apparatus.py build anf-01 --force
+    python scripts/apparatus.py notes anf-01 --range 120000:124000
+    python scripts/apparatus.py verify anf-01
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import io
+import json
+import mmap
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing, iter_raw_lines
+from instrumentation import span, add_profile_arguments, profile_session
+from sentence_index import BOOK_ABBREVIATIONS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NOTES_MAGIC = b"IGNOTES1"
+SPLIT_VERSION = 2  # 2: scripture books from BOOK_NAMES, footnote blocks end at headings
+DEFAULT_OUTPUT_DIR = Path("build/apparatus")
+KINDS = ("note_ref", "scripture", "url", "page", "heading", "footnote")
+KIND_NUMBER = {kind: number for number, kind in enumerate(KINDS)}
+
+
+def _load_script(name, filename):
+    # Hyphenated file names cannot be imported by module name
+    spec = importlib.util.spec_from_file_location(name, Path(__file__).parent / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+KJV_BOOKS = _load_script("generate_bible_metadata", "generate-bible-metadata.py").KJV_BOOKS
+
+# Book names a reference may start with: KJV titles without their number
+# ("1 Samuel" -> "Samuel"), the Apocrypha and the abbreviations
+BOOK_NAMES = sorted(
+    {book["title"].lstrip("123 ") for book in KJV_BOOKS}
+    | {"Psalm", "Tobit", "Judith", "Wisdom", "Sirach", "Ecclesiasticus", "Baruch", "Maccabees", "Apoc"}
+    | {word.decode('ascii').capitalize() for word in BOOK_ABBREVIATIONS},
+    key=len, reverse=True)
+_BOOK = rb'(?:' + rb'|'.join(re.escape(name.encode('ascii')) for name in BOOK_NAMES) + rb')'
+
+# "Matt. v. 3", "John 3:16", "1 Cor. xiii. 4-7", "Ps. xxii. 1"
+_REFERENCE = rb'(?:cf\.\s*|see\s+)?(?:[1-3]|I{1,3})?\s?' + _BOOK + rb'\.?\s+(?:\d{1,3}|[ivxlc]{1,8})[.:,]\s?\d{1,3}' \
+             rb'(?:\s?(?:-|\xe2\x80\x93)\s?\d{1,3})?\.?'
+INLINE_PATTERN = re.compile(
+    rb' ?(?:(?P<note_ref>\[\d{1,4}\])'
+    rb'|(?P<page>\[(?i:pg|p\.|page)\s*\d{1,4}\])'
+    rb'|(?P<url><?https?://[^\s\]>)]+>?)'
+    rb'|(?P<scripture>\[' + _REFERENCE + rb'(?:[;,]\s*' + _REFERENCE + rb')*\]'
+    rb'|\(' + _REFERENCE + rb'(?:[;,]\s*' + _REFERENCE + rb')*\)))'
+)
+PAGE_LINE = re.compile(rb'^\s*(?i:page|p\.|pg\.?)\s*(?:\d{1,4}|[ivxlc]{1,8})\s*$')
+NOTES_HEADING = re.compile(rb'^\s*(?i:footnotes)\s*:?\s*$')
+NOTE_START = re.compile(rb'^\s*(?:\[\d{1,4}\]|\d{1,4}\.)\s')
+# Lines that close a footnote block: "Chapter IV.", "Book 2", "XII." and
+# all-capital headings
+NOTES_END = re.compile(
+    rb'^\s*(?:(?i:chapter|chap\.|book|part|section|epistle|letter|homily|sermon|canon)\s+(?:\d{1,4}|[ivxlc]{1,8})\b.*'
+    rb'|[IVXLC]{1,8}\.?|[A-Z][A-Z\d ,;:\'.\-]{3,})\s*$'
+)
+NOTE_LABEL = re.compile(r'^(?:\[\d{1,4}\]|\d{1,4}\.)\s')
+
+
+def _blank(line):
+    return not line.strip()
+
+
+def split_lines(lines, body):
+    """
+    Stream raw lines, writing body bytes to the binary file body and
+    yielding (kind, body offset, source offset, removed bytes) tuples in
+    source order.
+    """
+    body_offset = source_offset = 0
+    tail = b"\n\n"  # last two body bytes; the start of a text counts as a blank line
+    note = None  # footnote being extended by continuation lines
+    blanks = []  # blank lines inside a footnote block, not yet assigned
+    in_notes = False
+    squeeze = None  # removed page line that may take the blank line after it
+
+    def emit(data):
+        nonlocal body_offset, tail
+        body.write(data)
+        body_offset += len(data)
+        tail = (tail + data)[-2:]
+
+    for line in lines:
+        line_offset = source_offset
+        source_offset += len(line)
+
+        if squeeze is not None:
+            if _blank(line) and tail == b"\n\n":
+                squeeze[3] += line
+                continue
+            yield tuple(squeeze)
+            squeeze = None
+
+        if in_notes:
+            if _blank(line):
+                blanks.append(line)
+                continue
+            closes = NOTES_END.match(line) or NOTES_HEADING.match(line)
+            if not closes and NOTE_START.match(line):
+                if note:
+                    yield tuple(note)
+                gap = b"".join(blanks)
+                note = ["footnote", body_offset, line_offset - len(gap), gap + line]
+                blanks = []
+                continue
+            if not closes and note:
+                # A continuation line or a further paragraph of the note
+                note[3] += b"".join(blanks) + line
+                blanks = []
+                continue
+            # Body text again: the block's trailing blank lines stay in the body
+            if note:
+                yield tuple(note)
+            note = None
+            in_notes = False
+            for blank in blanks:
+                emit(blank)
+            blanks = []
+
+        if NOTES_HEADING.match(line):
+            in_notes = True
+            yield ("heading", body_offset, line_offset, line)
+            continue
+        if PAGE_LINE.match(line):
+            squeeze = ["page", body_offset, line_offset, line]
+            continue
+
+        position = 0
+        for match in INLINE_PATTERN.finditer(line):
+            emit(line[position:match.start()])
+            yield (match.lastgroup, body_offset, line_offset + match.start(), match.group())
+            position = match.end()
+        emit(line[position:])
+
+    if squeeze is not None:
+        yield tuple(squeeze)
+    if note:
+        yield tuple(note)
+    for blank in blanks:
+        emit(blank)
+
+
+class Apparatus:
+    """
+    Annotations of one text, from a notes file written by write_apparatus()
+    or from a list of split_lines() tuples.
+    """
+
+    def __init__(self, kinds, body_offsets, source_offsets, raw_offsets, raw, header=None):
+        self.kinds = kinds
+        self.body_offsets = body_offsets
+        self.source_offsets = source_offsets
+        self.raw_offsets = raw_offsets
+        self.raw = raw
+        self.header = header or {}
+        self._file = self._mmap = None
+
+    @classmethod
+    def from_annotations(cls, annotations, header=None):
+        kinds, body_offsets, source_offsets = array('I'), array('I'), array('I')
+        raw_offsets, raw = array('I', [0]), bytearray()
+        for kind, body_offset, source_offset, removed in annotations:
+            kinds.append(KIND_NUMBER[kind])
+            body_offsets.append(body_offset)
+            source_offsets.append(source_offset)
+            raw += removed
+            raw_offsets.append(len(raw))
+        return cls(kinds, body_offsets, source_offsets, raw_offsets, bytes(raw), header)
+
+    @classmethod
+    def open(cls, path):
+        source_file = open(path, 'rb')
+        source_map = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if source_map[:len(NOTES_MAGIC)] != NOTES_MAGIC:
+            raise ValueError(f"Not an apparatus notes file: {path}")
+        pos = len(NOTES_MAGIC)
+        header_len, count = struct.unpack_from('<QQ', source_map, pos)
+        pos += 16
+        header = json.loads(source_map[pos:pos + header_len].decode('utf-8'))
+        pos += header_len
+        view = memoryview(source_map)
+        arrays = []
+        for length in (count, count, count, count + 1):
+            arrays.append(view[pos:pos + length * 4].cast('I'))
+            pos += length * 4
+        apparatus = cls(*arrays, view[pos:], header)
+        apparatus._file, apparatus._mmap = source_file, source_map
+        return apparatus
+
+    def close(self):
+        if self._mmap is not None:
+            for view in (self.kinds, self.body_offsets, self.source_offsets, self.raw_offsets, self.raw):
+                view.release()
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def removed(self, i):
+        return bytes(self.raw[self.raw_offsets[i]:self.raw_offsets[i + 1]])
+
+    def annotation(self, i):
+        kind = KINDS[self.kinds[i]]
+        text = ' '.join(self.removed(i).decode('utf-8', errors='replace').split())
+        if kind == "footnote":
+            text = NOTE_LABEL.sub('', text)
+        elif kind != "heading":
+            text = text.strip("[]()<>")
+        return {"kind": kind, "body_offset": self.body_offsets[i], "source_offset": self.source_offsets[i],
+                "text": text}
+
+    def source_offset(self, body_offset):
+        """Map a body offset to the source offset of the same byte."""
+        i = bisect_right(self.body_offsets, body_offset) - 1
+        if i < 0:
+            return body_offset
+        removed_so_far = self.source_offsets[i] + self.raw_offsets[i + 1] - self.raw_offsets[i] - self.body_offsets[i]
+        return body_offset + removed_so_far
+
+    def notes(self, start, end):
+        """Annotations whose source bytes start within [start, end)."""
+        first = bisect_left(self.source_offsets, start)
+        last = bisect_left(self.source_offsets, end)
+        return [self.annotation(i) for i in range(first, last)]
+
+    def counts(self):
+        return Counter(KINDS[kind] for kind in self.kinds)
+
+    def restore(self, body):
+        """Reinsert every annotation into body; returns the source bytes."""
+        parts = []
+        position = 0
+        for i in range(len(self)):
+            parts.append(body[position:self.body_offsets[i]])
+            parts.append(self.removed(i))
+            position = self.body_offsets[i]
+        parts.append(body[position:])
+        return b"".join(parts)
+
+
+def split_text(data):
+    """Split source bytes in memory; return (body bytes, Apparatus)."""
+    body = io.BytesIO()
+    annotations = list(split_lines(iter_raw_lines(io.BytesIO(data)), body))
+    return body.getvalue(), Apparatus.from_annotations(annotations)
+
+
+def output_paths(output_dir, entry):
+    stem = Path(entry["file"]).stem
+    return output_dir / f"{stem}.body.txt", output_dir / f"{stem}.notes.bin"
+
+
+def source_sha256(files, path):
+    """sha256 of a text; taken from its LFS pointer when it has one."""
+    pointer = files.pointer(path)
+    if pointer is not None:
+        return pointer.oid
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_apparatus(files, entry, body_path, notes_path, sha256):
+    """Split one text into body_path and notes_path; return the Apparatus header."""
+    digest = hashlib.sha256()
+    tmp_body = body_path.with_name(body_path.name + ".tmp")
+    with files.open_binary(entry["file"]) as src, open(tmp_body, 'wb') as body:
+        annotations = list(split_lines(iter_raw_lines(src), body))
+        body_size = body.tell()
+    with open(tmp_body, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    apparatus = Apparatus.from_annotations(annotations)
+    header = json.dumps({
+        "text_id": entry["id"],
+        "version": SPLIT_VERSION,
+        "source_sha256": sha256,
+        "source_size": body_size + len(apparatus.raw),
+        "body_sha256": digest.hexdigest(),
+        "body_size": body_size,
+        "kinds": list(KINDS),
+    }).encode('utf-8')
+    header += b" " * (-len(header) % 4)
+
+    tmp_notes = notes_path.with_name(notes_path.name + ".tmp")
+    with open(tmp_notes, 'wb') as out:
+        out.write(NOTES_MAGIC)
+        out.write(struct.pack('<QQ', len(header), len(apparatus)))
+        out.write(header)
+        for values in (apparatus.kinds, apparatus.body_offsets, apparatus.source_offsets, apparatus.raw_offsets):
+            out.write(values.tobytes())
+        out.write(apparatus.raw)
+    tmp_body.replace(body_path)
+    tmp_notes.replace(notes_path)
+    apparatus.header = json.loads(header)
+    return apparatus
+
+
+def manifest_entries(corpus_root, text_ids=None):
+    with open(Path(corpus_root) / "manifest.yaml", 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f)
+    for entry in manifest.get("texts", []):
+        if "file" in entry and (not text_ids or entry["id"] in text_ids):
+            yield entry
+
+
+def build(corpus_root=".", text_ids=None, output_dir=None, force=False):
+    """Split every requested text whose notes file is missing or stale."""
+    corpus_root = Path(corpus_root)
+    files = CorpusFiles(corpus_root)
+    output_dir = corpus_root / (output_dir or DEFAULT_OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    built = 0
+    for entry in manifest_entries(corpus_root, text_ids):
+        path = corpus_root / entry["file"]
+        if not path.exists():
+            continue
+        body_path, notes_path = output_paths(output_dir, entry)
+        sha256 = source_sha256(files, path)
+        if not force and body_path.exists() and notes_path.exists():
+            with Apparatus.open(notes_path) as current:
+                if (current.header.get("source_sha256") == sha256
+                        and current.header.get("version") == SPLIT_VERSION):
+                    continue
+        try:
+            with span("apparatus.split", bytes=path.stat().st_size) as s:
+                apparatus = write_apparatus(files, entry, body_path, notes_path, sha256)
+                s.add(lines=len(apparatus))
+        except LfsObjectMissing as e:
+            logger.warning(f"{entry['id']}: skipped ({e})")
+            continue
+        header = apparatus.header
+        removed = header["source_size"] - header["body_size"]
+        counts = ", ".join(f"{n} {kind}" for kind, n in apparatus.counts().most_common())
+        logger.info(f"{entry['id']}: {len(apparatus)} annotations ({counts or 'none'}); "
+                    f"{removed / max(header['source_size'], 1):.1%} of the text moved out of the body")
+        built += 1
+    logger.info(f"Split {built} texts into {output_dir}")
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split texts into body and annotation streams")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_DIR), help="Body and notes directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Split texts whose notes are missing or stale")
+    build_parser.add_argument("ids", nargs="*", help="Text ids (default: all)")
+    build_parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    add_profile_arguments(build_parser)
+
+    notes_parser = subparsers.add_parser("notes", help="Print the annotations in a source byte range")
+    notes_parser.add_argument("id", help="Text id")
+    notes_parser.add_argument("--range", help="START:END source byte offsets (default: whole text)")
+
+    verify_parser = subparsers.add_parser("verify", help="Check that body plus notes restores each text")
+    verify_parser.add_argument("ids", nargs="*", help="Text ids (default: all)")
+
+    args = parser.parse_args()
+    corpus_root = Path(args.corpus_root)
+    output_dir = corpus_root / args.output_dir
+
+    if args.command == "build":
+        with profile_session(args):
+            build(corpus_root, args.ids, args.output_dir, args.force)
+        return
+
+    entries = list(manifest_entries(corpus_root, [args.id] if args.command == "notes" else args.ids))
+    if not entries:
+        logger.error("No matching texts in the manifest")
+        sys.exit(1)
+
+    if args.command == "notes":
+        _, notes_path = output_paths(output_dir, entries[0])
+        if not notes_path.exists():
+            logger.error(f"No notes for {args.id}; run 'build' first")
+            sys.exit(1)
+        with Apparatus.open(notes_path) as apparatus:
+            start, _, end = (args.range or f"0:{apparatus.header['source_size']}").partition(":")
+            for note in apparatus.notes(int(start), int(end)):
+                print(f"{note['source_offset']:>10}  {note['kind']:<9}  {note['text']}")
+        return
+
+    files = CorpusFiles(corpus_root)
+    failed = 0
+    for entry in entries:
+        body_path, notes_path = output_paths(output_dir, entry)
+        if not notes_path.exists():
+            continue
+        try:
+            source = files.read_bytes(entry["file"])
+        except (LfsObjectMissing, FileNotFoundError) as e:
+            logger.warning(f"{entry['id']}: skipped ({e})")
+            continue
+        with Apparatus.open(notes_path) as apparatus:
+            restored = apparatus.restore(body_path.read_bytes())
+        if restored == source:
+            logger.info(f"{entry['id']}: OK")
+        else:
+            failed += 1
+            logger.error(f"{entry['id']}: body and notes do not restore the text (stale? run 'build')")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
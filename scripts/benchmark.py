@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the corpus scripts.
+
+Generates a deterministic synthetic corpus (see synthetic_corpus.py), times
+the hot paths of the existing scripts against it and writes the results to
+JSON so runs on different commits can be compared.
+
+Usage:
+    python scripts/benchmark.py                          # all benchmarks
+    python scripts/benchmark.py clean_text manifest_load # selected benchmarks
+    python scripts/benchmark.py --volume-kb 4096 --repeat 5
+    python scripts/benchmark.py --compare build/benchmarks/<old>.json
+    python scripts/benchmark.py --list
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from instrumentation import PROFILER
+from synthetic_corpus import generate_corpus, LXX_CSV
+
+SCRIPTS_DIR = Path(__file__).parent
+DEFAULT_OUTPUT_DIR = Path("build/benchmarks")
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = {}
+
+# Extra per-benchmark fields recorded during setup (e.g. import times)
+EXTRAS = {}
+
+# Modules whose presence at startup means a command paid for an import it may not need
+HEAVY_MODULES = ("yaml", "requests", "numpy")
+
+
+def benchmark(name):
+    """Register a benchmark. The function receives the corpus root and returns a callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def load_script(filename):
+    """Import a script from scripts/ by file name (most have hyphenated names)."""
+    module_name = Path(filename).stem.replace('-', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence script output (print and INFO logging) while timing."""
+    level = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(level)
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def corpus_volumes(root):
+    return sorted((Path(root) / "sources").glob("SYN-[0-9]*.txt"))
+
+
+@benchmark("clean_text")
+def bench_clean_text(root):
+    clean = load_script("clean.py")
+    cleaner = clean.TextCleaner(root)
+    text = corpus_volumes(root)[0].read_text(encoding='utf-8')
+    return lambda: cleaner.clean_text(text, aggressive=True)
+
+
+@benchmark("validate_corpus_integrity")
+def bench_validate(root):
+    validate = load_script("validate.py")
+
+    def run():
+        validate.CorpusValidator(root).validate_corpus_integrity()
+    return run
+
+
+@benchmark("strip_markup")
+def bench_strip_markup(root):
+    consolidate = load_script("consolidate-lxx.py")
+    with open(Path(root) / LXX_CSV, 'r', encoding='utf-8') as f:
+        rows = [line.rstrip('\n').split('\t')[3] for line in f]
+
+    def run():
+        for text in rows:
+            consolidate.strip_markup(text)
+    return run
+
+
+@benchmark("consolidate_lxx")
+def bench_consolidate_lxx(root):
+    consolidate = load_script("consolidate-lxx.py")
+
+    def run():
+        with working_directory(root):
+            consolidate.consolidate_lxx()
+    return run
+
+
+@benchmark("find_major_sections")
+def bench_find_major_sections(root):
+    sections = load_script("generate-anthology-sections-full.py")
+    volume = corpus_volumes(root)[0]
+    return lambda: sections.find_major_sections(volume)
+
+
+@benchmark("manifest_load")
+def bench_manifest_load(root):
+    manifest_path = Path(root) / "manifest.yaml"
+
+    def run():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = yaml.safe_load(f)
+        for text_entry in manifest["texts"]:
+            if "metadata" in text_entry:
+                with open(Path(root) / text_entry["metadata"], 'r', encoding='utf-8') as f:
+                    yaml.safe_load(f)
+    return run
+
+
+def import_profile(argv, cwd):
+    """
+    Run a command under `python -X importtime` and return the summed
+    cumulative import time of top-level imports and which heavy modules loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + argv, cwd=cwd,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit():
+            continue  # header row
+        modules.add(name)
+        # Nested imports are indented; only top-level ones add to the total
+        if not line.split("|")[2].startswith("  "):
+            total_us += int(cumulative)
+    return {
+        "import_ms": round(total_us / 1000, 2),
+        "heavy_imports": [m for m in HEAVY_MODULES if m in modules],
+    }
+
+
+def cli_benchmark(name, *command):
+    """Register a benchmark that times one `ignaria` invocation in a fresh interpreter."""
+    def setup(root):
+        argv = [str(SCRIPTS_DIR / "ignaria.py")] + list(command)
+        EXTRAS[name] = import_profile(argv, root)
+
+        def run():
+            subprocess.run([sys.executable] + argv, cwd=root,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return run
+    BENCHMARKS[name] = setup
+
+
+cli_benchmark("cli_help", "--help")
+cli_benchmark("cli_validate_help", "validate", "--help")
+cli_benchmark("cli_download_list_sources", "download", "--list-sources")
+
+
+def time_benchmark(run, repeat, warmup=1):
+    """Return per-run wall times in seconds."""
+    with quiet():
+        for _ in range(warmup):
+            run()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=SCRIPTS_DIR,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def stage_breakdown(run):
+    """Run once with instrumentation enabled and return the per-stage report."""
+    PROFILER.reset()
+    PROFILER.enable()
+    try:
+        with quiet():
+            run()
+    finally:
+        PROFILER.disable()
+    return PROFILER.report()["stages"]
+
+
+def run_benchmarks(names, corpus_root, repeat):
+    results = {}
+    for name in names:
+        logger.info(f"Running {name}...")
+        with quiet():
+            run = BENCHMARKS[name](corpus_root)
+        timings = time_benchmark(run, repeat)
+        results[name] = {
+            "runs": len(timings),
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+            "max": max(timings),
+            "stages": stage_breakdown(run),
+        }
+        results[name].update(EXTRAS.get(name, {}))
+        logger.info(f"  {name}: median {results[name]['median'] * 1000:.1f} ms")
+    return results
+
+
+def compare(current, baseline_path):
+    """Print median time ratios against an earlier results file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {(baseline.get('commit') or 'unknown')[:12]} ({baseline_path}):")
+    print(f"  {'benchmark':<28} {'before':>10} {'after':>10} {'ratio':>7}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:<28} {'-':>10} {result['median'] * 1000:>8.1f}ms {'new':>7}")
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else float('inf')
+        print(f"  {name:<28} {before['median'] * 1000:>8.1f}ms "
+              f"{result['median'] * 1000:>8.1f}ms {ratio:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark corpus scripts on a synthetic corpus")
+    parser.add_argument("benchmarks", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    parser.add_argument("--corpus", help="Use an existing synthetic corpus instead of generating one")
+    parser.add_argument("--volumes", type=int, default=4, help="Synthetic English volumes")
+    parser.add_argument("--volume-kb", type=int, default=512, help="Approximate size of each volume")
+    parser.add_argument("--greek-verses", type=int, default=8000, help="Synthetic Greek verses")
+    parser.add_argument("--lxx-verses", type=int, default=10000, help="Synthetic LXX CSV rows")
+    parser.add_argument("--seed", type=int, default=1, help="Synthetic corpus seed")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument("--output", help="Results JSON (default: build/benchmarks/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+
+    args = parser.parse_args()
+
+    if args.list:
+        for name in BENCHMARKS:
+            print(name)
+        return
+
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+    corpus_params = {
+        "volumes": args.volumes,
+        "volume_kb": args.volume_kb,
+        "greek_verses": args.greek_verses,
+        "lxx_verses": args.lxx_verses,
+        "seed": args.seed,
+    }
+
+    with tempfile.TemporaryDirectory(prefix="ignaria-bench-") as tmp:
+        corpus_root = Path(args.corpus) if args.corpus else Path(tmp)
+        if not args.corpus:
+            logger.info(f"Generating synthetic corpus in {corpus_root}...")
+            generate_corpus(corpus_root, **corpus_params)
+        results = run_benchmarks(names, corpus_root.resolve(), args.repeat)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": None if args.corpus else corpus_params,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"{(commit or 'local')[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Betacode to Unicode Greek transcoder.
+
+Replaces the sed chains of the LXX sources
+(sources/LXX-Rahlfs-1935/script/betacode2unicode_accented.sh and
+betacode2unicode_unaccented.sh). Those scripts run every rule over every
+line in order; here the rules are a table of Betacode sequences (a letter,
+optionally capitalized with `*`, plus breathing, accent, diaeresis and iota
+subscript marks) built by Unicode composition. The table is stored as a
+trie, and the trie is compiled into a single regular expression whose
+alternatives follow the trie's branches, longest first. Converting a line
+is one left-to-right re.sub pass.
+
+Compared with the sed scripts:
+
+- lowercase Betacode (the MLJS_gloss.xml keys, "a)a/atos") is accepted
+- capital marks may precede the letter ("*)a", standard Betacode), follow
+  it ("*A)", as in the CCAT LXX files) or both ("*(/a|"), and marks may
+  come in any order
+- `S` becomes final sigma before anything that is not a letter, not only
+  before a space, tab, colon or end of line
+- *W)\\ is Ὢ; the sed script maps it to Ὤ
+
+`verify` runs the sed script on the same input and classifies every line
+that differs, so the table can be checked against any Betacode file or a
+stream of random Betacode words. Lines are compared word by word; where
+sed left Betacode marks unconverted, only those marks and the letters
+next to them are masked, and the rest of the word must still agree.
+
+Usage:
+    python scripts/betacode.py convert words.txt -o words.unicode.txt
+    python scripts/betacode.py convert MLJS_gloss.xml --column 1 --unaccented
+    python scripts/betacode.py verify MLJS_gloss.xml --column 1
+    python scripts/betacode.py verify --random 100000 --seed 1
+
+Library use:
+    from betacode import transcode
+    transcode("a)/bussos")          # 'ἄβυσσος'
+"""
+
+import argparse
+import itertools
+import random
+import re
+import subprocess
+import sys
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+import logging
+
+sys.path.append(str(Path(__file__).parent))
+from instrumentation import span, add_profile_arguments, profile_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SED_SCRIPTS = {
+    True: Path("sources/LXX-Rahlfs-1935/script/betacode2unicode_accented.sh"),
+    False: Path("sources/LXX-Rahlfs-1935/script/betacode2unicode_unaccented.sh"),
+}
+
+LETTERS = {
+    'A': 'α', 'B': 'β', 'G': 'γ', 'D': 'δ', 'E': 'ε', 'V': 'ϛ', 'Z': 'ζ', 'H': 'η',
+    'Q': 'θ', 'I': 'ι', 'K': 'κ', 'L': 'λ', 'M': 'μ', 'N': 'ν', 'C': 'ξ', 'O': 'ο',
+    'P': 'π', 'R': 'ρ', 'S': 'σ', 'J': 'ς', 'T': 'τ', 'U': 'υ', 'F': 'φ', 'X': 'χ',
+    'Y': 'ψ', 'W': 'ω',
+}
+# Mark -> combining character, grouped by slot in the canonical sequence
+BREATHINGS = {')': '̓', '(': '̔'}
+DIAERESIS = {'+': '̈'}
+ACCENTS = {'/': '́', '\\': '̀', '=': '͂'}
+IOTA_SUBSCRIPT = {'|': 'ͅ'}
+MARKS = {**BREATHINGS, **DIAERESIS, **ACCENTS, **IOTA_SUBSCRIPT}
+SYMBOLS = {
+    True: {'#3': 'ϟ', '#5': 'ϡ', ':': '·', '-': '—', '#': '᾿', "'": '᾿'},
+    False: {'#3': 'ϟ', '#5': 'ϡ', ':': '·', '-': '—', '#': '', "'": ''},
+}
+MARK_PATTERN = re.compile("[" + re.escape("".join(MARKS)) + "]")
+# Only ASCII letters fold; Greek already in the input is left alone
+ASCII_UPPER = str.maketrans("abcdefghijklmnopqrstuvwxyz", "ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+NOT_FINAL = frozenset(LETTERS) | {'*'}
+SED_ERRATA = str.maketrans({'Ὢ': 'Ὤ'})  # betacode2unicode_accented.sh: *W)\ -> Ὤ
+# Marks sed left in its output, with the letters they belong to
+SED_LEFTOVER = re.compile(r"\w?[*()/\\=|+]+\w?")
+TERMINAL = ""
+
+
+def _mark_sets():
+    """Every combination of at most one mark per slot, in canonical order."""
+    slots = [BREATHINGS, DIAERESIS, ACCENTS, IOTA_SUBSCRIPT]
+    for choice in itertools.product(*[[None, *slot] for slot in slots]):
+        marks = [mark for mark in choice if mark]
+        if marks:
+            yield marks
+
+
+@lru_cache(maxsize=None)
+def table(accents=True):
+    """Return {Betacode sequence: Unicode} for every letter/mark sequence and symbol."""
+    entries = dict(SYMBOLS[accents])
+    for key, letter in LETTERS.items():
+        capital = letter.upper() if key != 'J' else None
+        entries[key] = letter
+        if capital:
+            entries['*' + key] = capital
+        if not accents:
+            continue  # marks are stripped before lookup
+        for marks in _mark_sets():
+            combining = "".join(MARKS[mark] for mark in marks)
+            for base, prefix_forms in ((letter, False), (capital, True)):
+                if base is None:
+                    continue
+                composed = unicodedata.normalize('NFC', base + combining)
+                if len(composed) != 1:
+                    continue  # no precomposed character, e.g. a diaeresis on alpha
+                for order in itertools.permutations(marks):
+                    order = "".join(order)
+                    if not prefix_forms:
+                        entries[key + order] = composed
+                        continue
+                    # Capital marks may sit on either side of the letter ("*(/A|")
+                    for split in range(len(order) + 1):
+                        entries['*' + order[:split] + key + order[split:]] = composed
+    return entries
+
+
+def build_trie(entries):
+    """Nested dicts keyed by character; TERMINAL marks the end of a sequence."""
+    trie = {}
+    for sequence in entries:
+        node = trie
+        for char in sequence:
+            node = node.setdefault(char, {})
+        node[TERMINAL] = sequence
+    return trie
+
+
+def trie_pattern(node):
+    """Regular expression for a trie node; deeper branches are tried first."""
+    branches = [re.escape(char) + trie_pattern(child)
+                for char, child in sorted(node.items()) if char != TERMINAL]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if TERMINAL in node:
+        return ("(?:" + body + ")" if len(branches) == 1 and len(body) > 1 else body) + "?"
+    return body
+
+
+@lru_cache(maxsize=None)
+def compiled(accents=True):
+    entries = table(accents)
+    pattern = re.compile(trie_pattern(build_trie(entries)))
+    return pattern, entries
+
+
+def transcode(text, accents=True):
+    """Convert Betacode (either case) to NFC Unicode Greek in one pass."""
+    pattern, entries = compiled(accents)
+    text = text.translate(ASCII_UPPER)
+    if not accents:
+        text = MARK_PATTERN.sub("", text)
+
+    def replace(match):
+        sequence = match.group()
+        if sequence == 'S':
+            end = match.end()
+            if end == len(text) or text[end] not in NOT_FINAL:
+                return 'ς'
+        return entries[sequence]
+
+    return pattern.sub(replace, text)
+
+
+def transcode_field(line, accents=True, column=None):
+    """Convert a whole line, or only its tab-separated column (1-based)."""
+    if column is None:
+        return transcode(line, accents)
+    fields = line.split('\t')
+    if len(fields) >= column:
+        fields[column - 1] = transcode(fields[column - 1], accents)
+    return '\t'.join(fields)
+
+
+def transcode_lines(lines, accents=True, column=None):
+    """Stream converted lines; line endings are kept."""
+    for line in lines:
+        body = line.rstrip('\n')
+        yield transcode_field(body, accents, column) + line[len(body):]
+
+
+def random_words(count, seed=None):
+    """Random Betacode words, valid and invalid, for comparing against sed."""
+    rng = random.Random(seed)
+    alphabet = list(LETTERS) * 4 + list(MARKS) * 2 + ['*', '*', '#3', '#5', '#', "'", ':', '-', ' ']
+    for _ in range(count):
+        yield "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+
+
+def run_sed(script, lines):
+    """Output of a sed script over lines, one string per line."""
+    result = subprocess.run(["sed", "-E", "-f", str(script)], input="\n".join(lines) + "\n",
+                            capture_output=True, text=True, encoding='utf-8', check=True)
+    return result.stdout.split("\n")[:len(lines)]
+
+
+def _matches_converted(ours, sed):
+    """Whether ours agrees with sed everywhere sed converted the word."""
+    pieces = SED_LEFTOVER.split(sed.replace('ς', 'σ'))
+    pattern = ".+?".join(re.escape(piece) for piece in pieces)
+    return re.fullmatch(pattern, ours.replace('ς', 'σ'), re.DOTALL) is not None
+
+
+def classify(ours, sed):
+    """Why a line differs from the sed output, or None if it does not."""
+    if ours == sed:
+        return None
+    ours_words, sed_words = ours.split(), sed.split()
+    if len(ours_words) != len(sed_words):
+        return "mismatch"
+    kinds = set()
+    for mine, theirs in zip(ours_words, sed_words):
+        if mine == theirs:
+            continue
+        if mine.replace('ς', 'σ') == theirs.replace('ς', 'σ'):
+            kinds.add("final sigma")
+        elif mine.translate(SED_ERRATA) == theirs:
+            kinds.add("sed erratum")
+        elif SED_LEFTOVER.search(theirs) and _matches_converted(mine, theirs):
+            kinds.add("sed left Betacode")
+        else:
+            return "mismatch"
+    for kind in ("final sigma", "sed erratum", "sed left Betacode"):
+        if kind in kinds:
+            return kind
+    return "mismatch"  # same words, different spacing
+
+
+def verify(inputs, script, accents=True):
+    """Compare transcode() with the sed script over Betacode inputs; return (Counter, examples)."""
+    # sed only knows uppercase Betacode
+    inputs = [text.translate(ASCII_UPPER) for text in inputs]
+    with span("betacode.sed", lines=len(inputs)):
+        expected = run_sed(script, inputs)
+    with span("betacode.transcode", lines=len(inputs)):
+        actual = [transcode(text, accents) for text in inputs]
+    counts, examples = Counter(), {}
+    for text, ours, sed in zip(inputs, actual, expected):
+        kind = classify(ours, sed) or "identical"
+        counts[kind] += 1
+        examples.setdefault(kind, (text, ours, sed))
+    return counts, examples
+
+
+def _read_fields(paths, column):
+    for path in paths:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if column is None:
+                    yield line
+                else:
+                    fields = line.split('\t')
+                    if len(fields) >= column:
+                        yield fields[column - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Betacode to Unicode Greek")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert a file (or stdin) line by line")
+    convert_parser.add_argument("input", nargs="?", default="-", help="Betacode file (default: stdin)")
+    convert_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    convert_parser.add_argument("--column", type=int, help="Only convert this tab-separated column (1-based)")
+    convert_parser.add_argument("--unaccented", action="store_true", help="Drop accents, breathings and marks")
+    add_profile_arguments(convert_parser)
+
+    verify_parser = subparsers.add_parser("verify", help="Compare with the sed scripts")
+    verify_parser.add_argument("inputs", nargs="*", help="Betacode files")
+    verify_parser.add_argument("--column", type=int, help="Only compare this tab-separated column (1-based)")
+    verify_parser.add_argument("--random", type=int, default=0, metavar="N", help="Also compare N random words")
+    verify_parser.add_argument("--seed", type=int, help="Seed for --random")
+    verify_parser.add_argument("--unaccented", action="store_true", help="Compare with the unaccented script")
+    add_profile_arguments(verify_parser)
+
+    args = parser.parse_args()
+    accents = not args.unaccented
+
+    with profile_session(args):
+        if args.command == "convert":
+            source = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8-sig')
+            target = sys.stdout if not args.output else open(args.output, 'w', encoding='utf-8')
+            try:
+                with span("betacode.convert"):
+                    target.writelines(transcode_lines(source, accents, args.column))
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+                if target is not sys.stdout:
+                    target.close()
+            return
+
+        inputs = list(_read_fields(args.inputs, args.column)) + list(random_words(args.random, args.seed))
+        if not inputs:
+            parser.error("verify needs input files or --random")
+        counts, examples = verify(inputs, Path(args.corpus_root) / SED_SCRIPTS[accents], accents)
+
+    for kind, n in counts.most_common():
+        logger.info(f"{kind}: {n}")
+        if kind != "identical":
+            text, ours, sed = examples[kind]
+            logger.info(f"  e.g. {text!r}: {ours!r} (sed: {sed!r})")
+    sys.exit(1 if counts["mismatch"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Content-addressed blob store for repeated corpus artifacts.
+
+The LXX tree ships the same tables under several names (for example
+001_wordlist_lxx_only.csv in four directories). This module stores each
+distinct file once under build/blobs/<sha256[:2]>/<sha256>, keeps a
+catalog from logical artifact names (paths relative to the corpus root)
+to blobs, and gives every consumer in a process the same read-only
+memory map of a blob, however many names point at it.
+
+Usage:
+    python scripts/blob_store.py ingest                 # default: the LXX tree
+    python scripts/blob_store.py report                 # dedup report
+    python scripts/blob_store.py verify
+
+Checkout files are never replaced by links to their blob: build_graph.py
+redirects and clean.py rewrite files in place, and through a link those
+writes would land in the blob itself.
+
+Library use:
+    store = BlobStore(".")
+    for row in store.rows("sources/LXX-Rahlfs-1935/07_StrongNumber/groundwork/001_wordlist_lxx_only.csv"):
+        ...
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sys
+from pathlib import Path
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = Path("build/blobs")
+DEFAULT_INGEST = ["sources/LXX-Rahlfs-1935"]
+INGEST_SUFFIXES = {".csv", ".xml", ".txt", ".md", ".sh", ".SQLite3"}
+
+# One mapping per blob per process, shared by every BlobStore instance
+_MAPPED = {}
+
+
+class BlobNotFound(KeyError):
+    """Raised when a logical name or blob is not in the store."""
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    def __init__(self, corpus_root=".", store_dir=DEFAULT_STORE):
+        self.corpus_root = Path(corpus_root)
+        self.store_dir = self.corpus_root / store_dir
+        self.catalog_path = self.store_dir / "catalog.json"
+        self.catalog = self._load_catalog()
+
+    def _load_catalog(self):
+        if not self.catalog_path.exists():
+            return {"artifacts": {}}
+        with open(self.catalog_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_catalog(self):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.catalog_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.catalog, f, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.catalog_path)
+
+    def blob_path(self, sha256):
+        return self.store_dir / sha256[:2] / sha256
+
+    def ingest_file(self, path):
+        """Add one file under its corpus-relative name; return its sha256."""
+        path = Path(path)
+        name = path.resolve().relative_to(self.corpus_root.resolve()).as_posix()
+        sha256 = hash_file(path)
+        blob = self.blob_path(sha256)
+
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp_blob = blob.with_suffix('.tmp')
+            shutil.copyfile(path, tmp_blob)
+            os.chmod(tmp_blob, 0o444)
+            os.replace(tmp_blob, blob)
+
+        self.catalog["artifacts"][name] = {"sha256": sha256, "size": path.stat().st_size}
+        return sha256
+
+    def ingest(self, paths):
+        count = 0
+        for root in paths:
+            root = Path(root)
+            files = [root] if root.is_file() else sorted(
+                p for p in root.rglob('*') if p.is_file() and p.suffix in INGEST_SUFFIXES
+            )
+            for path in files:
+                self.ingest_file(path)
+                count += 1
+        self.save_catalog()
+        logger.info(f"Ingested {count} artifacts as {len(self.blob_ids())} blobs into {self.store_dir}")
+        return count
+
+    def blob_ids(self):
+        return {entry["sha256"] for entry in self.catalog["artifacts"].values()}
+
+    def resolve(self, name):
+        """Return the sha256 for a logical artifact name."""
+        name = Path(name).as_posix()
+        entry = self.catalog["artifacts"].get(name)
+        if entry is None:
+            raise BlobNotFound(name)
+        return entry["sha256"]
+
+    def open(self, name):
+        """
+        Return a read-only memory map of the blob behind a logical name.
+        Every name that resolves to the same blob gets the same mapping.
+        """
+        sha256 = self.resolve(name)
+        mapped = _MAPPED.get(sha256)
+        if mapped is None:
+            path = self.blob_path(sha256)
+            if not path.exists():
+                raise BlobNotFound(f"{name} -> missing blob {sha256}")
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    mapped = b''
+                else:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _MAPPED[sha256] = mapped
+        return mapped
+
+    def text(self, name, encoding='utf-8-sig'):
+        return bytes(self.open(name)).decode(encoding)
+
+    def rows(self, name, delimiter='\t', encoding='utf-8-sig'):
+        """Yield the rows of a tab-separated artifact without copying the blob."""
+        data = self.open(name)
+        start = 0
+        size = len(data)
+        first = True
+        while start < size:
+            end = data.find(b'\n', start)
+            if end == -1:
+                end = size
+            line = data[start:end].decode(encoding if first else 'utf-8', errors='replace').rstrip('\r')
+            first = False
+            start = end + 1
+            yield line.split(delimiter)
+
+    def verify(self):
+        """Return a list of problems: missing blobs or blobs whose hash no longer matches."""
+        problems = []
+        for sha256 in sorted(self.blob_ids()):
+            path = self.blob_path(sha256)
+            if not path.exists():
+                problems.append(f"Missing blob {sha256}")
+            elif hash_file(path) != sha256:
+                problems.append(f"Corrupt blob {sha256}")
+        return problems
+
+    def dedup_report(self):
+        """Summarize exact duplicates and tables that share whole columns."""
+        by_blob = {}
+        for name, entry in self.catalog["artifacts"].items():
+            by_blob.setdefault(entry["sha256"], []).append(name)
+
+        logical = sum(e["size"] for e in self.catalog["artifacts"].values())
+        stored = sum(self.catalog["artifacts"][names[0]]["size"] for names in by_blob.values())
+        duplicates = [
+            {
+                "sha256": sha256,
+                "size": self.catalog["artifacts"][names[0]]["size"],
+                "names": sorted(names),
+            }
+            for sha256, names in by_blob.items() if len(names) > 1
+        ]
+        duplicates.sort(key=lambda d: d["size"] * (len(d["names"]) - 1), reverse=True)
+
+        return {
+            "artifacts": len(self.catalog["artifacts"]),
+            "blobs": len(by_blob),
+            "logical_bytes": logical,
+            "stored_bytes": stored,
+            "saved_bytes": logical - stored,
+            "duplicates": duplicates,
+            "shared_columns": self._shared_columns(by_blob),
+        }
+
+    def _shared_columns(self, by_blob):
+        """
+        Group distinct .csv blobs by row count and report which of their
+        tab-separated columns are byte-identical, e.g. the 30,637-row
+        versification tables that differ only in the book-name column.
+        """
+        families = {}
+        for sha256, names in by_blob.items():
+            name = sorted(names)[0]
+            if not name.endswith('.csv'):
+                continue
+            columns = {}
+            row_count = 0
+            for row in self.rows(name):
+                row_count += 1
+                for i, value in enumerate(row):
+                    columns.setdefault(i, hashlib.sha256()).update(value.encode('utf-8') + b'\n')
+            digests = tuple(columns[i].hexdigest() for i in sorted(columns))
+            families.setdefault(row_count, []).append((name, digests))
+
+        report = []
+        for row_count, members in sorted(families.items()):
+            if len(members) < 2 or row_count < 100:
+                continue
+            column_owners = {}
+            for name, digests in members:
+                for i, digest in enumerate(digests):
+                    column_owners.setdefault(digest, []).append(f"{name}[{i}]")
+            shared = [sorted(owners) for owners in column_owners.values() if len(owners) > 1]
+            if shared:
+                report.append({"rows": row_count, "files": len(members), "shared": sorted(shared)})
+        return report
+
+
+def print_report(report):
+    mb = 1024 * 1024
+    print(f"Artifacts: {report['artifacts']}  Blobs: {report['blobs']}")
+    print(f"Logical size: {report['logical_bytes'] / mb:.1f} MB  "
+          f"Stored: {report['stored_bytes'] / mb:.1f} MB  "
+          f"Saved: {report['saved_bytes'] / mb:.1f} MB")
+
+    if report["duplicates"]:
+        print("\nExact duplicates:")
+        for dup in report["duplicates"]:
+            print(f"  {dup['sha256'][:12]}  {dup['size']:>10} bytes x {len(dup['names'])}")
+            for name in dup["names"]:
+                print(f"      {name}")
+
+    if report["shared_columns"]:
+        print("\nDistinct tables sharing identical columns:")
+        for family in report["shared_columns"]:
+            print(f"  {family['rows']} rows, {family['files']} tables")
+            for owners in family["shared"]:
+                print(f"      {' == '.join(owners)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed store for corpus artifacts")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--store", default=str(DEFAULT_STORE), help="Blob store directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Add files or directories to the store")
+    ingest_parser.add_argument("paths", nargs="*", help="Files or directories (default: the LXX tree)")
+
+    report_parser = subparsers.add_parser("report", help="Print the dedup report")
+    report_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    subparsers.add_parser("verify", help="Check every blob against its hash")
+
+    args = parser.parse_args()
+    store = BlobStore(args.corpus_root, args.store)
+
+    if args.command == "ingest":
+        paths = args.paths or [Path(args.corpus_root) / p for p in DEFAULT_INGEST]
+        store.ingest(paths)
+        print_report(store.dedup_report())
+    elif args.command == "report":
+        report = store.dedup_report()
+        if args.json:
+            print(json.dumps(report, indent=2, ensure_ascii=False))
+        else:
+            print_report(report)
+    elif args.command == "verify":
+        problems = store.verify()
+        for problem in problems:
+            logger.error(problem)
+        logger.info(f"Verified {len(store.blob_ids())} blobs, {len(problems)} problems")
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+On-disk BM25 lexical index over active texts.
+
+`build` streams every active text through the section-bounded chunker of
+embedding_cache.py, so lexical hits use the same chunks (and chunk hashes)
+as vector search. Postings are accumulated for a bounded number of chunks,
+flushed to sorted segment files, and the segments are merged into the final
+index in build/bm25/:
+
+    terms.bin     term strings, sorted
+    terms.idx     fixed-width records: term offset/length, df, postings offset/length
+    postings.bin  per term: varint (chunk delta, term frequency, section number)
+    chunks.bin    fixed-width records: length in tokens, section, text, offsets, sha256
+    meta.json     chunk count, average length, texts (with manifest categories
+                  and chunk ranges) and sections (with author)
+
+`search` memory-maps the files, binary-searches the term dictionary and
+scores only the postings of the query terms. Results can be restricted to
+manifest categories, text ids or section authors, and a "quoted phrase"
+must occur verbatim in the chunk. Common English function words are not
+indexed.
+
+Usage:
+    python scripts/bm25_index.py build
+    python scripts/bm25_index.py build --segment-chunks 5000 --profile
+    python scripts/bm25_index.py search "Logos spermatikos"
+    python scripts/bm25_index.py search '"bishop of Smyrna" martyrdom' --category ante-nicene
+    python scripts/bm25_index.py search Eucharist --author Ignatius --format json -k 5
+"""
+
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from collections import Counter
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing
+from embedding_cache import DEFAULT_CHUNK_BYTES, iter_corpus_chunks
+from instrumentation import span, add_profile_arguments, profile_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_DIR = Path("build/bm25")
+DEFAULT_SEGMENT_CHUNKS = 20000
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have he his i in is it its of on or
+that the their them they this to was were which will with
+""".split())
+
+# term offset, term length, df, postings offset, postings length
+TERM_RECORD = struct.Struct("<QIIQI")
+# tokens, section number, text number, start offset, end offset, chunk sha256
+CHUNK_RECORD = struct.Struct("<IIIQQ32s")
+CHUNK_PREFIX = struct.Struct("<III")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.casefold()) if token not in STOPWORDS]
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buf, position):
+    """Return (value, next position)."""
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def read_varint(f):
+    value = 0
+    shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise EOFError
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def iter_postings(buf, start, length):
+    """Yield (chunk number, term frequency, section number) from a postings list."""
+    position = start
+    end = start + length
+    chunk = 0
+    while position < end:
+        delta, position = decode_varint(buf, position)
+        tf, position = decode_varint(buf, position)
+        section, position = decode_varint(buf, position)
+        chunk += delta
+        yield chunk, tf, section
+
+
+# Building
+
+class Segment:
+    """In-memory postings for a run of chunks, flushed to a sorted segment file."""
+
+    def __init__(self):
+        # term -> [df, last chunk, postings]
+        self.terms = {}
+        self.chunks = 0
+
+    def add(self, chunk, section, counts):
+        for term, tf in counts.items():
+            entry = self.terms.get(term)
+            if entry is None:
+                entry = self.terms[term] = [0, 0, bytearray()]
+            encode_varint(chunk - entry[1], entry[2])
+            encode_varint(tf, entry[2])
+            encode_varint(section, entry[2])
+            entry[0] += 1
+            entry[1] = chunk
+        self.chunks += 1
+
+    def write(self, path):
+        with open(path, 'wb') as f:
+            for term in sorted(self.terms):
+                df, last, postings = self.terms[term]
+                encoded = term.encode('utf-8')
+                header = bytearray()
+                for value in (len(encoded), df, last, len(postings)):
+                    encode_varint(value, header)
+                f.write(header)
+                f.write(encoded)
+                f.write(postings)
+
+
+def read_segment(path):
+    """Yield (term, df, last chunk, postings) from a segment file in term order."""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                term_length = read_varint(f)
+            except EOFError:
+                return
+            df, last, length = read_varint(f), read_varint(f), read_varint(f)
+            term = f.read(term_length).decode('utf-8')
+            yield term, df, last, f.read(length)
+
+
+def merge_segments(segment_paths, index_dir):
+    """Merge sorted segments (in chunk order) into terms.bin/terms.idx/postings.bin."""
+    merged = heapq.merge(*(read_segment(path) for path in segment_paths), key=lambda entry: entry[0])
+    term_count = 0
+    with open(index_dir / "terms.bin", 'wb') as terms_out, \
+            open(index_dir / "terms.idx", 'wb') as index_out, \
+            open(index_dir / "postings.bin", 'wb') as postings_out:
+        current = None
+        df = 0
+        last = 0
+        postings = bytearray()
+
+        def flush():
+            encoded = current.encode('utf-8')
+            index_out.write(TERM_RECORD.pack(terms_out.tell(), len(encoded), df,
+                                             postings_out.tell(), len(postings)))
+            terms_out.write(encoded)
+            postings_out.write(postings)
+
+        # heapq.merge is stable, so a term's segment lists arrive in chunk order
+        for term, segment_df, segment_last, segment_postings in merged:
+            if term != current:
+                if current is not None:
+                    flush()
+                    term_count += 1
+                current, df, last, postings = term, 0, 0, bytearray()
+            # The first delta of a segment list is relative to chunk 0; rebase it
+            first, position = decode_varint(segment_postings, 0)
+            encode_varint(first - last, postings)
+            postings.extend(segment_postings[position:])
+            df += segment_df
+            last = segment_last
+        if current is not None:
+            flush()
+            term_count += 1
+    return term_count
+
+
+def manifest_categories(corpus_root):
+    """Return {text_id: [categories]} from the manifest's categories map."""
+    with open(Path(corpus_root) / "manifest.yaml", 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f)
+    categories = {}
+    for category, text_ids in (manifest.get("categories") or {}).items():
+        for text_id in text_ids or []:
+            categories.setdefault(text_id, []).append(category)
+    return categories
+
+
+def build_index(corpus_root=".", index_dir=None, text_ids=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                segment_chunks=DEFAULT_SEGMENT_CHUNKS):
+    """Build the index in one streaming pass; return meta.json's content."""
+    corpus_root = Path(corpus_root)
+    index_dir = Path(index_dir) if index_dir else corpus_root / DEFAULT_INDEX_DIR
+    tmp_dir = index_dir.with_name(index_dir.name + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    for stale in tmp_dir.iterdir():
+        stale.unlink()
+
+    categories = manifest_categories(corpus_root)
+    texts = []
+    sections = [None]  # section number 0: text outside any section
+    section_numbers = {}
+    segment_paths = []
+    segment = Segment()
+    chunk = 0
+    total_tokens = 0
+
+    with open(tmp_dir / "chunks.bin", 'wb') as chunks_out:
+        for record in iter_corpus_chunks(corpus_root, text_ids, chunk_bytes):
+            if not texts or texts[-1]["id"] != record["text_id"]:
+                texts.append({"id": record["text_id"], "categories": categories.get(record["text_id"], []),
+                              "first_chunk": chunk, "end_chunk": chunk})
+            section = 0
+            if record.get("section_id"):
+                section = section_numbers.get(record["section_id"])
+                if section is None:
+                    section = section_numbers[record["section_id"]] = len(sections)
+                    sections.append({"id": record["section_id"], "author": record.get("author")})
+
+            with span("bm25.tokenize", bytes=len(record["content"])):
+                tokens = tokenize(record["content"])
+            segment.add(chunk, section, Counter(tokens))
+            chunks_out.write(CHUNK_RECORD.pack(len(tokens), section, len(texts) - 1, record["start_offset"],
+                                               record["end_offset"], bytes.fromhex(record["hash"])))
+            total_tokens += len(tokens)
+            chunk += 1
+            texts[-1]["end_chunk"] = chunk
+
+            if segment.chunks >= segment_chunks:
+                with span("bm25.write_segment"):
+                    path = tmp_dir / f"segment-{len(segment_paths):04d}.bin"
+                    segment.write(path)
+                segment_paths.append(path)
+                segment = Segment()
+
+    if segment.chunks:
+        with span("bm25.write_segment"):
+            path = tmp_dir / f"segment-{len(segment_paths):04d}.bin"
+            segment.write(path)
+        segment_paths.append(path)
+
+    with span("bm25.merge"):
+        term_count = merge_segments(segment_paths, tmp_dir)
+    for path in segment_paths:
+        path.unlink()
+
+    meta = {
+        "version": INDEX_VERSION,
+        "chunk_bytes": chunk_bytes,
+        "chunks": chunk,
+        "terms": term_count,
+        "average_tokens": total_tokens / chunk if chunk else 0.0,
+        "segments": len(segment_paths),
+        "texts": texts,
+        "sections": sections,
+    }
+    with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Replace the previous index only once the new one is complete
+    if index_dir.exists():
+        for old in index_dir.iterdir():
+            old.unlink()
+        index_dir.rmdir()
+    os.replace(tmp_dir, index_dir)
+    return meta
+
+
+# Querying
+
+class BM25Index:
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, corpus_root="."):
+        self.index_dir = Path(index_dir)
+        self.corpus_root = Path(corpus_root)
+        with open(self.index_dir / "meta.json", 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"{self.index_dir} was built by another index version; rebuild it")
+        self._files = []
+        self.terms = self._map("terms.bin")
+        self.term_index = self._map("terms.idx")
+        self.postings = self._map("postings.bin")
+        self.chunks = self._map("chunks.bin")
+        self.term_count = len(self.term_index) // TERM_RECORD.size
+        self.texts = self.meta["texts"]
+        self.sections = self.meta["sections"]
+        self._text_files = None
+
+    def _map(self, name):
+        f = open(self.index_dir / name, 'rb')
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for data in (self.terms, self.term_index, self.postings, self.chunks):
+            if isinstance(data, mmap.mmap):
+                data.close()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def lookup(self, term):
+        """Return (df, postings offset, postings length) for a term, or None."""
+        target = term.encode('utf-8')
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            term_offset, term_length, df, offset, length = TERM_RECORD.unpack_from(
+                self.term_index, mid * TERM_RECORD.size)
+            candidate = self.terms[term_offset:term_offset + term_length]
+            if candidate < target:
+                lo = mid + 1
+            elif candidate > target:
+                hi = mid
+            else:
+                return df, offset, length
+        return None
+
+    def chunk(self, number):
+        tokens, section, text, start, end, digest = CHUNK_RECORD.unpack_from(
+            self.chunks, number * CHUNK_RECORD.size)
+        return {
+            "hash": digest.hex(),
+            "text_id": self.texts[text]["id"],
+            "section_id": self.sections[section]["id"] if section else None,
+            "author": self.sections[section]["author"] if section else None,
+            "start_offset": start,
+            "end_offset": end,
+            "tokens": tokens,
+        }
+
+    def _text_numbers(self, categories=None, text_ids=None):
+        numbers = set()
+        for number, text in enumerate(self.texts):
+            if categories and not set(categories) & set(text["categories"]):
+                continue
+            if text_ids and text["id"] not in text_ids:
+                continue
+            numbers.add(number)
+        return numbers
+
+    def _author_sections(self, authors):
+        wanted = {author.casefold() for author in authors}
+        return {number for number, section in enumerate(self.sections)
+                if section and str(section.get("author", "")).casefold() in wanted}
+
+    def score(self, terms, categories=None, text_ids=None, authors=None, k1=BM25_K1, b=BM25_B):
+        """Return {chunk number: BM25 score} for chunks matching the filters."""
+        total = self.meta["chunks"]
+        average = self.meta["average_tokens"] or 1.0
+        texts = self._text_numbers(categories, text_ids) if categories or text_ids else None
+        sections = self._author_sections(authors) if authors else None
+        record_size = CHUNK_RECORD.size
+
+        scores = {}
+        for term in set(terms):
+            found = self.lookup(term)
+            if found is None:
+                continue
+            df, offset, length = found
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for chunk, tf, section in iter_postings(self.postings, offset, length):
+                if sections is not None and section not in sections:
+                    continue
+                tokens, _, text = CHUNK_PREFIX.unpack_from(self.chunks, chunk * record_size)
+                if texts is not None and text not in texts:
+                    continue
+                norm = k1 * (1 - b + b * tokens / average)
+                scores[chunk] = scores.get(chunk, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def chunk_text(self, result, cache):
+        """Read a result's text from the corpus; cache maps text id to its bytes."""
+        text_id = result["text_id"]
+        if text_id not in cache:
+            if self._text_files is None:
+                with open(self.corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+                    manifest = yaml.safe_load(f)
+                self._text_files = {entry["id"]: entry["file"] for entry in manifest.get("texts", [])
+                                    if "file" in entry}
+            cache[text_id] = CorpusFiles(self.corpus_root).read_bytes(self._text_files[text_id])
+        return cache[text_id][result["start_offset"]:result["end_offset"]].decode('utf-8', errors='replace')
+
+    def search(self, query, k=10, categories=None, text_ids=None, authors=None):
+        """Return the top k chunks for a query; "quoted" phrases must match verbatim."""
+        phrases = [" ".join(p.casefold().split()) for p in re.findall(r'"([^"]+)"', query)]
+        scores = self.score(tokenize(query.replace('"', ' ')), categories, text_ids, authors)
+        if not phrases:
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [dict(self.chunk(number), score=round(score, 4)) for number, score in best]
+
+        # Verify phrases against the chunk text, best candidates first
+        results = []
+        texts = {}
+        for number, score in sorted(scores.items(), key=lambda item: -item[1]):
+            result = self.chunk(number)
+            content = " ".join(self.chunk_text(result, texts).casefold().split())
+            if all(phrase in content for phrase in phrases):
+                results.append(dict(result, score=round(score, 4)))
+                if len(results) == k:
+                    break
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 lexical index over active texts")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--index-dir", help=f"Index directory (default: {DEFAULT_INDEX_DIR})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the index from active texts")
+    build_parser.add_argument("--ids", nargs="+", help="Only these text ids (default: active texts)")
+    build_parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES,
+                              help="Maximum chunk size in bytes (as for embedding)")
+    build_parser.add_argument("--segment-chunks", type=int, default=DEFAULT_SEGMENT_CHUNKS,
+                              help="Chunks per in-memory segment before flushing to disk")
+    add_profile_arguments(build_parser)
+
+    search_parser = subparsers.add_parser("search", help="Query the index")
+    search_parser.add_argument("query", help='Query terms; "quoted phrases" must match verbatim')
+    search_parser.add_argument("-k", type=int, default=10, help="Number of results")
+    search_parser.add_argument("--category", nargs="+", help="Manifest categories (any of)")
+    search_parser.add_argument("--text", nargs="+", help="Text ids (any of)")
+    search_parser.add_argument("--author", nargs="+", help="Section authors (any of)")
+    search_parser.add_argument("--format", choices=("table", "json"), default="table", help="Output format")
+
+    args = parser.parse_args()
+    index_dir = Path(args.index_dir) if args.index_dir else Path(args.corpus_root) / DEFAULT_INDEX_DIR
+
+    if args.command == "build":
+        with profile_session(args):
+            meta = build_index(args.corpus_root, index_dir, args.ids, args.chunk_bytes, args.segment_chunks)
+        logger.info(f"Indexed {meta['chunks']} chunks from {len(meta['texts'])} texts: "
+                    f"{meta['terms']} terms, {meta['segments']} segments merged into {index_dir}")
+        return
+
+    if not (index_dir / "meta.json").exists():
+        parser.error(f"No index in {index_dir}; run the build command first")
+    with BM25Index(index_dir, args.corpus_root) as index:
+        try:
+            results = index.search(args.query, args.k, args.category, args.text, args.author)
+        except LfsObjectMissing as e:
+            # Phrase checks read the chunk text
+            logger.error(f"Cannot verify phrase: {e}")
+            sys.exit(1)
+
+    if args.format == "json":
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        where = result["section_id"] or result["text_id"]
+        print(f"{result['score']:>8.3f}  {where:<16} {result['author'] or '':<24} "
+              f"bytes {result['start_offset']}-{result['end_offset']}  {result['hash'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Incremental build engine for declared file-to-file pipeline stages.
+
+Stages are declared in a YAML file (see lxx-pipeline.yaml) with their
+inputs, outputs and a shell command. A stage depends on every stage that
+writes one of its inputs. On each run the engine:
+
+1. Orders stages topologically and starts every stage whose upstream
+   stages have finished, running independent stages in parallel
+2. Hashes the stage's inputs (sha256, reusing recorded hashes when size
+   and mtime are unchanged) and compares them, the command, and the
+   outputs against the state file
+3. Reruns the stage only if something changed, then records the new
+   hashes; a rebuilt stage whose outputs come out identical does not
+   force its downstream stages to rebuild
+
+Usage:
+    python scripts/build_graph.py                      # rebuild what changed
+    python scripts/build_graph.py --dry-run            # show what would run
+    python scripts/build_graph.py --force lexicon-gloss
+    python scripts/build_graph.py --graph              # print stage order
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+import logging
+
+import yaml
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIPELINE = Path("lxx-pipeline.yaml")
+
+
+class BuildError(Exception):
+    """Raised for invalid pipeline declarations or failed stages."""
+
+
+class Stage:
+    def __init__(self, name, inputs, outputs, run):
+        self.name = name
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.run = run
+        self.upstream = set()
+        self.downstream = set()
+
+    def command(self):
+        """Return the shell command with quoted input/output paths substituted."""
+        return self.run.format(
+            inputs=[shlex.quote(p) for p in self.inputs],
+            outputs=[shlex.quote(p) for p in self.outputs],
+        )
+
+
+class BuildGraph:
+    def __init__(self, pipeline_path, corpus_root="."):
+        self.corpus_root = Path(corpus_root)
+        self.pipeline_path = self.corpus_root / pipeline_path
+
+        with open(self.pipeline_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+
+        self.root = self.corpus_root / config.get("root", ".")
+        self.state_path = self.corpus_root / config.get("state", "build/pipeline.state.json")
+        self.stages = {}
+
+        for name, spec in (config.get("stages") or {}).items():
+            for field in ("inputs", "outputs", "run"):
+                if field not in spec:
+                    raise BuildError(f"Stage '{name}' is missing '{field}'")
+            self.stages[name] = Stage(name, spec["inputs"], spec["outputs"], spec["run"])
+
+        self._link_stages()
+        self.order = self._topological_order()
+        self.state = self._load_state()
+
+    def _link_stages(self):
+        producers = {}
+        for stage in self.stages.values():
+            for output in stage.outputs:
+                if output in producers:
+                    raise BuildError(
+                        f"'{output}' is written by both '{producers[output]}' and '{stage.name}'"
+                    )
+                producers[output] = stage.name
+
+        for stage in self.stages.values():
+            for path in stage.inputs:
+                producer = producers.get(path)
+                if producer and producer != stage.name:
+                    stage.upstream.add(producer)
+                    self.stages[producer].downstream.add(stage.name)
+
+    def _topological_order(self):
+        remaining = {name: len(stage.upstream) for name, stage in self.stages.items()}
+        ready = sorted(name for name, count in remaining.items() if count == 0)
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for child in sorted(self.stages[name].downstream):
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+        if len(order) != len(self.stages):
+            cyclic = sorted(set(self.stages) - set(order))
+            raise BuildError(f"Cycle between stages: {', '.join(cyclic)}")
+        return order
+
+    def _load_state(self):
+        if not self.state_path.exists():
+            return {"files": {}, "stages": {}}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(self.state_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def file_hash(self, relative_path):
+        """Return the sha256 of a file under root, or None if it is missing."""
+        path = self.root / relative_path
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        cached = self.state["files"].get(relative_path)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+        self.state["files"][relative_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest.hexdigest(),
+        }
+        return digest.hexdigest()
+
+    def stale_reason(self, stage):
+        """Return why a stage must run, or None if it is up to date."""
+        record = self.state["stages"].get(stage.name)
+        if record is None:
+            return "never built"
+        if record.get("command") != stage.command():
+            return "command changed"
+
+        for path in stage.inputs:
+            current = self.file_hash(path)
+            if current is None:
+                raise BuildError(f"Stage '{stage.name}': input not found: {self.root / path}")
+            if record["inputs"].get(path) != current:
+                return f"input changed: {path}"
+
+        for path in stage.outputs:
+            current = self.file_hash(path)
+            if current is None:
+                return f"output missing: {path}"
+            if record["outputs"].get(path) != current:
+                return f"output modified: {path}"
+        return None
+
+    def _run_stage(self, stage):
+        result = subprocess.run(
+            stage.command(), shell=True, cwd=self.root,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        if result.returncode != 0:
+            raise BuildError(
+                f"Stage '{stage.name}' failed ({result.returncode}): {result.stderr.strip()}"
+            )
+
+    def _record(self, stage):
+        self.state["stages"][stage.name] = {
+            "command": stage.command(),
+            "inputs": {p: self.file_hash(p) for p in stage.inputs},
+            "outputs": {p: self.file_hash(p) for p in stage.outputs},
+        }
+
+    def build(self, targets=None, force=(), jobs=None, dry_run=False):
+        """
+        Bring the selected stages (default: all) and their upstream stages
+        up to date. Returns the names of stages that ran.
+        """
+        selected = self._with_upstream(targets) if targets else set(self.order)
+        forced = set(force)
+        unknown = (set(targets or ()) | forced) - set(self.stages)
+        if unknown:
+            raise BuildError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+
+        pending = {name: set(self.stages[name].upstream) & selected for name in selected}
+        changed_upstream = set()
+        ran = []
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            while pending or running:
+                ready = self._ready(pending)
+                while ready:
+                    for name in ready:
+                        del pending[name]
+                        stage = self.stages[name]
+
+                        reason = "forced" if name in forced else self.stale_reason(stage)
+                        if reason is None and stage.upstream & changed_upstream:
+                            reason = "upstream changed"
+
+                        if reason is None:
+                            logger.debug(f"{name}: up to date")
+                            self._finish(name, pending)
+                            continue
+
+                        logger.info(f"{name}: {'would run' if dry_run else 'running'} ({reason})")
+                        if dry_run:
+                            # Assume the outputs change so downstream stages are listed too
+                            ran.append(name)
+                            changed_upstream.add(name)
+                            self._finish(name, pending)
+                            continue
+
+                        before = {p: self.file_hash(p) for p in stage.outputs}
+                        running[executor.submit(self._run_stage, stage)] = (name, before)
+                    ready = self._ready(pending)
+
+                if not running:
+                    if pending:
+                        raise BuildError(f"Unschedulable stages: {', '.join(sorted(pending))}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, before = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        future.result()
+                    except BuildError:
+                        self._save_state()
+                        raise
+
+                    # Outputs were rewritten; drop cached hashes before recording
+                    for path in stage.outputs:
+                        self.state["files"].pop(path, None)
+                    self._record(stage)
+                    ran.append(name)
+                    if any(self.file_hash(p) != before[p] for p in stage.outputs):
+                        changed_upstream.add(name)
+                    self._finish(name, pending)
+
+        if not dry_run:
+            self._save_state()
+        return ran
+
+    def _ready(self, pending):
+        return [name for name in self.order if name in pending and not pending[name]]
+
+    def _finish(self, name, pending):
+        for child in self.stages[name].downstream:
+            if child in pending:
+                pending[child].discard(name)
+
+    def _with_upstream(self, targets):
+        selected = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in selected or name not in self.stages:
+                continue
+            selected.add(name)
+            stack.extend(self.stages[name].upstream)
+        return selected
+
+    def print_graph(self):
+        for name in self.order:
+            stage = self.stages[name]
+            after = f" (after {', '.join(sorted(stage.upstream))})" if stage.upstream else ""
+            print(f"{name}{after}")
+            for path in stage.inputs:
+                print(f"    < {path}")
+            for path in stage.outputs:
+                print(f"    > {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally rebuild pipeline stages")
+    parser.add_argument("stages", nargs="*", help="Stages to bring up to date (default: all)")
+    parser.add_argument("--pipeline", default=str(DEFAULT_PIPELINE), help="Pipeline YAML file")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--force", action="append", default=[], help="Rebuild a stage even if up to date")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Parallel stages (default: CPU count)")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="Show stages that would run")
+    parser.add_argument("--graph", action="store_true", help="Print stages in build order and exit")
+
+    args = parser.parse_args()
+
+    try:
+        graph = BuildGraph(args.pipeline, args.corpus_root)
+        if args.graph:
+            graph.print_graph()
+            return
+        ran = graph.build(args.stages, args.force, args.jobs, args.dry_run)
+    except BuildError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    verb = "would run" if args.dry_run else "ran"
+    logger.info(f"{len(ran)}/{len(graph.stages)} stages {verb}")
+
+
+if __name__ == "__main__":
+    main()
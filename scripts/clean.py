@@ -11,18 +11,37 @@ import os
 import sys
 import re
 import unicodedata
+from collections import Counter
 from pathlib import Path
 import logging
 
+sys.path.append(str(Path(__file__).parent))
+from instrumentation import span, add_profile_arguments, profile_session
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class TextCleaner:
-    def __init__(self, corpus_root):
+    def __init__(self, corpus_root, mojibake=False):
+        from corpus_files import CorpusFiles
+        
         self.corpus_root = Path(corpus_root)
         self.sources_dir = self.corpus_root / "sources"
+        self.files = CorpusFiles(corpus_root)
+        self.mojibake = mojibake
+        self.mojibake_counts = Counter()
+        
+    def repair_mojibake(self, text):
+        """Repair UTF-8-read-as-cp1252 sequences (see mojibake.py)."""
+        # Imported here so --help and runs without --repair-mojibake skip yaml
+        from mojibake import repair_mojibake
         
+        text, self.mojibake_counts = repair_mojibake(text)
+        for (broken, fixed), n in self.mojibake_counts.most_common():
+            logger.info(f"Mojibake: {broken!r} -> {fixed!r} x{n}")
+        return text
+    
     def normalize_unicode(self, text):
         """Normalize Unicode characters."""
         # Normalize to NFC (Canonical Decomposition followed by Canonical Composition)
@@ -114,47 +133,77 @@ class TextCleaner:
         
         return '\n'.join(cleaned_lines)
     
-    def clean_text(self, text, aggressive=False):
-        """Apply all cleaning operations to text."""
-        logger.info("Starting text cleaning...")
-        
+    def passes(self, aggressive=False):
+        """The cleaning passes clean_text applies, in order."""
         # Basic cleaning (always applied)
-        text = self.normalize_unicode(text)
-        text = self.remove_control_characters(text)
-        text = self.standardize_punctuation(text)
-        text = self.standardize_line_endings(text)
+        passes = [
+            self.normalize_unicode,
+            self.remove_control_characters,
+            self.standardize_punctuation,
+            self.standardize_line_endings,
+        ]
+        
+        if self.mojibake:
+            # Opt-in: the repair rewrites text, so it runs only when asked for
+            passes.insert(0, self.repair_mojibake)
         
         if aggressive:
             # More aggressive cleaning
-            text = self.clean_whitespace(text)
-            text = self.clean_page_numbers(text)
-            text = self.clean_headers_footers(text)
+            passes += [
+                self.clean_whitespace,
+                self.clean_page_numbers,
+                self.clean_headers_footers,
+            ]
+        return passes
+    
+    def clean_text(self, text, aggressive=False):
+        """Apply all cleaning operations to text."""
+        logger.info("Starting text cleaning...")
+        
+        for clean_pass in self.passes(aggressive):
+            with span(f"clean.{clean_pass.__name__}", bytes=len(text)):
+                text = clean_pass(text)
         
         logger.info("Text cleaning complete")
         return text
     
     def clean_file(self, file_path, aggressive=False, backup=True):
         """Clean a single text file."""
+        from corpus_files import LfsObjectMissing
+        
         try:
             logger.info(f"Cleaning {file_path}")
             
+            # Never clean a git-lfs pointer; hydrate it first if the object is local
+            if self.files.is_pointer(file_path):
+                try:
+                    self.files.hydrate(file_path)
+                    logger.info(f"Hydrated git-lfs pointer {file_path}")
+                except LfsObjectMissing as e:
+                    logger.warning(f"Skipping {e}")
+                    return True
+            
             # Read original file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_text = f.read()
+            with span("clean.read") as s:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    original_text = f.read()
+                s.add(bytes=len(original_text), lines=original_text.count('\n'))
             
             # Create backup if requested
             if backup:
                 backup_path = file_path.with_suffix(file_path.suffix + '.bak')
-                with open(backup_path, 'w', encoding='utf-8') as f:
-                    f.write(original_text)
+                with span("clean.backup", bytes=len(original_text)):
+                    with open(backup_path, 'w', encoding='utf-8') as f:
+                        f.write(original_text)
                 logger.info(f"Backup created: {backup_path}")
             
             # Clean the text
             cleaned_text = self.clean_text(original_text, aggressive)
             
             # Write cleaned text
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(cleaned_text)
+            with span("clean.write", bytes=len(cleaned_text)):
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(cleaned_text)
             
             # Report changes
             original_size = len(original_text)
@@ -162,12 +211,37 @@ class TextCleaner:
             change = cleaned_size - original_size
             
             logger.info(f"Cleaned {file_path}: {original_size} -> {cleaned_size} chars ({change:+d})")
+            if self.mojibake:
+                logger.info(f"{sum(self.mojibake_counts.values())} mojibake sequences repaired")
+            
+            if self.mojibake and self.mojibake_counts:
+                self.reconcile_metadata(file_path, cleaned_text)
             return True
             
         except Exception as e:
             logger.error(f"Error cleaning {file_path}: {e}")
             return False
     
+    def reconcile_metadata(self, file_path, text):
+        """Repair mojibake start_markers in the text's .meta.yaml to match the cleaned text."""
+        import yaml
+        from metadata_compiler import replace_declared_markers
+        from mojibake import reconcile_markers
+        
+        meta_path = Path(file_path).with_suffix('.meta.yaml')
+        if not meta_path.exists():
+            return
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metadata = yaml.safe_load(f)
+        fixed, unmatched = reconcile_markers(metadata, text)
+        for marker in unmatched:
+            logger.warning(f"{meta_path.name}: start_marker {marker!r} still does not match the text")
+        if fixed:
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                yaml.dump(metadata, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+            replace_declared_markers(self.corpus_root, dict(fixed))
+            logger.info(f"Reconciled {len(fixed)} start_markers in {meta_path.name}")
+    
     def clean_all_texts(self, aggressive=False, backup=True):
         """Clean all text files in the sources directory."""
         if not self.sources_dir.exists():
@@ -193,8 +267,7 @@ class TextCleaner:
     def preview_changes(self, file_path, aggressive=False):
         """Preview what changes would be made to a file."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_text = f.read()
+            original_text = self.files.read_text(file_path)
             
             cleaned_text = self.clean_text(original_text, aggressive)
             
@@ -229,23 +302,27 @@ def main():
     parser.add_argument("--aggressive", action="store_true", help="Apply aggressive cleaning")
     parser.add_argument("--no-backup", action="store_true", help="Don't create backup files")
     parser.add_argument("--preview", action="store_true", help="Preview changes without applying")
+    parser.add_argument("--repair-mojibake", action="store_true",
+                        help="Also repair UTF-8-read-as-cp1252 sequences (see mojibake.py)")
     parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
     
-    cleaner = TextCleaner(args.corpus_root)
+    cleaner = TextCleaner(args.corpus_root, mojibake=args.repair_mojibake)
     backup = not args.no_backup
     
-    if args.preview and args.file:
-        cleaner.preview_changes(args.file, args.aggressive)
-    elif args.file:
-        success = cleaner.clean_file(args.file, args.aggressive, backup)
-        sys.exit(0 if success else 1)
-    elif args.all:
-        success = cleaner.clean_all_texts(args.aggressive, backup)
-        sys.exit(0 if success else 1)
-    else:
-        parser.error("Specify either --file or --all")
+    with profile_session(args):
+        if args.preview and args.file:
+            cleaner.preview_changes(args.file, args.aggressive)
+        elif args.file:
+            success = cleaner.clean_file(Path(args.file), args.aggressive, backup)
+            sys.exit(0 if success else 1)
+        elif args.all:
+            success = cleaner.clean_all_texts(args.aggressive, backup)
+            sys.exit(0 if success else 1)
+        else:
+            parser.error("Specify either --file or --all")
 
 if __name__ == "__main__":
     main()
@@ -3,10 +3,18 @@
 Consolidate LXX Rahlfs 1935 Septuagint from CSV format into single text file.
 """
 
+import argparse
 import csv
 import re
+import sys
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).parent))
+from instrumentation import span, add_profile_arguments, profile_session
+
+DEFAULT_CSV = Path("sources/LXX-Rahlfs-1935/11_end-users_files/MyBible/Bibles/LXX_final_main.csv")
+DEFAULT_OUTPUT = Path("sources/BIBLE-LXX.txt")
+
 # LXX book mapping (from SQLite database)
 LXX_BOOKS = [
     (10, "Genesis", "ΓΕΝΕΣΙΣ"),
@@ -78,17 +86,18 @@ def strip_markup(text):
             words.append(word)
     return ' '.join(words)
 
-def main():
-    csv_path = Path("sources/LXX-Rahlfs-1935/11_end-users_files/MyBible/Bibles/LXX_final_main.csv")
-    output_path = Path("sources/BIBLE-LXX.txt")
+def consolidate_lxx(csv_path=DEFAULT_CSV, output_path=DEFAULT_OUTPUT):
+    csv_path = Path(csv_path)
+    output_path = Path(output_path)
 
     print(f"Reading LXX CSV from: {csv_path}")
 
     # Read all verses grouped by book
     book_verses = {}
-    with open(csv_path, 'r', encoding='utf-8') as f:
+    with span("lxx.read_and_strip") as s, open(csv_path, 'r', encoding='utf-8') as f:
         # Tab-delimited: book_id, chapter, verse, greek_text
         for line in f:
+            s.add(bytes=len(line), lines=1)
             parts = line.strip().split('\t')
             if len(parts) >= 4:
                 book_id = int(parts[0])
@@ -103,7 +112,7 @@ def main():
     print(f"Found {len(book_verses)} books with {sum(len(v) for v in book_verses.values())} verses")
 
     # Write consolidated text
-    with open(output_path, 'w', encoding='utf-8') as out:
+    with span("lxx.write") as s, open(output_path, 'w', encoding='utf-8') as out:
         out.write("=" * 80 + "\n")
         out.write("THE SEPTUAGINT (LXX)\n")
         out.write("Greek Old Testament - Rahlfs 1935 Edition\n")
@@ -133,8 +142,21 @@ def main():
 
                 out.write(f"{chapter}:{verse} {text}\n")
 
+        s.add(bytes=out.tell())
+
     print(f"\nConsolidated LXX written to: {output_path}")
     print(f"File size: {output_path.stat().st_size / 1024 / 1024:.1f} MB")
 
+def main():
+    parser = argparse.ArgumentParser(description="Consolidate LXX_final_main.csv into BIBLE-LXX.txt")
+    parser.add_argument("--csv", default=str(DEFAULT_CSV), help="LXX_final_main.csv to read")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Consolidated text to write")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    with profile_session(args):
+        consolidate_lxx(args.csv, args.output)
+
 if __name__ == "__main__":
     main()
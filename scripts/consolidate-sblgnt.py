@@ -3,15 +3,28 @@
 Consolidate SBLGNT Greek New Testament files into single text file.
 
 The SBLGNT comes as 27 separate files (one per book). This script:
-1. Reads all 27 files in canonical order
-2. Combines them into a single BIBLE-SBLGNT.txt file
+1. Streams each book's XML (<w>, <prefix>, <suffix>, <verse-number>) with
+   iterparse, clearing elements as it goes, in parallel worker processes
+2. Combines them in canonical order into a single BIBLE-SBLGNT.txt file
 3. Preserves verse references and Greek text
 4. Adds book markers for section identification
+5. Writes a token-level table (verse, word index, surface form, prefix,
+   suffix, byte offset into BIBLE-SBLGNT.txt) for word-level alignment
+
+The older plain-text input (data/sblgnt/text/*.txt) is still available
+with --source text.
 """
 
+import argparse
 import os
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).parent))
+from instrumentation import span, add_profile_arguments, profile_session
+
 # Canonical order of NT books
 NT_BOOKS = [
     # Gospels
@@ -52,63 +65,214 @@ NT_BOOKS = [
     ("Rev.txt", "Revelation", "ΑΠΟΚΑΛΥΨΙΣ ΙΩΑΝΝΟΥ"),
 ]
 
-def consolidate_sblgnt():
+SBLGNT_ROOT = Path("sources/SBLGNT/data/sblgnt")
+DEFAULT_OUTPUT = Path("sources/BIBLE-SBLGNT.txt")
+DEFAULT_TOKENS_OUTPUT = Path("sources/BIBLE-SBLGNT.tokens.tsv")
+
+TOKEN_COLUMNS = ["verse", "word_index", "surface", "prefix", "suffix", "byte_offset"]
+
+def render_file_header():
+    """Return the header written once at the top of BIBLE-SBLGNT.txt."""
+    return (
+        "THE GREEK NEW TESTAMENT\n"
+        "SBL Greek New Testament (SBLGNT)\n"
+        "Society of Biblical Literature\n"
+        "Edited by Michael W. Holmes\n"
+        "\n"
+        + "=" * 80 + "\n\n"
+    )
+
+def render_book_header(english_name, greek_title):
+    """Return the section marker block written before each book."""
+    return (
+        "\n" + "=" * 80 + "\n"
+        f"{greek_title}\n"
+        f"({english_name})\n"
+        + "=" * 80 + "\n\n"
+    )
+
+def read_book_text(filepath):
+    """Read one book from data/sblgnt/text, skipping its Greek title line."""
+    chunks = []
+    with open(filepath, 'r', encoding='utf-8') as inf:
+        next(inf, None)
+        for line in inf:
+            line = line.strip()
+            if line:  # Only write non-empty lines
+                chunks.append(line + "\n")
+    return "".join(chunks).encode('utf-8'), []
+
+def parse_book_xml(xml_path):
+    """
+    Stream one book's XML into verse lines and word tokens.
+
+    Returns (body, tokens) where body is the UTF-8 encoded verse lines
+    ("Matt 1:1<TAB>Βίβλος γενέσεως ...") and tokens is a list of
+    (verse, word_index, surface, prefix, suffix, byte_offset) tuples with
+    byte offsets relative to the start of body.
+    """
+    # Verse ids in the XML use full book names ("1 Timothy 1:1"); keep the
+    # file abbreviation so the output matches the text/ consolidation.
+    abbrev = xml_path.stem
+
+    out = bytearray()
+    tokens = []
+    line = bytearray()
+    verse = None
+    word_index = 0
+    pending = None  # (surface, prefix, offset_in_line) awaiting its suffix
+    prefix = ""
+
+    def append(piece):
+        if not piece:
+            return
+        if piece[0] == " " and (not line or line[-1:] == b" " or line[-1:] == b"\t"):
+            piece = piece.lstrip(" ")
+        line.extend(piece.encode('utf-8'))
+
+    def flush_pending(suffix):
+        nonlocal pending
+        if pending is not None:
+            surface, word_prefix, offset = pending
+            tokens.append((verse, word_index, surface, word_prefix, suffix, len(out) + offset))
+            pending = None
+
+    def end_verse():
+        nonlocal line
+        flush_pending("")
+        if verse is not None:
+            out.extend(bytes(line).rstrip(b" "))
+            out.extend(b"\n")
+        line = bytearray()
+
+    context = ET.iterparse(str(xml_path), events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != "end":
+            continue
+
+        tag = elem.tag
+        if tag == "verse-number":
+            end_verse()
+            verse = f"{abbrev} {elem.get('id', '').rsplit(' ', 1)[-1]}"
+            word_index = 0
+            prefix = ""
+            line.extend(f"{verse}\t".encode('utf-8'))
+        elif verse is None:
+            pass  # Book <title>; we write our own header
+        elif tag == "prefix":
+            prefix = elem.text or ""
+            append(prefix)
+        elif tag == "w":
+            flush_pending("")
+            word_index += 1
+            surface = elem.text or ""
+            append(surface)
+            pending = (surface, prefix, len(line) - len(surface.encode('utf-8')))
+            prefix = ""
+        elif tag == "suffix":
+            suffix = elem.text or ""
+            flush_pending(suffix)
+            # Words are always separated by a space in the text/ edition: an
+            # empty <suffix/> stands for it, and a dash ("—", ";—") gets one
+            append(suffix if suffix.endswith(" ") else suffix + " ")
+        elif tag == "p":
+            root.clear()
+            continue
+        else:
+            continue
+
+        elem.clear()
+
+    end_verse()
+    root.clear()
+    return bytes(out), tokens
+
+def book_paths(source):
+    """Yield (path, english_name, greek_title) in canonical NT_BOOKS order."""
+    for filename, english_name, greek_title in NT_BOOKS:
+        stem = Path(filename).stem
+        if source == "xml":
+            path = SBLGNT_ROOT / "xml" / f"{stem}.xml"
+        else:
+            path = SBLGNT_ROOT / "text" / filename
+        yield path, english_name, greek_title
+
+def consolidate_sblgnt(source="xml", output_file=DEFAULT_OUTPUT,
+                       tokens_file=DEFAULT_TOKENS_OUTPUT, workers=None):
     """Consolidate all SBLGNT files into single text file."""
 
-    sblgnt_dir = Path("sources/SBLGNT/data/sblgnt/text")
-    output_file = Path("sources/BIBLE-SBLGNT.txt")
+    source_dir = SBLGNT_ROOT / source
+    output_file = Path(output_file)
 
-    if not sblgnt_dir.exists():
-        print(f"❌ SBLGNT directory not found: {sblgnt_dir}")
+    if not source_dir.exists():
+        print(f"❌ SBLGNT directory not found: {source_dir}")
         return False
 
     print(f"📖 Consolidating SBLGNT Greek New Testament...")
-    print(f"   Source: {sblgnt_dir}")
+    print(f"   Source: {source_dir}")
     print(f"   Output: {output_file}")
+    if source == "xml" and tokens_file:
+        print(f"   Tokens: {tokens_file}")
     print()
 
-    with open(output_file, 'w', encoding='utf-8') as outf:
-        # Write header
-        outf.write("THE GREEK NEW TESTAMENT\n")
-        outf.write("SBL Greek New Testament (SBLGNT)\n")
-        outf.write("Society of Biblical Literature\n")
-        outf.write("Edited by Michael W. Holmes\n")
-        outf.write("\n")
-        outf.write("=" * 80 + "\n\n")
+    books = []
+    for path, english_name, greek_title in book_paths(source):
+        if not path.exists():
+            print(f"⚠️  Missing file: {path.name}")
+            continue
+        books.append((path, english_name, greek_title))
+
+    parse = parse_book_xml if source == "xml" else read_book_text
 
-        books_processed = 0
+    tokens_out = None
+    if source == "xml" and tokens_file:
+        tokens_out = open(tokens_file, 'w', encoding='utf-8', newline='\n')
+        tokens_out.write("\t".join(TOKEN_COLUMNS) + "\n")
 
-        for filename, english_name, greek_title in NT_BOOKS:
-            filepath = sblgnt_dir / filename
+    books_processed = 0
+    token_count = 0
 
-            if not filepath.exists():
-                print(f"⚠️  Missing file: {filename}")
-                continue
+    try:
+        with open(output_file, 'wb') as outf, \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            outf.write(render_file_header().encode('utf-8'))
 
-            print(f"   Adding: {english_name} ({filename})")
+            # map() yields results in submission order, so books are joined
+            # canonically no matter which worker finishes first
+            results = executor.map(parse, [path for path, _, _ in books])
 
-            # Add book header
-            outf.write("\n" + "=" * 80 + "\n")
-            outf.write(f"{greek_title}\n")
-            outf.write(f"({english_name})\n")
-            outf.write("=" * 80 + "\n\n")
+            for path, english_name, greek_title in books:
+                # Parsing runs in the workers; this is the time spent waiting on them
+                with span("sblgnt.parse", bytes=path.stat().st_size):
+                    body, tokens = next(results)
+                print(f"   Adding: {english_name} ({path.name})")
 
-            # Read and write book content
-            with open(filepath, 'r', encoding='utf-8') as inf:
-                lines = inf.readlines()
+                with span("sblgnt.write_text", bytes=len(body)):
+                    outf.write(render_book_header(english_name, greek_title).encode('utf-8'))
+                    base = outf.tell()
+                    outf.write(body)
+                    outf.write(b"\n")  # Add blank line after each book
 
-                # Skip the first line (Greek title) since we added our own header
-                for line in lines[1:]:
-                    line = line.strip()
-                    if line:  # Only write non-empty lines
-                        outf.write(line + "\n")
+                if tokens_out:
+                    with span("sblgnt.write_tokens", lines=len(tokens)):
+                        for verse, word_index, surface, prefix, suffix, offset in tokens:
+                            tokens_out.write(
+                                f"{verse}\t{word_index}\t{surface}\t{prefix}\t{suffix}\t{base + offset}\n"
+                            )
+                    token_count += len(tokens)
 
-            outf.write("\n")  # Add blank line after each book
-            books_processed += 1
+                books_processed += 1
+    finally:
+        if tokens_out:
+            tokens_out.close()
 
     print()
     print(f"✅ Consolidated {books_processed}/27 NT books")
     print(f"📄 Output: {output_file}")
+    if tokens_out:
+        print(f"🔤 Tokens: {token_count} words -> {tokens_file}")
 
     # Get file size
     size_mb = output_file.stat().st_size / (1024 * 1024)
@@ -116,5 +280,24 @@ def consolidate_sblgnt():
 
     return True
 
+def main():
+    parser = argparse.ArgumentParser(description="Consolidate SBLGNT books into BIBLE-SBLGNT.txt")
+    parser.add_argument("--source", choices=["xml", "text"], default="xml",
+                        help="Read data/sblgnt/xml (default) or data/sblgnt/text")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Consolidated text output")
+    parser.add_argument("--tokens-output", default=str(DEFAULT_TOKENS_OUTPUT),
+                        help="Token-level TSV output (xml source only)")
+    parser.add_argument("--no-tokens", action="store_true", help="Skip the token-level output")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    tokens_file = None if args.no_tokens else Path(args.tokens_output)
+    with profile_session(args):
+        success = consolidate_sblgnt(args.source, Path(args.output), tokens_file, args.workers)
+    raise SystemExit(0 if success else 1)
+
 if __name__ == '__main__':
-    consolidate_sblgnt()
+    main()
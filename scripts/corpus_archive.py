@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Seekable compressed corpus archive with random access by section.
+
+`pack` writes the manifest texts into one file of independently
+compressed frames: one per metadata section (split further when a
+section exceeds --block-kb) or, with --frames block, one per fixed-size
+block. Every frame is compressed against a shared dictionary trained on
+samples from all frames, to win back some of the ratio lost by
+compressing small frames separately.
+
+Codecs:
+  zstd  zstandard's trained dictionary (used when the zstandard package
+        is installed)
+  zlib  stdlib deflate with a preset dictionary of the lines that repeat
+        most across the samples (boilerplate, running heads), up to the
+        32 KB deflate window
+
+Layout: magic, dictionary, frames, frame table (data offset, compressed
+length, offset in text, length per frame), then a JSON index with the
+embedded manifest.yaml, each text's metadata file, size, sha256 and
+section spans, and a fixed-size footer locating the table and index.
+
+A reader (CorpusArchive) memory-maps the archive and decompresses only
+the frames overlapping a requested byte range or section, keeping a few
+recently used frames decoded.
+
+Usage:
+    python scripts/corpus_archive.py pack                         # all manifest texts
+    python scripts/corpus_archive.py pack --codec zlib --block-kb 128
+    python scripts/corpus_archive.py info
+    python scripts/corpus_archive.py cat anf-01 --section 3
+    python scripts/corpus_archive.py cat npnf1-01 --range 0:4096
+    python scripts/corpus_archive.py verify
+
+Library use:
+    with CorpusArchive("build/corpus-archive.bin") as archive:
+        text = archive.section("anf-01", 3).decode("utf-8")
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from pathlib import Path
+import logging
+
+import yaml
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing
+from embedding_cache import split_range, text_segments
+from instrumentation import span, add_profile_arguments, profile_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b"IGARCHV1"
+ARCHIVE_VERSION = 1
+DEFAULT_ARCHIVE = Path("build/corpus-archive.bin")
+DEFAULT_BLOCK_KB = 256
+DEFAULT_DICT_KB = {"zstd": 112, "zlib": 32}
+DEFAULT_LEVEL = {"zstd": 19, "zlib": 9}
+ZLIB_WINDOW = 32 * 1024
+SAMPLE_BYTES = 4096
+DEFAULT_CACHED_FRAMES = 16
+
+FRAME_RECORD = struct.Struct('<QQQQ')  # data offset, compressed length, offset in text, length
+FOOTER = struct.Struct('<QQQQ8s')      # table offset, frame count, index offset, index length, magic
+
+
+def available_codec(codec="auto"):
+    if codec == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError("The zstd codec needs the zstandard package (pip install zstandard)")
+    return codec
+
+
+def train_dictionary(codec, samples, size):
+    """Build a shared dictionary of at most `size` bytes from sample frames."""
+    if not samples:
+        return b""
+    if codec == "zstd":
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            logger.warning(f"Dictionary training failed ({e}); compressing without a dictionary")
+            return b""
+
+    # Deflate can only refer back 32 KB, and nearer matches are cheaper, so
+    # the most valuable lines go last
+    lines = Counter()
+    for sample in samples:
+        for line in sample.splitlines(keepends=True):
+            if len(line.strip()) >= 8:
+                lines[line] += 1
+    chosen = []
+    total = 0
+    for line, count in sorted(lines.items(), key=lambda item: item[1] * len(item[0]), reverse=True):
+        if count < 2 or total + len(line) > min(size, ZLIB_WINDOW):
+            continue
+        chosen.append(line)
+        total += len(line)
+    return b"".join(reversed(chosen))
+
+
+def make_compressor(codec, dictionary, level):
+    if codec == "zstd":
+        compressor = zstandard.ZstdCompressor(
+            level=level, dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None)
+        return compressor.compress
+
+    def compress(data):
+        if dictionary:
+            c = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, zdict=dictionary)
+        else:
+            c = zlib.compressobj(level)
+        return c.compress(data) + c.flush()
+    return compress
+
+
+def make_decompressor(codec, dictionary):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This archive is zstd-compressed; install the zstandard package to read it")
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None)
+        return decompressor.decompress
+
+    def decompress(frame):
+        d = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return d.decompress(frame) + d.flush()
+    return decompress
+
+
+def plan_frames(data, metadata, frames="section", block_bytes=DEFAULT_BLOCK_KB * 1024):
+    """
+    Return (frame ranges, section spans) for one text. Frames follow the
+    located sections unless frames == "block"; either way no frame is
+    longer than block_bytes, and cuts fall on paragraph breaks if possible.
+    """
+    text_info = (metadata or {}).get("text_info") or {}
+    segments = text_segments(data, text_info.get("sections") or [])
+    sections = [[index, start, end] for start, end, section, index in segments if section is not None]
+    if frames == "block":
+        segments = [(0, len(data), None, None)]
+    ranges = []
+    for start, end, _, _ in segments:
+        ranges.extend(split_range(data, start, end, block_bytes))
+    return ranges, sections
+
+
+def manifest_entries(corpus_root, text_ids=None):
+    with open(Path(corpus_root) / "manifest.yaml", 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f)
+    for entry in manifest.get("texts", []):
+        if "file" in entry and (not text_ids or entry["id"] in text_ids):
+            yield entry
+
+
+def read_text(files, corpus_root, entry):
+    """Return (data, metadata text) for a manifest entry, or None if unreadable."""
+    try:
+        data = files.read_bytes(entry["file"])
+    except (LfsObjectMissing, FileNotFoundError) as e:
+        logger.warning(f"{entry['id']}: skipped ({e})")
+        return None
+    metadata_text = None
+    meta_path = Path(corpus_root) / entry.get("metadata", "")
+    if "metadata" in entry and meta_path.is_file():
+        metadata_text = meta_path.read_text(encoding='utf-8')
+    return data, metadata_text
+
+
+def pack_archive(corpus_root=".", archive_path=None, text_ids=None, codec="auto", frames="section",
+                 block_kb=DEFAULT_BLOCK_KB, dict_kb=None, level=None):
+    """Write the archive; return its index (without the frame table)."""
+    corpus_root = Path(corpus_root)
+    archive_path = Path(archive_path) if archive_path else corpus_root / DEFAULT_ARCHIVE
+    codec = available_codec(codec)
+    level = level if level is not None else DEFAULT_LEVEL[codec]
+    dict_bytes = (dict_kb if dict_kb is not None else DEFAULT_DICT_KB[codec]) * 1024
+    block_bytes = block_kb * 1024
+    files = CorpusFiles(corpus_root)
+    entries = list(manifest_entries(corpus_root, text_ids))
+
+    # Pass 1: plan frames and sample them for the dictionary
+    plans = {}
+    samples = []
+    with span("archive.plan") as s:
+        for entry in entries:
+            loaded = read_text(files, corpus_root, entry)
+            if loaded is None:
+                continue
+            data, metadata_text = loaded
+            s.add(bytes=len(data))
+            ranges, sections = plan_frames(data, yaml.safe_load(metadata_text) if metadata_text else None,
+                                           frames, block_bytes)
+            plans[entry["id"]] = (ranges, sections)
+            samples.extend(bytes(data[start:min(end, start + SAMPLE_BYTES)]) for start, end in ranges)
+
+    with span("archive.train", lines=len(samples)):
+        dictionary = train_dictionary(codec, samples, dict_bytes) if dict_bytes else b""
+    del samples
+    compress = make_compressor(codec, dictionary, level)
+
+    # Pass 2: compress frames
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = archive_path.with_name(archive_path.name + ".tmp")
+    texts = []
+    table = bytearray()
+    frame_count = 0
+    raw_total = 0
+    with open(tmp_path, 'wb') as out:
+        out.write(ARCHIVE_MAGIC)
+        dictionary_offset = out.tell()
+        out.write(dictionary)
+        for entry in entries:
+            if entry["id"] not in plans:
+                continue
+            data, metadata_text = read_text(files, corpus_root, entry)
+            ranges, sections = plans[entry["id"]]
+            first_frame = frame_count
+            with span("archive.compress", bytes=len(data)):
+                for start, end in ranges:
+                    frame = compress(bytes(data[start:end]))
+                    table += FRAME_RECORD.pack(out.tell(), len(frame), start, end - start)
+                    out.write(frame)
+                    frame_count += 1
+            raw_total += len(data)
+            texts.append({
+                "id": entry["id"],
+                "file": entry["file"],
+                "metadata_file": entry.get("metadata"),
+                "metadata": metadata_text,
+                "size": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "first_frame": first_frame,
+                "frame_count": frame_count - first_frame,
+                "sections": sections,
+            })
+
+        table_offset = out.tell()
+        out.write(table)
+        index = {
+            "version": ARCHIVE_VERSION,
+            "codec": codec,
+            "level": level,
+            "frames": frames,
+            "block_bytes": block_bytes,
+            "dictionary": [dictionary_offset, len(dictionary)],
+            "manifest": (corpus_root / "manifest.yaml").read_text(encoding='utf-8'),
+            "texts": texts,
+        }
+        index_bytes = json.dumps(index, ensure_ascii=False).encode('utf-8')
+        index_offset = out.tell()
+        out.write(index_bytes)
+        out.write(FOOTER.pack(table_offset, frame_count, index_offset, len(index_bytes), ARCHIVE_MAGIC))
+    os.replace(tmp_path, archive_path)
+
+    size = archive_path.stat().st_size
+    logger.info(f"Packed {len(texts)} texts ({raw_total / 1024 / 1024:.1f} MB) into {frame_count} {codec} "
+                f"frames with a {len(dictionary) / 1024:.1f} KB dictionary: {size / 1024 / 1024:.1f} MB "
+                f"({size / max(raw_total, 1):.1%}) -> {archive_path}")
+    return index
+
+
+class CorpusArchive:
+    """Random access to the texts in an archive written by pack_archive()."""
+
+    def __init__(self, path=DEFAULT_ARCHIVE, cached_frames=DEFAULT_CACHED_FRAMES):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        table_offset, frame_count, index_offset, index_length, magic = FOOTER.unpack_from(
+            self._mmap, len(self._mmap) - FOOTER.size)
+        if self._mmap[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC or magic != ARCHIVE_MAGIC:
+            raise ValueError(f"Not a corpus archive: {self.path}")
+        self.index = json.loads(self._mmap[index_offset:index_offset + index_length].decode('utf-8'))
+        if self.index.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"{self.path}: unsupported archive version {self.index.get('version')}")
+
+        self._table = memoryview(self._mmap)[table_offset:table_offset + frame_count * FRAME_RECORD.size].cast('Q')
+        dictionary_offset, dictionary_length = self.index["dictionary"]
+        dictionary = bytes(self._mmap[dictionary_offset:dictionary_offset + dictionary_length])
+        self._decompress = make_decompressor(self.index["codec"], dictionary)
+        self.texts = {text["id"]: text for text in self.index["texts"]}
+        self._starts = {}
+        self._cache = OrderedDict()
+        self.cached_frames = cached_frames
+        self.frames_decompressed = 0
+
+    def close(self):
+        self._table.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def manifest(self):
+        """The manifest.yaml the archive was packed with."""
+        return yaml.safe_load(self.index["manifest"])
+
+    def metadata(self, text_id):
+        """A text's parsed metadata file, or None."""
+        text = self._text(text_id)["metadata"]
+        return yaml.safe_load(text) if text else None
+
+    def _text(self, text_id):
+        try:
+            return self.texts[text_id]
+        except KeyError:
+            raise KeyError(f"{text_id} is not in {self.path}") from None
+
+    def frame_range(self, frame):
+        """(offset in text, length) of a frame."""
+        return self._table[4 * frame + 2], self._table[4 * frame + 3]
+
+    def frame(self, frame):
+        """Decompressed bytes of one frame."""
+        data = self._cache.get(frame)
+        if data is not None:
+            self._cache.move_to_end(frame)
+            return data
+        offset, length = self._table[4 * frame], self._table[4 * frame + 1]
+        data = self._decompress(self._mmap[offset:offset + length])
+        self.frames_decompressed += 1
+        self._cache[frame] = data
+        if len(self._cache) > self.cached_frames:
+            self._cache.popitem(last=False)
+        return data
+
+    def read(self, text_id, start=0, end=None):
+        """Bytes [start, end) of a text, decompressing only the frames they span."""
+        text = self._text(text_id)
+        end = text["size"] if end is None else min(end, text["size"])
+        if start >= end:
+            return b""
+        first = text["first_frame"]
+        starts = self._starts.get(text_id)
+        if starts is None:
+            starts = self._starts[text_id] = [self._table[4 * frame + 2]
+                                             for frame in range(first, first + text["frame_count"])]
+        pieces = []
+        for frame in range(first + bisect_right(starts, start) - 1, first + text["frame_count"]):
+            frame_start, frame_length = self.frame_range(frame)
+            if frame_start >= end:
+                break
+            data = self.frame(frame)
+            pieces.append(data[max(start - frame_start, 0):end - frame_start])
+        return b"".join(pieces)
+
+    def section(self, text_id, index):
+        """Bytes of the index-th section in the text's metadata."""
+        for section_index, start, end in self._text(text_id)["sections"]:
+            if section_index == index:
+                return self.read(text_id, start, end)
+        raise KeyError(f"{text_id} has no located section {index}")
+
+    def verify(self, text_id):
+        """True if the text decompresses to its recorded size and sha256."""
+        text = self._text(text_id)
+        digest = hashlib.sha256()
+        size = 0
+        for frame in range(text["first_frame"], text["first_frame"] + text["frame_count"]):
+            data = self._decompress(self._mmap[self._table[4 * frame]:
+                                               self._table[4 * frame] + self._table[4 * frame + 1]])
+            digest.update(data)
+            size += len(data)
+        return size == text["size"] and digest.hexdigest() == text["sha256"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seekable compressed corpus archive")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--archive", help=f"Archive file (default: {DEFAULT_ARCHIVE})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = subparsers.add_parser("pack", help="Write the manifest texts into an archive")
+    pack_parser.add_argument("--ids", nargs="+", help="Only these text ids (default: every manifest text)")
+    pack_parser.add_argument("--codec", choices=("auto", "zstd", "zlib"), default="auto",
+                             help="Compression (auto: zstd if installed, else zlib)")
+    pack_parser.add_argument("--level", type=int, help="Compression level (default: zstd 19, zlib 9)")
+    pack_parser.add_argument("--frames", choices=("section", "block"), default="section",
+                             help="One frame per section, or fixed-size blocks")
+    pack_parser.add_argument("--block-kb", type=int, default=DEFAULT_BLOCK_KB, help="Maximum frame size")
+    pack_parser.add_argument("--dict-kb", type=int, help="Dictionary size, 0 for none (default: zstd 112, zlib 32)")
+    add_profile_arguments(pack_parser)
+
+    subparsers.add_parser("info", help="Show archive contents and compression")
+
+    cat_parser = subparsers.add_parser("cat", help="Print a text, section or byte range")
+    cat_parser.add_argument("text_id", help="Text id")
+    group = cat_parser.add_mutually_exclusive_group()
+    group.add_argument("--section", type=int, help="Section index in the text's metadata")
+    group.add_argument("--range", metavar="START:END", help="Byte range")
+
+    subparsers.add_parser("verify", help="Check every text against its recorded sha256")
+
+    args = parser.parse_args()
+    archive_path = Path(args.archive) if args.archive else Path(args.corpus_root) / DEFAULT_ARCHIVE
+
+    if args.command == "pack":
+        try:
+            with profile_session(args):
+                pack_archive(args.corpus_root, archive_path, args.ids, args.codec, args.frames,
+                             args.block_kb, args.dict_kb, args.level)
+        except RuntimeError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        return
+
+    if not archive_path.exists():
+        logger.error(f"Archive not found at {archive_path}; run 'pack' first")
+        sys.exit(1)
+
+    with CorpusArchive(archive_path) as archive:
+        if args.command == "info":
+            index = archive.index
+            print(f"{archive_path}: {index['codec']} level {index['level']}, {index['frames']} frames, "
+                  f"{index['dictionary'][1] / 1024:.1f} KB dictionary")
+            print(f"{'Text':<20} {'Size':>12} {'Frames':>7} {'Compressed':>12} {'Ratio':>7}")
+            for text in index["texts"]:
+                frames = range(text["first_frame"], text["first_frame"] + text["frame_count"])
+                compressed = sum(archive._table[4 * frame + 1] for frame in frames)
+                print(f"{text['id']:<20} {text['size']:>12,} {text['frame_count']:>7} {compressed:>12,} "
+                      f"{compressed / max(text['size'], 1):>7.1%}")
+        elif args.command == "cat":
+            try:
+                if args.section is not None:
+                    data = archive.section(args.text_id, args.section)
+                elif args.range:
+                    start, _, end = args.range.partition(":")
+                    data = archive.read(args.text_id, int(start or 0), int(end) if end else None)
+                else:
+                    data = archive.read(args.text_id)
+            except KeyError as e:
+                logger.error(e.args[0])
+                sys.exit(1)
+            sys.stdout.buffer.write(data)
+        elif args.command == "verify":
+            failed = [text_id for text_id in archive.texts if not archive.verify(text_id)]
+            for text_id in failed:
+                logger.error(f"{text_id}: content does not match its recorded sha256")
+            logger.info(f"Verified {len(archive.texts) - len(failed)}/{len(archive.texts)} texts")
+            sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Chunk-level diff between two corpus snapshots.
+
+A snapshot is a directory (a checkout, or a copy of one) or a git revision
+of the corpus repository. The diff narrows down what changed level by
+level and only chunks what it has to:
+
+  1. manifest entries: texts added, removed, or no longer/newly active
+  2. files: texts whose entry, metadata file and content hash (the git-lfs
+     oid, or the sha256 of the file) are all unchanged are skipped unread;
+     texts with the same content hash and the same section start_markers
+     only changed section fields, which become per-section "metadata"
+     operations, also without reading the text
+  3. sections: the remaining texts are split at their section starts and
+     segments with the same bytes and the same attribution are skipped
+  4. chunks: changed segments are chunked as in embedding_cache.py and
+     compared by chunk hash
+
+The result is written as JSON lines, one operation per line:
+
+    {"op": "upsert", "text_id": ..., "hash": ..., <chunk record>}
+    {"op": "delete", "text_id": ..., "hash": ...}
+    {"op": "metadata", "text_id": ..., "hash": ..., "fields": {"composition_year": 110}}
+    {"op": "shift", "text_id": ..., "start_offset": ..., "end_offset": ..., "delta": ...}
+
+Chunks are identified by (text_id, hash). "metadata" carries only the
+changed fields of a chunk whose text is unchanged (a corrected
+composition_year, or offsets moved by an edit in the same section); with
+"section_id" in place of "hash" it applies to every chunk of that section.
+"shift" moves the offsets of all chunks of an unchanged section that start
+in [start_offset, end_offset) of the old snapshot by delta bytes.
+
+Usage:
+    python scripts/corpus_diff.py HEAD~1 HEAD                 # two revisions
+    python scripts/corpus_diff.py v2.1.0 .                    # a revision and the working tree
+    python scripts/corpus_diff.py /tmp/corpus-old /tmp/corpus-new --output build/diff.jsonl
+
+A text whose bytes are needed but only available as a git-lfs pointer
+without its object is skipped with a warning.
+"""
+
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing, MAX_POINTER_SIZE, parse_lfs_pointer_bytes
+from embedding_cache import (DEFAULT_CHUNK_BYTES, chunk_attribution, iter_segment_chunks,
+                             text_segments)
+from instrumentation import span, add_profile_arguments, profile_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = Path("build/corpus-diff.jsonl")
+
+# Chunk record fields that identify a chunk rather than describe it
+CHUNK_KEY_FIELDS = ("hash", "text_id", "content")
+
+
+class DirectorySnapshot:
+    """A corpus directory; git-lfs pointers are resolved through CorpusFiles."""
+
+    def __init__(self, root, lfs_store=None):
+        self.files = CorpusFiles(root, lfs_store)
+        self.label = str(self.files.corpus_root)
+        self._content_ids = {}
+
+    def exists(self, path):
+        return (self.files.corpus_root / path).exists()
+
+    def read_small(self, path):
+        """Read a manifest or metadata file as it is stored."""
+        with open(self.files.corpus_root / path, 'rb') as f:
+            return f.read()
+
+    def content_id(self, path):
+        """Return the LFS oid for a pointer, else the sha256 of the file."""
+        if path not in self._content_ids:
+            pointer = self.files.pointer(path)
+            if pointer is not None:
+                self._content_ids[path] = pointer.oid
+            else:
+                digest = hashlib.sha256()
+                with open(self.files.corpus_root / path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+                self._content_ids[path] = digest.hexdigest()
+        return self._content_ids[path]
+
+    def read_bytes(self, path):
+        return self.files.read_bytes(path)
+
+
+class GitSnapshot:
+    """A revision of the corpus repository, read with git without a checkout."""
+
+    def __init__(self, repo, rev, lfs_store=None):
+        self.repo = Path(repo).resolve()
+        self.rev = rev
+        self.files = CorpusFiles(self.repo, lfs_store)
+        self.label = rev
+        result = subprocess.run(["git", "ls-tree", "-r", "-l", "-z", rev], cwd=self.repo,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise ValueError(f"{rev}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        # <mode> blob <sha> <size>\t<path>
+        self.blobs = {}
+        for line in result.stdout.decode('utf-8').split('\0'):
+            if not line:
+                continue
+            info, _, path = line.partition('\t')
+            _, kind, sha, size = info.split()
+            if kind == "blob":
+                self.blobs[path] = (sha, int(size))
+        self._content_ids = {}
+
+    def exists(self, path):
+        return path in self.blobs
+
+    def read_small(self, path):
+        result = subprocess.run(["git", "cat-file", "blob", self.blobs[path][0]], cwd=self.repo,
+                                stdout=subprocess.PIPE, check=True)
+        return result.stdout
+
+    def content_id(self, path):
+        sha, size = self.blobs[path]
+        if sha not in self._content_ids:
+            blob = self.read_small(path)
+            pointer = parse_lfs_pointer_bytes(blob) if size <= MAX_POINTER_SIZE else None
+            self._content_ids[sha] = pointer.oid if pointer else hashlib.sha256(blob).hexdigest()
+        return self._content_ids[sha]
+
+    def read_bytes(self, path):
+        blob = self.read_small(path)
+        pointer = parse_lfs_pointer_bytes(blob) if len(blob) <= MAX_POINTER_SIZE else None
+        if pointer is None:
+            return blob
+        return self.files.read_object(pointer, f"{self.rev}:{path}")
+
+
+def open_snapshot(spec, repo, lfs_store=None):
+    """A directory if spec names one, else a git revision of repo."""
+    if Path(spec).is_dir():
+        return DirectorySnapshot(spec, lfs_store)
+    return GitSnapshot(repo, spec, lfs_store)
+
+
+def active_texts(snapshot):
+    """Return {text_id: manifest entry} for the snapshot's ingested texts."""
+    manifest = yaml.safe_load(snapshot.read_small("manifest.yaml"))
+    return {
+        entry["id"]: entry for entry in manifest.get("texts", [])
+        if "file" in entry and entry.get("status", "active") == "active"
+    }
+
+
+def load_sections(snapshot, text_entry):
+    path = text_entry.get("metadata")
+    if not path or not snapshot.exists(path):
+        return []
+    metadata = yaml.safe_load(snapshot.read_small(path)) or {}
+    return (metadata.get("text_info") or {}).get("sections") or []
+
+
+def text_fingerprint(snapshot, text_entry):
+    """Everything a text's chunks depend on, without reading the text."""
+    metadata = text_entry.get("metadata")
+    return (
+        text_entry,
+        snapshot.content_id(text_entry["file"]),
+        snapshot.content_id(metadata) if metadata and snapshot.exists(metadata) else None,
+    )
+
+
+def chunk_metadata(record):
+    return {k: v for k, v in record.items() if k not in CHUNK_KEY_FIELDS}
+
+
+class TextSide:
+    """One snapshot's view of a text: its bytes and section segments."""
+
+    def __init__(self, snapshot, text_entry, chunk_bytes, data=None):
+        self.entry = text_entry
+        self.chunk_bytes = chunk_bytes
+        if data is None:
+            with span("diff.read") as s:
+                data = snapshot.read_bytes(text_entry["file"])
+                s.add(bytes=len(data))
+        self.data = data
+        with span("diff.segments", bytes=len(self.data)):
+            self.segments = text_segments(self.data, load_sections(snapshot, text_entry))
+            self.keys = [self.segment_key(segment) for segment in self.segments]
+
+    def segment_key(self, segment):
+        start, end, section, index = segment
+        attribution = chunk_attribution(self.entry, section, index)
+        return (hashlib.sha256(self.data[start:end]).hexdigest(),
+                json.dumps(attribution, sort_keys=True, default=str))
+
+    def chunks(self, segment):
+        with span("diff.chunk", bytes=segment[1] - segment[0]):
+            return list(iter_segment_chunks(self.entry, self.data, segment, self.chunk_bytes))
+
+
+def diff_text(old, new):
+    """Yield operations turning old's chunks into new's."""
+    text_id = new.entry["id"]
+
+    # Segments present on both sides keep their chunks; only offsets move
+    old_by_key = {}
+    for segment, key in zip(old.segments, old.keys):
+        old_by_key.setdefault(key, []).append(segment)
+    remaining = Counter(old.keys) & Counter(new.keys)
+    new_unchanged = []
+    new_changed = []
+    for segment, key in zip(new.segments, new.keys):
+        if remaining[key]:
+            remaining[key] -= 1
+            old_segment = old_by_key[key].pop(0)
+            new_unchanged.append(segment)
+            delta = segment[0] - old_segment[0]
+            if delta:
+                yield {"op": "shift", "text_id": text_id, "start_offset": old_segment[0],
+                       "end_offset": old_segment[1], "delta": delta}
+        else:
+            new_changed.append(segment)
+    old_changed = [segment for segments in old_by_key.values() for segment in segments]
+
+    old_chunks = {}
+    for segment in old_changed:
+        for record in old.chunks(segment):
+            old_chunks.setdefault(record["hash"], record)
+    new_chunks = {}
+    for segment in new_changed:
+        for record in new.chunks(segment):
+            new_chunks.setdefault(record["hash"], record)
+
+    for chunk_hash, record in new_chunks.items():
+        before = old_chunks.get(chunk_hash)
+        if before is None:
+            yield dict({"op": "upsert"}, **record)
+            continue
+        previous = chunk_metadata(before)
+        fields = {k: v for k, v in chunk_metadata(record).items() if previous.get(k) != v}
+        if fields:
+            yield {"op": "metadata", "text_id": text_id, "hash": chunk_hash, "fields": fields}
+
+    deleted = [h for h in old_chunks if h not in new_chunks]
+    if deleted:
+        # A chunk text repeated in an unchanged segment must survive
+        kept = {record["hash"] for segment in new_unchanged for record in new.chunks(segment)}
+        for chunk_hash in deleted:
+            if chunk_hash not in kept:
+                yield {"op": "delete", "text_id": text_id, "hash": chunk_hash}
+
+
+def whole_text(side, op):
+    for segment in side.segments:
+        for record in side.chunks(segment):
+            if op == "upsert":
+                yield dict({"op": "upsert"}, **record)
+            else:
+                yield {"op": "delete", "text_id": record["text_id"], "hash": record["hash"]}
+
+
+def diff_sections(text_id, before, after, old_sections, new_sections):
+    """
+    Per-section "metadata" operations between two section lists over the
+    same bytes, or None if chunk boundaries or unsectioned chunks may differ.
+    """
+    if [s.get("start_marker") for s in old_sections] != [s.get("start_marker") for s in new_sections]:
+        return None
+    if chunk_attribution(before, None) != chunk_attribution(after, None):
+        return None
+    operations = []
+    for index, (old_section, new_section) in enumerate(zip(old_sections, new_sections)):
+        previous = chunk_attribution(before, old_section, index)
+        fields = {k: v for k, v in chunk_attribution(after, new_section, index).items() if previous.get(k) != v}
+        if fields:
+            operations.append({"op": "metadata", "text_id": text_id,
+                               "section_id": previous["section_id"], "fields": fields})
+    return operations
+
+
+def diff_snapshots(old, new, chunk_bytes=DEFAULT_CHUNK_BYTES, text_ids=None):
+    """Yield JSON-serializable operations; counts are logged per level."""
+    with span("diff.manifest"):
+        old_texts = active_texts(old)
+        new_texts = active_texts(new)
+    ids = sorted(set(old_texts) | set(new_texts))
+    if text_ids:
+        ids = [text_id for text_id in ids if text_id in text_ids]
+
+    for text_id in ids:
+        before = old_texts.get(text_id)
+        after = new_texts.get(text_id)
+        try:
+            yield from _diff_one(old, new, text_id, before, after, chunk_bytes)
+        except LfsObjectMissing as e:
+            logger.warning(f"{text_id}: skipped ({e})")
+
+
+def _diff_one(old, new, text_id, before, after, chunk_bytes):
+    # Operations are collected first so a missing LFS object skips the whole text
+    if before is None:
+        logger.info(f"{text_id}: added")
+        yield from list(whole_text(TextSide(new, after, chunk_bytes), "upsert"))
+        return
+    if after is None:
+        logger.info(f"{text_id}: removed")
+        yield from list(whole_text(TextSide(old, before, chunk_bytes), "delete"))
+        return
+
+    with span("diff.fingerprint"):
+        same = text_fingerprint(old, before) == text_fingerprint(new, after)
+    if same:
+        return
+    # Same bytes: only the section table or manifest entry changed
+    same_file = old.content_id(before["file"]) == new.content_id(after["file"])
+    if same_file:
+        operations = diff_sections(text_id, before, after, load_sections(old, before), load_sections(new, after))
+        if operations is not None:
+            logger.info(f"{text_id}: section metadata changed")
+            yield from operations
+            return
+    old_side = TextSide(old, before, chunk_bytes)
+    new_side = TextSide(new, after, chunk_bytes, old_side.data if same_file else None)
+    logger.info(f"{text_id}: changed")
+    yield from list(diff_text(old_side, new_side))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk-level diff between two corpus snapshots")
+    parser.add_argument("old", help="Old snapshot: a corpus directory or a git revision")
+    parser.add_argument("new", help="New snapshot: a corpus directory or a git revision")
+    parser.add_argument("--repo", default=".", help="Repository for git revisions")
+    parser.add_argument("--lfs-store", help="LFS object directory (default: <repo>/.git/lfs/objects)")
+    parser.add_argument("--ids", nargs="+", help="Only these text ids")
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES,
+                        help="Chunk size; must match the one used for ingestion")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Operations (JSON lines), or - for stdout")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    try:
+        old = open_snapshot(args.old, args.repo, args.lfs_store)
+        new = open_snapshot(args.new, args.repo, args.lfs_store)
+    except ValueError as e:
+        parser.error(str(e))
+
+    counts = Counter()
+    with profile_session(args):
+        if args.output == "-":
+            out = sys.stdout
+        else:
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            out = open(args.output, 'w', encoding='utf-8')
+        try:
+            for operation in diff_snapshots(old, new, args.chunk_bytes, args.ids):
+                counts[operation["op"]] += 1
+                out.write(json.dumps(operation, ensure_ascii=False) + "\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    summary = ", ".join(f"{counts[op]} {op}" for op in ("upsert", "delete", "metadata", "shift"))
+    logger.info(f"{old.label} -> {new.label}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Git-LFS-aware access to corpus text files.
+
+In a checkout without `git lfs pull`, every sources/*.txt is a small
+pointer file:
+
+    version https://git-lfs.github.com/spec/v1
+    oid sha256:4a888e...
+    size 3151244
+
+CorpusFiles recognizes these pointers and resolves them on demand from a
+local LFS object store: by default the repository's .git/lfs/objects, or
+any directory given with --lfs-store / IGNARIA_LFS_STORE that uses the
+same <oid[:2]>/<oid[2:4]>/<oid> layout (a flat <oid> layout also works).
+Content is checked against the pointer's sha256 and size while it is
+streamed, and only the volumes a job asks for are hydrated.
+
+Usage:
+    python scripts/corpus_files.py status               # which texts are pointers
+    python scripts/corpus_files.py hydrate anf-01 npnf2-07
+    python scripts/corpus_files.py hydrate anf-01 --fetch   # git lfs pull if not in the store
+    python scripts/corpus_files.py verify               # check hydrated texts against the index
+
+Library use:
+    files = CorpusFiles(".")
+    text = files.read_text("sources/ANF-01.txt")      # pointer or not
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+from collections import namedtuple
+from pathlib import Path
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LFS_SPEC = b"version https://git-lfs.github.com/spec/v1\n"
+# Real pointers are ~130 bytes; anything larger is content
+MAX_POINTER_SIZE = 1024
+CHUNK_SIZE = 1 << 20
+
+LfsPointer = namedtuple("LfsPointer", ["oid", "size"])
+
+
+class LfsObjectMissing(FileNotFoundError):
+    """Raised when a pointer's object is not in the local LFS store."""
+
+
+class LfsIntegrityError(ValueError):
+    """Raised when LFS content does not match its pointer's sha256 or size."""
+
+
+def parse_lfs_pointer(path):
+    """Return an LfsPointer if path is a git-lfs pointer file, else None."""
+    path = Path(path)
+    try:
+        if path.stat().st_size > MAX_POINTER_SIZE:
+            return None
+        with open(path, 'rb') as f:
+            data = f.read(MAX_POINTER_SIZE)
+    except FileNotFoundError:
+        return None
+    return parse_lfs_pointer_bytes(data)
+
+
+def parse_lfs_pointer_bytes(data):
+    """Parse pointer file content; return an LfsPointer or None."""
+    if not data.startswith(LFS_SPEC):
+        return None
+
+    fields = {}
+    for line in data[len(LFS_SPEC):].decode('ascii', errors='replace').splitlines():
+        key, _, value = line.partition(' ')
+        fields[key] = value
+    oid = fields.get("oid", "")
+    if not oid.startswith("sha256:") or not fields.get("size", "").isdigit():
+        return None
+    return LfsPointer(oid[len("sha256:"):], int(fields["size"]))
+
+
+class _VerifyingReader:
+    """Binary file wrapper that hashes what is read and checks it at EOF."""
+
+    def __init__(self, f, pointer, name):
+        self._f = f
+        self._pointer = pointer
+        self._name = name
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._checked = False
+
+    def read(self, n=-1):
+        data = self._f.read(n)
+        self._digest.update(data)
+        self._size += len(data)
+        if not data or n is None or n < 0:
+            self._check()
+        return data
+
+    def readable(self):
+        return True
+
+    def _check(self):
+        if self._checked:
+            return
+        self._checked = True
+        if self._size != self._pointer.size:
+            raise LfsIntegrityError(
+                f"{self._name}: expected {self._pointer.size} bytes, got {self._size}"
+            )
+        if self._digest.hexdigest() != self._pointer.oid:
+            raise LfsIntegrityError(f"{self._name}: sha256 does not match oid {self._pointer.oid}")
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class CorpusFiles:
+    def __init__(self, corpus_root=".", lfs_store=None):
+        self.corpus_root = Path(corpus_root).resolve()
+        store = lfs_store or os.environ.get("IGNARIA_LFS_STORE")
+        self.lfs_store = Path(store) if store else self.corpus_root / ".git" / "lfs" / "objects"
+
+    def pointer(self, path):
+        return parse_lfs_pointer(self._path(path))
+
+    def is_pointer(self, path):
+        return self.pointer(path) is not None
+
+    def _path(self, path):
+        path = Path(path)
+        return path if path.is_absolute() else self.corpus_root / path
+
+    def object_path(self, pointer):
+        """Return the store path for a pointer's object, or None if absent."""
+        oid = pointer.oid
+        for candidate in (self.lfs_store / oid[:2] / oid[2:4] / oid, self.lfs_store / oid):
+            if candidate.exists():
+                return candidate
+        return None
+
+    def open_binary(self, path, fetch=False):
+        """
+        Open a corpus file for binary reading. Pointers are resolved from the
+        LFS store and their content is verified as it is read.
+        """
+        path = self._path(path)
+        pointer = parse_lfs_pointer(path)
+        if pointer is None:
+            return open(path, 'rb')
+
+        object_path = self.object_path(pointer)
+        if object_path is None and fetch:
+            self.fetch(path)
+            if parse_lfs_pointer(path) is None:
+                return self.open_binary(path)
+            object_path = self.object_path(pointer)
+        if object_path is None:
+            raise LfsObjectMissing(
+                f"{path} is a git-lfs pointer ({pointer.size} bytes, oid {pointer.oid[:12]}) "
+                f"and its object is not in {self.lfs_store}"
+            )
+        return _VerifyingReader(open(object_path, 'rb'), pointer, str(path))
+
+    def read_object(self, pointer, name=None):
+        """Return the verified content of a pointer's object from the store."""
+        object_path = self.object_path(pointer)
+        if object_path is None:
+            raise LfsObjectMissing(
+                f"{name or pointer.oid}: git-lfs object {pointer.oid[:12]} is not in {self.lfs_store}"
+            )
+        with _VerifyingReader(open(object_path, 'rb'), pointer, name or pointer.oid) as f:
+            return f.read()
+
+    def read_bytes(self, path, fetch=False):
+        with self.open_binary(path, fetch) as f:
+            return f.read()
+
+    def read_text(self, path, encoding='utf-8', errors='strict', fetch=False):
+        return self.read_bytes(path, fetch).decode(encoding, errors)
+
+    def hydrate(self, path, fetch=False):
+        """
+        Replace a pointer in the working tree with its verified content.
+        Returns True if the file was hydrated, False if it already was.
+        """
+        path = self._path(path)
+        if parse_lfs_pointer(path) is None:
+            return False
+
+        tmp_path = path.with_name(path.name + '.hydrating')
+        try:
+            with self.open_binary(path, fetch) as src:
+                if not isinstance(src, _VerifyingReader):
+                    return True  # fetch already replaced the pointer
+                with open(tmp_path, 'wb') as dst:
+                    # Verification runs on the final empty read
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return True
+
+    def fetch(self, path):
+        """Pull one file's object with git-lfs (needs git-lfs and a remote)."""
+        relative = self._path(path).resolve().relative_to(self.corpus_root).as_posix()
+        try:
+            result = subprocess.run(
+                ["git", "lfs", "pull", "--include", relative],
+                cwd=self.corpus_root, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+        except FileNotFoundError:
+            raise LfsObjectMissing(f"{relative}: git is not installed")
+        if result.returncode != 0:
+            raise LfsObjectMissing(f"{relative}: git lfs pull failed: {result.stderr.strip()}")
+
+    def manifest_files(self, text_ids=None):
+        """Yield (text_id, path) for manifest texts, optionally only the given ids."""
+        import yaml
+
+        with open(self.corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+            manifest = yaml.safe_load(f)
+        wanted = set(text_ids) if text_ids else None
+        for text_entry in manifest.get("texts", []):
+            if "file" not in text_entry:
+                continue
+            if wanted is not None and text_entry["id"] not in wanted:
+                continue
+            yield text_entry["id"], self.corpus_root / text_entry["file"]
+
+
+def iter_raw_lines(stream):
+    """Split a binary stream (such as a verifying LFS reader) into raw lines."""
+    pending = b""
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if pending:
+        yield pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Git-LFS-aware access to corpus texts")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--lfs-store", help="LFS object directory (default: .git/lfs/objects)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status_parser = subparsers.add_parser("status", help="Show which texts are pointers")
+    status_parser.add_argument("ids", nargs="*", help="Text ids (default: all)")
+
+    hydrate_parser = subparsers.add_parser("hydrate", help="Replace pointers with verified content")
+    hydrate_parser.add_argument("ids", nargs="+", help="Text ids to hydrate")
+    hydrate_parser.add_argument("--fetch", action="store_true",
+                                help="Run git lfs pull for objects missing from the store")
+
+    verify_parser = subparsers.add_parser("verify", help="Check hydrated texts against the git index")
+    verify_parser.add_argument("ids", nargs="*", help="Text ids (default: all)")
+
+    args = parser.parse_args()
+    files = CorpusFiles(args.corpus_root, args.lfs_store)
+    failures = 0
+
+    if args.command == "status":
+        counts = {"hydrated": 0, "available": 0, "missing": 0}
+        for text_id, path in files.manifest_files(args.ids):
+            pointer = files.pointer(path)
+            if pointer is None:
+                state = "hydrated" if path.exists() else "missing"
+            else:
+                state = "available" if files.object_path(pointer) else "missing"
+            counts[state] += 1
+            print(f"{state:<10} {text_id:<28} {path}")
+        print(f"\n{counts['hydrated']} hydrated, {counts['available']} pointers with local objects, "
+              f"{counts['missing']} missing")
+
+    elif args.command == "hydrate":
+        for text_id, path in files.manifest_files(args.ids):
+            try:
+                if files.hydrate(path, fetch=args.fetch):
+                    logger.info(f"{text_id}: hydrated {path}")
+                else:
+                    logger.info(f"{text_id}: already hydrated")
+            except (LfsObjectMissing, LfsIntegrityError) as e:
+                logger.error(f"{text_id}: {e}")
+                failures += 1
+
+    elif args.command == "verify":
+        for text_id, path in files.manifest_files(args.ids):
+            if files.is_pointer(path) or not path.exists():
+                continue
+            relative = path.relative_to(files.corpus_root).as_posix()
+            result = subprocess.run(["git", "show", f":{relative}"], cwd=files.corpus_root,
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            if result.returncode != 0:
+                continue
+            # The index holds the pointer; compare the file against it
+            index_pointer = parse_lfs_pointer_bytes(result.stdout)
+            if index_pointer is None:
+                continue
+            try:
+                with _VerifyingReader(open(path, 'rb'), index_pointer, str(path)) as f:
+                    for _ in f:
+                        pass
+                logger.info(f"{text_id}: OK")
+            except LfsIntegrityError as e:
+                logger.error(f"{text_id}: {e}")
+                failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Local asyncio HTTP service for corpus lookups.
+
+Consumers otherwise each re-implement load_corpus_manifest and read whole
+volumes per request. This serves one warm copy of the corpus over plain
+HTTP/1.1 (stdlib asyncio only):
+
+    GET /manifest                        manifest.yaml as JSON
+    GET /texts/<id>                      manifest entry and section list
+    GET /texts/<id>/sections/<index>     one metadata section's text
+    GET /texts/<id>/range?start=&end=    a byte range, e.g. a chunk's
+                                         start_offset/end_offset
+    GET /verses?ref=John+3:16            aligned KJV/LXX/SBLGNT verses
+                                         (needs parallel_verses.py build)
+    GET /metrics                         cache hit rate, coalesced reads
+                                         and latency percentiles per route
+
+Texts are memory-mapped at startup (LFS pointers through their stored
+objects), or read from a corpus_archive.py archive with --archive.
+Decoded passages are kept in an LRU cache bounded in bytes (--cache-mb).
+Concurrent requests for the same passage share one read: the first
+starts it in a worker thread and the others await its result.
+
+Usage:
+    python scripts/corpus_service.py                       # 127.0.0.1:8765
+    python scripts/corpus_service.py --port 9000 --cache-mb 256
+    python scripts/corpus_service.py --archive build/corpus-archive.bin
+"""
+
+import argparse
+import asyncio
+import json
+import mmap
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles
+from embedding_cache import text_segments
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_MB = 64
+MAX_RANGE_BYTES = 4 * 1024 * 1024
+LATENCY_SAMPLES = 10000
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def utf8_size(text):
+    """Size of a decoded passage in bytes, the unit of --cache-mb."""
+    return len(text.encode('utf-8'))
+
+
+class PassageCache:
+    """LRU cache of decoded values, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None}
+
+
+class CorpusService:
+    def __init__(self, corpus_root=".", cache_bytes=DEFAULT_CACHE_MB * 1024 * 1024, archive_path=None,
+                 table_path=None):
+        self.corpus_root = Path(corpus_root)
+        self.files = CorpusFiles(corpus_root)
+        self.cache = PassageCache(cache_bytes)
+        self.archive_path = archive_path
+        self.table_path = table_path
+        self.archive = None
+        self.verses = None
+        self.maps = {}
+        self.metadata = {}
+        self.entries = {}
+        self.section_spans = {}
+        self.inflight = {}
+        self.coalesced = 0
+        self.latency = {}
+        self.requests = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def open(self):
+        """Load the manifest and metadata and pre-open every text."""
+        if self.archive_path:
+            from corpus_archive import CorpusArchive
+            self.archive = CorpusArchive(self.archive_path)
+            self.manifest = self.archive.manifest()
+        else:
+            with open(self.corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+                self.manifest = yaml.safe_load(f)
+
+        for entry in self.manifest.get("texts", []):
+            self.entries[entry["id"]] = entry
+            if self.archive:
+                if entry["id"] in self.archive.texts:
+                    self.metadata[entry["id"]] = self.archive.metadata(entry["id"])
+                continue
+            meta_path = self.corpus_root / entry.get("metadata", "")
+            if "metadata" in entry and meta_path.is_file():
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    self.metadata[entry["id"]] = yaml.safe_load(f)
+            if "file" in entry:
+                self._map_text(entry)
+
+        table_path = self.table_path or self.corpus_root / "build/parallel-verses.bin"
+        if Path(table_path).exists():
+            from parallel_verses import ParallelVerses
+            self.verses = ParallelVerses(self.corpus_root, table_path)
+        logger.info(f"Serving {len(self.archive.texts) if self.archive else len(self.maps)} texts"
+                    f"{' from ' + str(self.archive_path) if self.archive else ''}"
+                    f"{', verse table loaded' if self.verses else ''}")
+
+    def _map_text(self, entry):
+        path = self.corpus_root / entry["file"]
+        if not path.exists():
+            return
+        pointer = self.files.pointer(path)
+        if pointer is not None:
+            path = self.files.object_path(pointer)
+            if path is None:
+                logger.warning(f"{entry['id']}: git-lfs object not available; not served")
+                return
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                return
+            self.maps[entry["id"]] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for text_map in self.maps.values():
+            text_map.close()
+        if self.archive:
+            self.archive.close()
+        if self.verses:
+            self.verses.close()
+
+    # Reads (run in worker threads)
+
+    def _text_size(self, text_id):
+        if self.archive:
+            return self.archive.texts[text_id]["size"]
+        return len(self.maps[text_id])
+
+    def _read(self, text_id, start, end):
+        if self.archive:
+            with self._lock:
+                data = self.archive.read(text_id, start, end)
+        else:
+            data = self.maps[text_id][start:end]
+        return data.decode('utf-8', errors='replace')
+
+    def _sections(self, text_id):
+        """[(index, start, end)] of the located sections of a text."""
+        if self.archive:
+            return [tuple(section) for section in self.archive.texts[text_id]["sections"]]
+        sections = ((self.metadata.get(text_id) or {}).get("text_info") or {}).get("sections") or []
+        return [(index, start, end) for start, end, section, index in text_segments(self.maps[text_id], sections)
+                if section is not None]
+
+    def _verses(self, references):
+        from parallel_verses import VerseReferenceError
+        results = []
+        for reference in references:
+            try:
+                with self._lock:
+                    results.extend(self.verses.lookup(reference))
+            except VerseReferenceError as e:
+                raise HttpError(400, str(e))
+        return results
+
+    async def cached(self, key, size_of, function, *args):
+        """Return a cached value, joining an in-flight read of the same key."""
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await asyncio.to_thread(function, *args)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here so waiters alone need not
+            raise
+        finally:
+            del self.inflight[key]
+        self.cache.put(key, value, size_of(value))
+        future.set_result(value)
+        return value
+
+    # Route handlers
+
+    def _require_text(self, text_id):
+        if text_id not in self.entries:
+            raise HttpError(404, f"unknown text {text_id!r}")
+        if not (text_id in self.maps or (self.archive and text_id in self.archive.texts)):
+            raise HttpError(503, f"{text_id} content is not available on this server")
+
+    async def get_manifest(self, query):
+        return self.manifest
+
+    async def get_text(self, query, text_id):
+        if text_id not in self.entries:
+            raise HttpError(404, f"unknown text {text_id!r}")
+        metadata_sections = ((self.metadata.get(text_id) or {}).get("text_info") or {}).get("sections") or []
+        result = dict(self.entries[text_id])
+        result["sections"] = [{"index": index, "title": section.get("title"), "author": section.get("author")}
+                              for index, section in enumerate(metadata_sections)]
+        if text_id in self.maps or (self.archive and text_id in self.archive.texts):
+            result["size"] = self._text_size(text_id)
+        return result
+
+    async def get_section(self, query, text_id, index):
+        self._require_text(text_id)
+        try:
+            index = int(index)
+        except ValueError:
+            raise HttpError(400, f"section index must be an integer, not {index!r}")
+        spans = await self.cached(("sections", text_id), lambda spans: 32 * len(spans) + 64,
+                                  self._sections, text_id)
+        span = next((span for span in spans if span[0] == index), None)
+        if span is None:
+            raise HttpError(404, f"{text_id} has no located section {index}")
+        _, start, end = span
+        text = await self.cached(("range", text_id, start, end), utf8_size, self._read, text_id, start, end)
+        section = (self.metadata[text_id]["text_info"]["sections"])[index]
+        return {"text_id": text_id, "index": index, "title": section.get("title"),
+                "author": section.get("author"), "start": start, "end": end, "text": text}
+
+    async def get_range(self, query, text_id):
+        self._require_text(text_id)
+        try:
+            start = int(query.get("start", ["0"])[0])
+            end = int(query["end"][0]) if "end" in query else self._text_size(text_id)
+        except ValueError:
+            raise HttpError(400, "start and end must be integers")
+        end = min(end, self._text_size(text_id))
+        if start < 0 or end < start:
+            raise HttpError(400, f"invalid range {start}:{end}")
+        if end - start > MAX_RANGE_BYTES:
+            raise HttpError(400, f"range exceeds {MAX_RANGE_BYTES} bytes")
+        text = await self.cached(("range", text_id, start, end), utf8_size, self._read, text_id, start, end)
+        return {"text_id": text_id, "start": start, "end": end, "text": text}
+
+    async def get_verses(self, query):
+        if self.verses is None:
+            raise HttpError(503, "no verse table; run parallel_verses.py build")
+        references = query.get("ref")
+        if not references:
+            raise HttpError(400, "missing ref parameter")
+        return await self.cached(("verses",) + tuple(references),
+                                 lambda verses: utf8_size(json.dumps(verses, ensure_ascii=False)),
+                                 self._verses, references)
+
+    async def get_metrics(self, query):
+        routes = {}
+        for route, samples in self.latency.items():
+            ordered = sorted(samples)
+            routes[route] = {
+                "requests": self.requests.get(route, 0),
+                "errors": self.errors.get(route, 0),
+                **{f"p{q}_ms": round(ordered[min(len(ordered) - 1, len(ordered) * q // 100)] * 1000, 3)
+                   for q in (50, 90, 99)},
+            }
+        return {"uptime_s": round(time.time() - self.started, 1), "cache": self.cache.stats(),
+                "coalesced_reads": self.coalesced, "routes": routes}
+
+    def route(self, path):
+        """Return (route name, handler, path arguments)."""
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts == ["manifest"]:
+            return "manifest", self.get_manifest, ()
+        if parts == ["metrics"]:
+            return "metrics", self.get_metrics, ()
+        if parts == ["verses"]:
+            return "verses", self.get_verses, ()
+        if len(parts) == 2 and parts[0] == "texts":
+            return "text", self.get_text, (parts[1],)
+        if len(parts) == 3 and parts[0] == "texts" and parts[2] == "range":
+            return "range", self.get_range, (parts[1],)
+        if len(parts) == 4 and parts[0] == "texts" and parts[2] == "sections":
+            return "section", self.get_section, (parts[1], parts[3])
+        raise HttpError(404, f"no route for {path}")
+
+    async def respond(self, method, target):
+        """Handle one request; return (status, JSON-serializable body)."""
+        started = time.perf_counter()
+        url = urlsplit(target)
+        name = "unrouted"
+        try:
+            if method != "GET":
+                raise HttpError(405, f"{method} is not supported")
+            name, handler, path_args = self.route(url.path)
+            status, body = 200, await handler(parse_qs(url.query), *path_args)
+        except HttpError as e:
+            status, body = e.status, {"error": str(e)}
+        except Exception as e:
+            logger.exception(f"{method} {target} failed")
+            status, body = 500, {"error": str(e)}
+        self.requests[name] = self.requests.get(name, 0) + 1
+        if status >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        self.latency.setdefault(name, deque(maxlen=LATENCY_SAMPLES)).append(time.perf_counter() - started)
+        return status, body
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                status, body = await self.respond(method, target)
+                await self._write(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer, status, body, keep_alive):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload
+        )
+        await writer.drain()
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    logger.info(f"Listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve corpus lookups over local HTTP")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to bind")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to bind")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_CACHE_MB, help="Passage cache size")
+    parser.add_argument("--archive", help="Serve texts from a corpus_archive.py archive")
+    parser.add_argument("--verse-table", help="parallel_verses.py table (default: build/parallel-verses.bin)")
+
+    args = parser.parse_args()
+    service = CorpusService(args.corpus_root, int(args.cache_mb * 1024 * 1024), args.archive, args.verse_table)
+    service.open()
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
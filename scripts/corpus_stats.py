@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Corpus statistics: vocabulary, n-grams and per-section token counts.
+
+`build` splits every active text into pieces at its located sections (the
+same boundaries as section_index.py) and, inside long sections, at
+paragraph breaks. A process pool maps each piece to partial aggregates:
+Counters of sizes (bytes, chars, words, lines, tokens), of vocabulary and
+of n-grams. The partials are then reduced per volume. Tokens are the
+casefolded words that bm25_index.py indexes, stopwords included, and
+n-grams never cross a paragraph break.
+
+Each volume's reduced profile is stored in build/stats/<ID>.json, keyed by
+the text's sha256 (the pointer oid for git-lfs pointers) and its section
+list. Only volumes whose text or sections changed are recounted. The
+corpus summary, build/stats/corpus.json, is reduced from the stored
+profiles after every build, so `show` answers without reading any text:
+
+- per text: bytes, words, tokens, vocabulary size and section count
+- corpus totals, vocabulary size, most frequent words and n-grams
+
+Profiles keep the full vocabulary but only the --top most frequent
+n-grams, so corpus-wide n-gram counts are sums of per-volume top lists
+(exact for n-grams that reach every volume's list).
+
+Usage:
+    python scripts/corpus_stats.py build
+    python scripts/corpus_stats.py build anf-01 --force --ngram 3
+    python scripts/corpus_stats.py show                   # corpus summary
+    python scripts/corpus_stats.py show anf-01 --sections # token budget per section
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from bm25_index import TOKEN_RE
+from corpus_files import CorpusFiles
+from instrumentation import span, add_profile_arguments, profile_session
+from section_index import file_sha256, locate_sections, sections_digest
+from sentence_index import iter_active_texts
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROFILE_VERSION = 2  # 2: section ends from section_index INDEX_VERSION 2
+DEFAULT_STATS_DIR = Path("build/stats")
+DEFAULT_NGRAM = 2
+DEFAULT_TOP = 1000
+PIECE_BYTES = 4 << 20
+PARAGRAPH_BREAK = re.compile(r"\n[ \t\r]*\n")
+SIZE_FIELDS = ("bytes", "chars", "words", "lines", "tokens")
+
+
+class Partial:
+    """Counter aggregates of one piece of text; partials reduce by addition."""
+
+    def __init__(self, sizes=None, vocabulary=None, ngrams=None):
+        self.sizes = sizes or Counter()
+        self.vocabulary = vocabulary or Counter()
+        self.ngrams = ngrams or Counter()
+
+    def update(self, other):
+        self.sizes.update(other.sizes)
+        self.vocabulary.update(other.vocabulary)
+        self.ngrams.update(other.ngrams)
+        return self
+
+
+def count_piece(data, ngram=DEFAULT_NGRAM):
+    """Map one piece of UTF-8 text to its Partial."""
+    text = data.decode('utf-8', errors='replace')
+    partial = Partial()
+    partial.sizes.update(bytes=len(data), chars=len(text), words=len(text.split()), lines=data.count(b'\n'))
+    for paragraph in PARAGRAPH_BREAK.split(text.casefold()):
+        tokens = TOKEN_RE.findall(paragraph)
+        partial.vocabulary.update(tokens)
+        if len(tokens) >= ngram > 1:
+            partial.ngrams.update(" ".join(gram) for gram in zip(*(tokens[i:] for i in range(ngram))))
+    partial.sizes["tokens"] = sum(partial.vocabulary.values())
+    return partial
+
+
+def _count_worker(path, start, end, ngram):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return count_piece(f.read(end - start), ngram)
+
+
+def split_pieces(data, start, end, piece_bytes=PIECE_BYTES):
+    """Split [start, end) into pieces of about piece_bytes at paragraph breaks."""
+    pieces = []
+    while end - start > piece_bytes:
+        cut = data.rfind(b"\n\n", start + piece_bytes // 2, start + piece_bytes)
+        if cut < 0:
+            cut = data.find(b"\n", start + piece_bytes, end)
+            if cut < 0:
+                break
+        pieces.append((start, cut + 1))
+        start = cut + 1
+    pieces.append((start, end))
+    return pieces
+
+
+def section_spans(data, sections):
+    """
+    Partition data at the located section starts. Returns (section number
+    or None for text before the first section, start, end) in text order;
+    a section runs to the next located start.
+    """
+    starts = {}
+    for number, found in enumerate(locate_sections(data, sections)):
+        if found:
+            starts.setdefault(found[0], number)
+    bounds = sorted(starts)
+    spans = [(None, 0, bounds[0] if bounds else len(data))]
+    for i, start in enumerate(bounds):
+        spans.append((starts[start], start, bounds[i + 1] if i + 1 < len(bounds) else len(data)))
+    return [span_ for span_ in spans if span_[2] > span_[1]]
+
+
+def load_sections(corpus_root, meta_path):
+    if not meta_path or not (Path(corpus_root) / meta_path).is_file():
+        return []
+    with open(Path(corpus_root) / meta_path, 'r', encoding='utf-8') as f:
+        metadata = yaml.safe_load(f) or {}
+    return (metadata.get("text_info") or {}).get("sections") or []
+
+
+def profile_path(stats_dir, text_path):
+    return Path(stats_dir) / f"{Path(text_path).stem}.json"
+
+
+def load_profile(stats_dir, text_path):
+    path = profile_path(stats_dir, text_path)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_current(profile, files, text_path, sections, ngram):
+    """True if a stored profile still describes the text and section list."""
+    if profile is None or profile.get("version") != PROFILE_VERSION or profile.get("ngram") != ngram:
+        return False
+    if profile.get("sections_sha256") != sections_digest(sections):
+        return False
+    pointer = files.pointer(text_path)
+    if pointer is not None:
+        return profile.get("sha256") == pointer.oid
+    stat = Path(text_path).stat()
+    if profile.get("size") != stat.st_size:
+        return False
+    if profile.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    return profile.get("sha256") == file_sha256(text_path)
+
+
+def _readable_path(files, text_path):
+    pointer = files.pointer(text_path)
+    if pointer is None:
+        return Path(text_path), pointer
+    return files.object_path(pointer), pointer
+
+
+def plan_volume(files, text_path, sections):
+    """
+    Return (readable path, pointer, spans, pieces, unterminated) for one
+    volume, or None if its content is not available. unterminated is True
+    when the last line has no newline.
+    """
+    path, pointer = _readable_path(files, text_path)
+    if path is None:
+        return None
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            spans = section_spans(data, sections)
+            pieces = [(number, piece_start, piece_end)
+                      for number, start, end in spans
+                      for piece_start, piece_end in split_pieces(data, start, end)]
+            unterminated = size > 0 and data[size - 1:size] != b'\n'
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    return path, pointer, spans, pieces, unterminated
+
+
+def reduce_profile(text_id, text_path, plan, sections, partials, ngram, top):
+    """Reduce a volume's piece partials, in text order, into its stored profile."""
+    _, pointer, spans, _, unterminated = plan
+    volume = Partial()
+    by_section = {}
+    for number, partial in partials:
+        volume.update(partial)
+        by_section.setdefault(number, Counter()).update(partial.sizes)
+
+    section_rows = []
+    for number, start, end in spans:
+        section = sections[number] if number is not None else {}
+        sizes = by_section.get(number, Counter())
+        section_rows.append({
+            "section": number,
+            "title": section.get("title"),
+            "author": section.get("author"),
+            "start_offset": start,
+            "end_offset": end,
+            **{field: sizes[field] for field in ("words", "tokens")},
+        })
+
+    sizes = volume.sizes
+    if unterminated:
+        sizes["lines"] += 1  # as str.splitlines() counts it
+    stat = Path(text_path).stat()
+    return {
+        "version": PROFILE_VERSION,
+        "text_id": text_id,
+        "file": Path(text_path).name,
+        "sha256": pointer.oid if pointer is not None else file_sha256(text_path),
+        "size": pointer.size if pointer is not None else stat.st_size,
+        "mtime_ns": None if pointer is not None else stat.st_mtime_ns,
+        "sections_sha256": sections_digest(sections),
+        "ngram": ngram,
+        "counts": {field: sizes[field] for field in SIZE_FIELDS},
+        "vocabulary_size": len(volume.vocabulary),
+        "sections": section_rows,
+        "vocabulary": dict(volume.vocabulary.most_common()),
+        "ngrams": dict(volume.ngrams.most_common(top)),
+    }
+
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def summarize(profiles, top=50):
+    """Reduce stored profiles into the corpus summary."""
+    totals, vocabulary, ngrams = Counter(), Counter(), Counter()
+    texts = {}
+    for profile in profiles:
+        totals.update(profile["counts"])
+        vocabulary.update(profile["vocabulary"])
+        ngrams.update(profile["ngrams"])
+        texts[profile["text_id"]] = {
+            **{field: profile["counts"][field] for field in ("bytes", "words", "tokens")},
+            "vocabulary_size": profile["vocabulary_size"],
+            "sections": sum(1 for row in profile["sections"] if row["section"] is not None),
+        }
+    return {
+        "version": PROFILE_VERSION,
+        "texts": texts,
+        "totals": {field: totals[field] for field in SIZE_FIELDS},
+        "vocabulary_size": len(vocabulary),
+        "top_words": dict(vocabulary.most_common(top)),
+        "top_ngrams": dict(ngrams.most_common(top)),
+    }
+
+
+def build(corpus_root=".", text_ids=None, stats_dir=None, force=False, workers=None,
+          ngram=DEFAULT_NGRAM, top=DEFAULT_TOP):
+    """Recount every requested volume whose profile is missing or stale; return the count."""
+    corpus_root = Path(corpus_root)
+    stats_dir = corpus_root / (stats_dir or DEFAULT_STATS_DIR)
+    files = CorpusFiles(corpus_root)
+    with open(corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+        metadata_of = {entry["id"]: entry.get("metadata") for entry in yaml.safe_load(f).get("texts", [])}
+
+    plans = []
+    with span("stats.plan"):
+        for text_id, text_path in iter_active_texts(corpus_root, text_ids):
+            if not text_path.exists():
+                logger.warning(f"{text_id}: text not found: {text_path}")
+                continue
+            sections = load_sections(corpus_root, metadata_of.get(text_id))
+            if not force and is_current(load_profile(stats_dir, text_path), files, text_path, sections, ngram):
+                continue
+            plan = plan_volume(files, text_path, sections)
+            if plan is None:
+                logger.warning(f"{text_id}: skipped (git-lfs object not available)")
+                continue
+            plans.append((text_id, text_path, sections, plan))
+
+    if plans:
+        pieces = sum(len(plan[3]) for *_, plan in plans)
+        started = time.perf_counter()
+        with span("stats.map", lines=pieces), ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for volume, (_, _, _, (path, _, _, volume_pieces, _)) in enumerate(plans):
+                for number, start, end in volume_pieces:
+                    futures[pool.submit(_count_worker, str(path), start, end, ngram)] = (volume, start, number)
+            partials = [[] for _ in plans]
+            for future in as_completed(futures):
+                volume, start, number = futures[future]
+                partials[volume].append((start, number, future.result()))
+
+        with span("stats.reduce", lines=len(plans)):
+            for volume, (text_id, text_path, sections, plan) in enumerate(plans):
+                # Reduce in text order so ties in the frequency lists are stable
+                ordered = [(number, partial) for _, number, partial in sorted(partials[volume], key=lambda p: p[0])]
+                profile = reduce_profile(text_id, text_path, plan, sections, ordered, ngram, top)
+                write_json(profile_path(stats_dir, text_path), profile)
+                counts = profile["counts"]
+                logger.info(f"{text_id}: {counts['words']} words, {counts['tokens']} tokens, "
+                            f"{profile['vocabulary_size']} distinct words, {len(plan[2])} sections")
+        logger.info(f"Counted {len(plans)} volumes in {pieces} pieces ({time.perf_counter() - started:.2f}s)")
+    else:
+        logger.info("All statistics profiles are up to date")
+
+    with span("stats.summary"):
+        profiles = []
+        for text_id, text_path in iter_active_texts(corpus_root, text_ids=None):
+            profile = load_profile(stats_dir, text_path)
+            if profile is not None:
+                profiles.append(profile)
+        write_json(stats_dir / "corpus.json", summarize(profiles))
+    return len(plans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vocabulary, n-gram and token statistics for the corpus")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--stats-dir", default=str(DEFAULT_STATS_DIR), help="Profile directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Recount volumes whose profile is missing or stale")
+    build_parser.add_argument("ids", nargs="*", help="Text ids (default: all active texts)")
+    build_parser.add_argument("--force", action="store_true", help="Recount even if up to date")
+    build_parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    build_parser.add_argument("--ngram", type=int, default=DEFAULT_NGRAM, help="N-gram length")
+    build_parser.add_argument("--top", type=int, default=DEFAULT_TOP,
+                              help="N-grams kept per volume profile")
+    add_profile_arguments(build_parser)
+
+    show_parser = subparsers.add_parser("show", help="Print the corpus summary or one volume's profile")
+    show_parser.add_argument("id", nargs="?", help="Text id (default: corpus summary)")
+    show_parser.add_argument("--top", type=int, default=20, help="Words and n-grams to list")
+    show_parser.add_argument("--sections", action="store_true", help="List token counts per section")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with profile_session(args):
+            build(args.corpus_root, args.ids, args.stats_dir, args.force, args.workers, args.ngram, args.top)
+        return
+
+    stats_dir = Path(args.corpus_root) / args.stats_dir
+    if args.id:
+        text_path = next((path for _, path in iter_active_texts(args.corpus_root, [args.id])), None)
+        profile = load_profile(stats_dir, text_path) if text_path else None
+        if profile is None:
+            sys.exit(f"No profile for {args.id}; run `corpus_stats.py build {args.id}`")
+        report = {
+            "text_id": profile["text_id"],
+            "counts": profile["counts"],
+            "vocabulary_size": profile["vocabulary_size"],
+            "top_words": dict(Counter(profile["vocabulary"]).most_common(args.top)),
+            "top_ngrams": dict(Counter(profile["ngrams"]).most_common(args.top)),
+        }
+        if args.sections:
+            report["sections"] = profile["sections"]
+    else:
+        path = stats_dir / "corpus.json"
+        if not path.exists():
+            sys.exit("No corpus summary; run `corpus_stats.py build`")
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        report["top_words"] = dict(Counter(report["top_words"]).most_common(args.top))
+        report["top_ngrams"] = dict(Counter(report["top_ngrams"]).most_common(args.top))
+    print(yaml.dump(report, default_flow_style=False, sort_keys=False, allow_unicode=True))
+
+
+if __name__ == "__main__":
+    main()
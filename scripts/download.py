@@ -9,8 +9,6 @@ to the corpus with proper metadata.
 import argparse
 import os
 import sys
-import yaml
-import requests
 from pathlib import Path
 from urllib.parse import urlparse
 import logging
@@ -27,6 +25,8 @@ class CorpusDownloader:
         
     def load_manifest(self):
         """Load the corpus manifest."""
+        import yaml
+        
         try:
             with open(self.manifest_path, 'r', encoding='utf-8') as f:
                 return yaml.safe_load(f)
@@ -36,11 +36,17 @@ class CorpusDownloader:
     
     def save_manifest(self, manifest):
         """Save the updated manifest."""
+        import yaml
+        
         with open(self.manifest_path, 'w', encoding='utf-8') as f:
             yaml.dump(manifest, f, default_flow_style=False, sort_keys=False)
     
     def download_text(self, url, filename, metadata=None):
         """Download a text from URL and save to sources directory."""
+        # Imported here so --list-sources and --help stay fast
+        import requests
+        import yaml
+        
         try:
             logger.info(f"Downloading {filename} from {url}")
             response = requests.get(url, timeout=30)
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Incremental chunk embedding with a persistent content-hash cache.
+
+Every active text is split into chunks that never cross a section boundary
+(sections located as in section_index.py), so each chunk carries its
+section's author, title, date and region. A chunk is identified by the
+sha256 of its text. Embeddings are cached per embedder in a memory-mapped
+float32 matrix (build/embeddings/<embedder>/vectors.f32) with a JSON map
+from chunk hash to row. On re-ingestion only chunks whose hash is not in
+the cache are sent to the embedder. When the cache is given a size bound,
+the matrix never grows past it: once full, the least recently used rows
+are evicted and the cache is saved to make room.
+
+The saved index must never map a chunk to another chunk's row, even if a
+run dies between saves. So rows are only written in place when the saved
+index does not use them (its free rows, or rows past its capacity);
+evicted rows are reused only after the next save; and saving compacts the
+live rows into a new vectors.<generation>.f32 file that the new index
+names, replacing the old file and index in one os.replace of index.json.
+
+Embedders implement the Embedder interface (name, dim, embed(texts)).
+The built-in "hashing" embedder is a deterministic feature-hashing stand-in
+for tests and dry runs; real models are loaded with --embedder module:Class.
+
+Usage:
+    python scripts/embedding_cache.py ingest                     # all active texts
+    python scripts/embedding_cache.py ingest --ids anf-01 --max-mb 512
+    python scripts/embedding_cache.py ingest --embedder mypkg.embed:OpenAIEmbedder
+    python scripts/embedding_cache.py ingest --exclude-duplicates   # after near_duplicates.py
+    python scripts/embedding_cache.py ingest --body-only        # footnotes split off (apparatus.py)
+    python scripts/embedding_cache.py stats
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import math
+import mmap
+import os
+import re
+import sys
+from array import array
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from apparatus import split_text
+from corpus_files import CorpusFiles, LfsObjectMissing
+from instrumentation import span, add_profile_arguments, profile_session
+from section_index import locate_sections
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_ROOT = Path("build/embeddings")
+DEFAULT_CHUNKS_OUTPUT = Path("build/chunks.jsonl")
+DEFAULT_EXCLUSIONS = Path("build/near_duplicates.json")
+DEFAULT_CHUNK_BYTES = 2000
+MIN_CAPACITY = 1024
+
+SECTION_FIELDS = ("composition_year", "composition_uncertainty", "author_region", "author_location")
+
+
+class Embedder:
+    """Interface for embedding backends."""
+
+    #: Identifies the model; cached vectors are kept per name
+    name = None
+    #: Vector length
+    dim = None
+
+    def embed(self, texts):
+        """Return one sequence of `dim` floats per input text."""
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic bag-of-words feature hashing, L2-normalized."""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for word in re.findall(r'\w+', text.lower()):
+                digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], 'little') % self.dim
+                vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+
+def load_embedder(spec):
+    """Return an embedder from 'hashing', 'hashing:<dim>' or 'module:Class'."""
+    if spec == "hashing" or spec.startswith("hashing:"):
+        _, _, dim = spec.partition(":")
+        return HashingEmbedder(int(dim) if dim else 256)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Embedder must be 'hashing[:dim]' or 'module:Class', got {spec!r}")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class EmbeddingCache:
+    """Chunk hash -> float32 vector, stored as rows of a memory-mapped matrix."""
+
+    def __init__(self, cache_dir, dim, max_entries=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / "index.json"
+        self.max_entries = max_entries
+
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+            if self.index["dim"] != dim:
+                raise ValueError(f"{self.cache_dir} holds {self.index['dim']}-d vectors, not {dim}-d")
+        else:
+            self.index = {"dim": dim, "capacity": 0, "clock": 0, "entries": {}, "free": []}
+        self.index.setdefault("vectors", "vectors.f32")
+        self.index.setdefault("generation", 0)
+
+        self.dim = dim
+        self.vectors_path = self.cache_dir / self.index["vectors"]
+        for stale in self.cache_dir.glob("vectors*.f32"):
+            if stale != self.vectors_path:
+                stale.unlink()  # left by a run that died after writing its index
+        self._file = open(self.vectors_path, 'a+b')
+        # Rows the saved index still maps to evicted chunks; reused after the next save
+        self._released = []
+        self._map = None
+        self._view = None
+        self._remap(self.index["capacity"])
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _remap(self, capacity):
+        if self._view is not None:
+            self._view.release()
+            self._map.close()
+            self._view = self._map = None
+        size = capacity * self.dim * 4
+        if os.fstat(self._file.fileno()).st_size != size:
+            self._file.truncate(size)
+        self.index["capacity"] = capacity
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), size)
+            self._view = memoryview(self._map).cast('f')
+
+    def __len__(self):
+        return len(self.index["entries"])
+
+    def __contains__(self, chunk_hash):
+        return chunk_hash in self.index["entries"]
+
+    def _touch(self, entry):
+        self.index["clock"] += 1
+        entry[1] = self.index["clock"]
+
+    def get(self, chunk_hash):
+        """Return the cached vector as array('f'), or None."""
+        entry = self.index["entries"].get(chunk_hash)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(entry)
+        row = entry[0] * self.dim
+        return array('f', self._view[row:row + self.dim])
+
+    def put(self, chunk_hash, vector):
+        if len(vector) != self.dim:
+            raise ValueError(f"Expected {self.dim}-d vector, got {len(vector)}")
+        entry = self.index["entries"].get(chunk_hash)
+        if entry is None:
+            if not self.index["free"]:
+                self._make_room()
+            entry = [self.index["free"].pop(), 0]
+            self.index["entries"][chunk_hash] = entry
+        self._touch(entry)
+        row = entry[0] * self.dim
+        self._view[row:row + self.dim] = array('f', vector)
+
+    def _make_room(self):
+        """Free at least one row: grow up to max_entries, evicting once full."""
+        if self.max_entries and self.index["capacity"] >= self.max_entries:
+            # Evict a batch at a time so a full cache does not save on every put;
+            # saving compacts the matrix below max_entries, so it can grow again
+            self.evict(self.max_entries - max(1, self.max_entries // 16))
+            self.save()
+            if self.index["free"]:
+                return
+        used = self.index["capacity"]
+        capacity = max(MIN_CAPACITY, used * 2)
+        if self.max_entries:
+            capacity = min(capacity, self.max_entries)
+        self._remap(capacity)
+        self.index["free"] = list(range(capacity - 1, used - 1, -1))
+
+    def evict(self, limit=None):
+        """Drop least recently used rows beyond limit (default max_entries); return how many."""
+        limit = self.max_entries if limit is None else limit
+        excess = len(self) - limit if limit is not None else 0
+        if excess <= 0:
+            return 0
+        oldest = sorted(self.index["entries"].items(), key=lambda item: item[1][1])[:excess]
+        for chunk_hash, (slot, _) in oldest:
+            del self.index["entries"][chunk_hash]
+            self._released.append(slot)
+        self.evicted += excess
+        return excess
+
+    def compact(self):
+        """
+        Copy the live rows, in row order, to a new matrix file and switch to
+        it. The old file is left alone; the index written next names the new one.
+        """
+        if len(self) == self.index["capacity"]:
+            return None
+        self.index["generation"] += 1
+        name = f"vectors.{self.index['generation']}.f32"
+        live = sorted(self.index["entries"].values(), key=lambda entry: entry[0])
+        with open(self.cache_dir / name, 'wb') as f:
+            for row, entry in enumerate(live):
+                f.write(self._view[entry[0] * self.dim:(entry[0] + 1) * self.dim])
+                entry[0] = row
+            f.flush()
+            os.fsync(f.fileno())
+        old_path = self.vectors_path
+        self.close()
+        self.index["vectors"] = name
+        self.index["free"] = []
+        self._released = []
+        self.vectors_path = self.cache_dir / name
+        self._file = open(self.vectors_path, 'a+b')
+        self._remap(len(live))
+        return old_path
+
+    def save(self):
+        """Evict, compact and write the index; return how many rows were evicted since opening."""
+        self.evict()
+        replaced = self.compact()
+        if self._map is not None:
+            self._map.flush()
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+        if replaced is not None:
+            replaced.unlink()
+        # Rows the saved index no longer maps can be written from now on
+        self.index["free"].extend(self._released)
+        self._released = []
+        return self.evicted
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._map.close()
+            self._view = self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def split_range(data, start, end, chunk_bytes):
+    """Yield (start, end) chunk ranges, breaking at paragraphs, then spaces."""
+    position = start
+    while position < end:
+        if end - position <= chunk_bytes:
+            yield position, end
+            return
+        limit = position + chunk_bytes
+        cut = data.rfind(b"\n\n", position, limit)
+        if cut <= position:
+            cut = data.rfind(b" ", position, limit)
+        if cut <= position:
+            cut = limit
+        else:
+            cut += 1
+        # Never split inside a UTF-8 sequence
+        while cut < end and (data[cut] & 0xC0) == 0x80:
+            cut += 1
+        yield position, cut
+        position = cut
+
+
+def section_id(text_id, index):
+    """Stable id of the index-th entry in a text's metadata sections."""
+    return f"{text_id}#{index}"
+
+
+def text_segments(data, sections):
+    """
+    Partition a text at its located section starts. Returns (start, end,
+    section, index) tuples, index being the section's position in the
+    metadata; text before the first section has section and index None.
+    """
+    starts = {}
+    for index, (section, found) in enumerate(zip(sections, locate_sections(data, sections))):
+        if found and found[0] not in starts:
+            starts[found[0]] = (section, index)
+    boundaries = sorted(starts)
+    segments = []
+    if not boundaries or boundaries[0] > 0:
+        segments.append((0, boundaries[0] if boundaries else len(data), None, None))
+    for i, start in enumerate(boundaries):
+        end = boundaries[i + 1] if i + 1 < len(boundaries) else len(data)
+        segments.append((start, end) + starts[start])
+    return segments
+
+
+def chunk_attribution(text_entry, section, index=None):
+    """Return the metadata fields carried by every chunk of a segment."""
+    attribution = {
+        "section_id": section_id(text_entry["id"], index) if section else None,
+        "author": section.get("author") if section else text_entry.get("author"),
+        "title": section.get("title") if section else text_entry.get("title"),
+        "volume_title": text_entry.get("title"),
+    }
+    for field in SECTION_FIELDS:
+        attribution[field] = section.get(field) if section else None
+    return attribution
+
+
+def iter_segment_chunks(text_entry, data, segment, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yield chunk records for one segment, attributed to its section."""
+    segment_start, segment_end, section, index = segment
+    attribution = chunk_attribution(text_entry, section, index)
+    for start, end in split_range(data, segment_start, segment_end, chunk_bytes):
+        content = bytes(data[start:end]).decode('utf-8', errors='replace').strip()
+        if not content:
+            continue
+        record = {
+            "hash": hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            "text_id": text_entry["id"],
+            "start_offset": start,
+            "end_offset": end,
+        }
+        record.update(attribution)
+        record["content"] = content
+        yield record
+
+
+def iter_text_chunks(text_entry, data, metadata, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yield chunk records for one text, each attributed to its section."""
+    text_info = metadata.get("text_info", {}) if metadata else {}
+    for segment in text_segments(data, text_info.get("sections") or []):
+        yield from iter_segment_chunks(text_entry, data, segment, chunk_bytes)
+
+
+def load_exclusions(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Set of (text_id, start_offset) pairs excluded by near_duplicates.py.
+    Offsets, not hashes: a duplicate may be byte-identical to the chunk it
+    duplicates, which must stay.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    if result.get("version", 1) < 2:
+        raise ValueError(f"{path} lists chunks by hash; rerun near_duplicates.py")
+    if result.get("params", {}).get("chunk_bytes") != chunk_bytes:
+        raise ValueError(f"{path} was computed with --chunk-bytes "
+                         f"{result.get('params', {}).get('chunk_bytes')}, not {chunk_bytes}")
+    return {(text_id, start_offset) for text_id, start_offset in result.get("exclude", [])}
+
+
+def iter_body_chunks(text_entry, data, metadata, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Yield chunk records of the body text left by apparatus.py (footnotes,
+    page markers and references removed). Offsets are mapped back to the
+    source, so Apparatus.notes(start_offset, end_offset) finds a chunk's notes.
+    """
+    body, apparatus = split_text(bytes(data))
+    for record in iter_text_chunks(text_entry, body, metadata, chunk_bytes):
+        record["start_offset"] = apparatus.source_offset(record["start_offset"])
+        record["end_offset"] = apparatus.source_offset(record["end_offset"])
+        yield record
+
+
+def iter_corpus_chunks(corpus_root, text_ids=None, chunk_bytes=DEFAULT_CHUNK_BYTES, exclude=None,
+                       body_only=False):
+    """
+    Yield chunk records for active texts (optionally only text_ids),
+    skipping chunks whose (text_id, start_offset) is in exclude. With body_only,
+    chunks cover only body text (see iter_body_chunks).
+    """
+    corpus_root = Path(corpus_root)
+    files = CorpusFiles(corpus_root)
+    with open(corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f)
+
+    for text_entry in manifest.get("texts", []):
+        if text_ids and text_entry["id"] not in text_ids:
+            continue
+        if not text_ids and text_entry.get("status", "active") != "active":
+            continue
+        try:
+            with span("embed.read") as s:
+                data = files.read_bytes(text_entry["file"])
+                s.add(bytes=len(data))
+        except (LfsObjectMissing, FileNotFoundError) as e:
+            logger.warning(f"{text_entry['id']}: skipped ({e})")
+            continue
+        metadata = None
+        if "metadata" in text_entry and (corpus_root / text_entry["metadata"]).exists():
+            with open(corpus_root / text_entry["metadata"], 'r', encoding='utf-8') as f:
+                metadata = yaml.safe_load(f)
+        with span("embed.chunk", bytes=len(data)):
+            chunker = iter_body_chunks if body_only else iter_text_chunks
+            chunks = list(chunker(text_entry, data, metadata, chunk_bytes))
+        if exclude:
+            chunks = [chunk for chunk in chunks if (chunk["text_id"], chunk["start_offset"]) not in exclude]
+        yield from chunks
+
+
+def ingest(corpus_root, embedder, cache, text_ids=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+           batch_size=64, chunks_output=None, exclude=None, body_only=False):
+    """
+    Chunk the corpus, embed only chunks missing from the cache and write
+    chunk records (without vectors) as JSON lines. Chunks in exclude
+    (near-duplicates) are left out; with body_only, footnotes and other
+    apparatus are not embedded. Returns counts.
+    """
+    stats = {"chunks": 0, "cached": 0, "embedded": 0}
+    pending = {}
+
+    def flush():
+        hashes = list(pending)
+        with span("embed.embedder", lines=len(hashes)):
+            vectors = embedder.embed([pending[h] for h in hashes])
+        with span("embed.cache_put", lines=len(hashes)):
+            for chunk_hash, vector in zip(hashes, vectors):
+                cache.put(chunk_hash, vector)
+        stats["embedded"] += len(hashes)
+        pending.clear()
+
+    out = None
+    if chunks_output:
+        Path(chunks_output).parent.mkdir(parents=True, exist_ok=True)
+        out = open(chunks_output, 'w', encoding='utf-8')
+    try:
+        for record in iter_corpus_chunks(corpus_root, text_ids, chunk_bytes, exclude, body_only):
+            stats["chunks"] += 1
+            chunk_hash = record["hash"]
+            if chunk_hash in pending:
+                stats["cached"] += 1
+            elif cache.get(chunk_hash) is not None:
+                stats["cached"] += 1
+            else:
+                pending[chunk_hash] = record["content"]
+                if len(pending) >= batch_size:
+                    flush()
+            if out:
+                out.write(json.dumps({k: v for k, v in record.items() if k != "content"},
+                                     ensure_ascii=False) + "\n")
+        if pending:
+            flush()
+    finally:
+        if out:
+            out.close()
+
+    stats["evicted"] = cache.save()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally embed corpus chunks")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--embedder", default="hashing",
+                        help="'hashing[:dim]' (deterministic stand-in) or 'module:Class'")
+    parser.add_argument("--cache-root", default=str(DEFAULT_CACHE_ROOT), help="Embedding cache directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Chunk and embed new or changed text")
+    ingest_parser.add_argument("--ids", nargs="+", help="Only these text ids (default: active texts)")
+    ingest_parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES,
+                               help="Maximum chunk size in bytes")
+    ingest_parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedder call")
+    ingest_parser.add_argument("--max-entries", type=int, help="Evict LRU vectors beyond this count")
+    ingest_parser.add_argument("--max-mb", type=float, help="Evict LRU vectors beyond this size")
+    ingest_parser.add_argument("--output", default=str(DEFAULT_CHUNKS_OUTPUT),
+                               help="Chunk records (JSON lines)")
+    ingest_parser.add_argument("--exclude-duplicates", nargs="?", const=str(DEFAULT_EXCLUSIONS), metavar="PATH",
+                               help=f"Skip near-duplicate chunks listed by near_duplicates.py "
+                                    f"(default: {DEFAULT_EXCLUSIONS})")
+    ingest_parser.add_argument("--body-only", action="store_true",
+                               help="Embed body text only, without footnotes, page markers and references")
+    add_profile_arguments(ingest_parser)
+
+    subparsers.add_parser("stats", help="Show cache size")
+
+    args = parser.parse_args()
+    embedder = load_embedder(args.embedder)
+    cache_dir = Path(args.corpus_root) / args.cache_root / re.sub(r'[^\w.-]+', '_', embedder.name)
+
+    if args.command == "stats":
+        with EmbeddingCache(cache_dir, embedder.dim) as cache:
+            size_mb = cache.index["capacity"] * cache.dim * 4 / (1024 * 1024)
+            print(f"{embedder.name}: {len(cache)} vectors, {cache.index['capacity']} rows "
+                  f"allocated ({size_mb:.1f} MB) in {cache_dir}")
+        return
+
+    max_entries = args.max_entries
+    if max_entries is not None and max_entries < 1:
+        parser.error("--max-entries must be at least 1")
+    if args.max_mb:
+        by_size = int(args.max_mb * 1024 * 1024 // (embedder.dim * 4))
+        if by_size < 1:
+            parser.error(f"--max-mb {args.max_mb} holds no {embedder.dim}-d vectors")
+        max_entries = min(max_entries, by_size) if max_entries else by_size
+
+    exclude = None
+    if args.exclude_duplicates:
+        try:
+            exclude = load_exclusions(Path(args.corpus_root) / args.exclude_duplicates, args.chunk_bytes)
+        except ValueError as e:
+            parser.error(str(e))
+        logger.info(f"Excluding {len(exclude)} near-duplicate chunks")
+
+    with profile_session(args), EmbeddingCache(cache_dir, embedder.dim, max_entries) as cache:
+        stats = ingest(args.corpus_root, embedder, cache, args.ids, args.chunk_bytes,
+                       args.batch_size, Path(args.corpus_root) / args.output, exclude, args.body_only)
+
+    logger.info(f"{stats['chunks']} chunks: {stats['cached']} cached, {stats['embedded']} embedded, "
+                f"{stats['evicted']} evicted")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,14 @@ Generate complete section metadata for all anthology volumes by analyzing text f
 """
 
 import re
+import sys
 import yaml
 from pathlib import Path
 from typing import List, Dict, Tuple
 
+sys.path.append(str(Path(__file__).parent))
+from instrumentation import span
+
 def find_major_sections(text_file: Path) -> List[Tuple[int, str]]:
     """Find major section headers in a text file."""
     sections = []
@@ -31,7 +35,9 @@ def find_major_sections(text_file: Path) -> List[Tuple[int, str]]:
         r'^Concerning the \w+',
     ]
 
-    with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
+    line_num = 0
+    with span("sections.marker_scan", bytes=text_file.stat().st_size) as s, \
+            open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
         for line_num, line in enumerate(f, 1):
             line_stripped = line.strip()
 
@@ -42,6 +48,7 @@ def find_major_sections(text_file: Path) -> List[Tuple[int, str]]:
                     if 10 < len(line_stripped) < 150:
                         sections.append((line_num, line_stripped))
                         break
+        s.add(lines=line_num)
 
     return sections
 
@@ -196,7 +203,8 @@ def process_anthology(volume_id: str):
         }
         yaml_sections.append(yaml_section)
 
-    print(yaml.dump({'sections': yaml_sections}, default_flow_style=False, sort_keys=False, allow_unicode=True))
+    with span("sections.yaml_dump"):
+        print(yaml.dump({'sections': yaml_sections}, default_flow_style=False, sort_keys=False, allow_unicode=True))
 
 def main():
     """Process all anthology volumes."""
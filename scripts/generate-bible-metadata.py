@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
 """
-Generate metadata files for Bible volumes (KJV and SBLGNT).
+Metadata declarations for Bible volumes (KJV and SBLGNT).
 
-This script creates complete .meta.yaml files with:
+The declarations cover:
 - All 66 books for KJV (OT + NT)
 - All 27 books for SBLGNT (NT only)
 - Temporal metadata (composition dates)
 - Author attribution
 - Geographic information
+
+The .meta.yaml files are written by metadata_compiler.py, which merges
+these declarations with the other metadata sources; running this script
+runs the compiler.
 """
 
-import yaml
+import sys
 from pathlib import Path
 
-# Biblical book metadata with authors, dates, and locations
+# Biblical book metadata with authors, dates, and locations. section_marker,
+# where given, is the section start_marker when the title line alone also
+# matches the table of contents.
 KJV_BOOKS = [
     # OLD TESTAMENT
     # Torah/Pentateuch
@@ -27,10 +33,10 @@ KJV_BOOKS = [
     {"file_marker": "The Book of Joshua", "author": "Joshua", "title": "Joshua", "year": -1350, "uncertainty": "high", "location": "Canaan", "testament": "OT", "genre": "History"},
     {"file_marker": "The Book of Judges", "author": "Samuel", "title": "Judges", "year": -1050, "uncertainty": "high", "location": "Israel", "testament": "OT", "genre": "History"},
     {"file_marker": "The Book of Ruth", "author": "Samuel", "title": "Ruth", "year": -1050, "uncertainty": "high", "location": "Israel", "testament": "OT", "genre": "History"},
-    {"file_marker": "The First Book of Samuel", "author": "Samuel", "title": "1 Samuel", "year": -1000, "uncertainty": "high", "location": "Israel", "testament": "OT", "genre": "History"},
-    {"file_marker": "The Second Book of Samuel", "author": "Samuel", "title": "2 Samuel", "year": -950, "uncertainty": "high", "location": "Israel", "testament": "OT", "genre": "History"},
-    {"file_marker": "The First Book of the Kings", "author": "Jeremiah", "title": "1 Kings", "year": -550, "uncertainty": "high", "location": "Jerusalem", "testament": "OT", "genre": "History"},
-    {"file_marker": "The Second Book of the Kings", "author": "Jeremiah", "title": "2 Kings", "year": -550, "uncertainty": "high", "location": "Jerusalem", "testament": "OT", "genre": "History"},
+    {"file_marker": "The First Book of Samuel", "section_marker": "The First Book of Samuel\n\nOtherwise Called:\n", "author": "Samuel", "title": "1 Samuel", "year": -1000, "uncertainty": "high", "location": "Israel", "testament": "OT", "genre": "History"},
+    {"file_marker": "The Second Book of Samuel", "section_marker": "The Second Book of Samuel\n\nOtherwise Called:\n", "author": "Samuel", "title": "2 Samuel", "year": -950, "uncertainty": "high", "location": "Israel", "testament": "OT", "genre": "History"},
+    {"file_marker": "The First Book of the Kings", "section_marker": "The First Book of the Kings\n\nCommonly Called:\n", "author": "Jeremiah", "title": "1 Kings", "year": -550, "uncertainty": "high", "location": "Jerusalem", "testament": "OT", "genre": "History"},
+    {"file_marker": "The Second Book of the Kings", "section_marker": "The Second Book of the Kings\n\nCommonly Called:\n", "author": "Jeremiah", "title": "2 Kings", "year": -550, "uncertainty": "high", "location": "Jerusalem", "testament": "OT", "genre": "History"},
     {"file_marker": "The First Book of the Chronicles", "author": "Ezra", "title": "1 Chronicles", "year": -450, "uncertainty": "medium", "location": "Jerusalem", "testament": "OT", "genre": "History"},
     {"file_marker": "The Second Book of the Chronicles", "author": "Ezra", "title": "2 Chronicles", "year": -450, "uncertainty": "medium", "location": "Jerusalem", "testament": "OT", "genre": "History"},
     {"file_marker": "Ezra", "author": "Ezra", "title": "Ezra", "year": -450, "uncertainty": "medium", "location": "Jerusalem", "testament": "OT", "genre": "History"},
@@ -136,15 +142,15 @@ SBLGNT_BOOKS = [
 ]
 
 
-def generate_kjv_metadata():
-    """Generate BIBLE-KJV.meta.yaml with all 66 books."""
+def kjv_metadata():
+    """Declared metadata for BIBLE-KJV.meta.yaml with all 66 books."""
 
     sections = []
     for book in KJV_BOOKS:
         section = {
             'author': book['author'],
             'title': book['title'],
-            'start_marker': book['file_marker'],
+            'start_marker': book.get('section_marker', book['file_marker']),
             'composition_year': book['year'],
             'composition_uncertainty': book['uncertainty'],
             'author_region': 'Eastern',
@@ -188,7 +194,6 @@ def generate_kjv_metadata():
             'encoding': 'UTF-8',
             'format': 'Plain text',
             'line_endings': 'Unix (LF)',
-            'created': '2025-10-17',
         },
         'cataloging': {
             'canonical_order': True,
@@ -199,17 +204,11 @@ def generate_kjv_metadata():
         },
     }
 
-    output_file = Path('sources/BIBLE-KJV.meta.yaml')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        yaml.dump(metadata, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
-
-    print(f"✅ Generated: {output_file}")
-    print(f"   Books: {len(sections)} (39 OT + 27 NT)")
-    return output_file
+    return metadata
 
 
-def generate_sblgnt_metadata():
-    """Generate BIBLE-SBLGNT.meta.yaml with all 27 NT books."""
+def sblgnt_metadata():
+    """Declared metadata for BIBLE-SBLGNT.meta.yaml with all 27 NT books."""
 
     sections = []
     for book in SBLGNT_BOOKS:
@@ -259,7 +258,6 @@ def generate_sblgnt_metadata():
             'encoding': 'UTF-8',
             'format': 'Plain text',
             'line_endings': 'Unix (LF)',
-            'created': '2025-10-17',
         },
         'cataloging': {
             'canonical_order': True,
@@ -269,18 +267,15 @@ def generate_sblgnt_metadata():
         },
     }
 
-    output_file = Path('sources/BIBLE-SBLGNT.meta.yaml')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        yaml.dump(metadata, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    return metadata
+
 
-    print(f"✅ Generated: {output_file}")
-    print(f"   Books: {len(sections)} (NT only)")
-    return output_file
+def main():
+    """Compile all metadata files."""
+    sys.path.append(str(Path(__file__).parent))
+    from metadata_compiler import main as compile_metadata
+    compile_metadata()
 
 
 if __name__ == '__main__':
-    print("📖 Generating Bible metadata files...\n")
-    generate_kjv_metadata()
-    print()
-    generate_sblgnt_metadata()
-    print("\n✅ Bible metadata generation complete!")
+    main()
@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 """
-Generate metadata files for the complete Church Fathers collection.
+Metadata declarations for the complete Church Fathers collection.
 Ante-Nicene Fathers (9 volumes) + Nicene and Post-Nicene Fathers Series I & II (28 volumes)
+
+The files are written by metadata_compiler.py, which merges these
+declarations with the other metadata sources; running this script runs
+the compiler.
 """
 
-import yaml
+import sys
 from pathlib import Path
-from datetime import date
 
 # Metadata for all 37 volumes
 CHURCH_FATHERS_METADATA = {
@@ -332,9 +335,7 @@ def generate_metadata(volume_id, info):
         "technical": {
             "encoding": "UTF-8",
             "format": "Plain text",
-            "line_endings": "Unix (LF)",
-            "created": str(date.today()),
-            "last_modified": str(date.today())
+            "line_endings": "Unix (LF)"
         },
         "cataloging": {
             "ccel_id": volume_id.lower(),
@@ -352,25 +353,10 @@ def generate_metadata(volume_id, info):
     return metadata
 
 def main():
-    """Generate all metadata files."""
-    corpus_root = Path(__file__).parent.parent
-    sources_dir = corpus_root / "sources"
-
-    print(f"Generating metadata for {len(CHURCH_FATHERS_METADATA)} volumes...")
-
-    for volume_id, info in CHURCH_FATHERS_METADATA.items():
-        # Create metadata file
-        meta_filename = f"{volume_id}.meta.yaml"
-        meta_path = sources_dir / meta_filename
-
-        metadata = generate_metadata(volume_id, info)
-
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            yaml.dump(metadata, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
-
-        print(f"✓ Created {meta_filename}")
-
-    print(f"\n✅ Generated {len(CHURCH_FATHERS_METADATA)} metadata files successfully!")
+    """Compile all metadata files."""
+    sys.path.append(str(Path(__file__).parent))
+    from metadata_compiler import main as compile_metadata
+    compile_metadata()
 
 if __name__ == "__main__":
     main()
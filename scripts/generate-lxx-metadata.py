@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 """
-Generate metadata file for LXX Septuagint.
+Metadata declarations for the LXX Septuagint.
 
-This script creates complete .meta.yaml file with:
+The declarations cover:
 - All 54 books of the LXX (including deuterocanonical books)
 - Temporal metadata (composition dates from original Hebrew/Aramaic)
 - Author attribution
 - Geographic information
+
+BIBLE-LXX.meta.yaml is written by metadata_compiler.py, which merges
+these declarations with the other metadata sources; running this script
+runs the compiler.
 """
 
-import yaml
+import sys
 from pathlib import Path
 
 # LXX book metadata - matches the order in consolidate-lxx.py
@@ -83,7 +87,8 @@ LXX_BOOKS = [
     {"start_marker": "ΩΔΑΙ", "author": "Various", "title": "Odes", "year": -200, "uncertainty": "high", "location": "Alexandria", "genre": "Liturgy", "notes": "Collection of liturgical hymns"},
 ]
 
-def main():
+def lxx_metadata():
+    """Declared metadata for BIBLE-LXX.meta.yaml with all 54 books."""
     metadata = {
         "text_info": {
             "id": "bible-lxx",
@@ -124,9 +129,7 @@ def main():
         "technical": {
             "encoding": "UTF-8",
             "format": "Plain text",
-            "line_endings": "Unix (LF)",
-            "created": "2025-10-17",
-            "last_modified": "2025-10-17"
+            "line_endings": "Unix (LF)"
         },
         "cataloging": {
             "lxx_id": "rahlfs-1935",
@@ -160,16 +163,13 @@ def main():
 
         metadata["text_info"]["sections"].append(section)
 
-    # Write to file
-    output_path = Path("sources/BIBLE-LXX.meta.yaml")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        yaml.dump(metadata, f, allow_unicode=True, sort_keys=False, default_flow_style=False)
+    return metadata
 
-    print(f"Generated LXX metadata: {output_path}")
-    print(f"Total books: {len(LXX_BOOKS)}")
-    print(f"  - Protocanonical (Hebrew Bible): 39 books")
-    print(f"  - Deuterocanonical: 15 books")
-    print(f"  - Total: 54 books")
+def main():
+    """Compile all metadata files."""
+    sys.path.append(str(Path(__file__).parent))
+    from metadata_compiler import main as compile_metadata
+    compile_metadata()
 
 if __name__ == "__main__":
     main()
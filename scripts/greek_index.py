@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Accent- and breathing-insensitive search index for the Greek Bible texts.
+
+Builds an inverted index from normalized Greek tokens to the verses of
+BIBLE-SBLGNT.txt and BIBLE-LXX.txt in one streaming pass over each file.
+Normalization follows the LXX sed scripts (betacode2unicode_unaccented.sh,
+unaccented2koine.sh) but is done in Python:
+
+- NFD decomposition with all combining marks (accents, breathings,
+  iota subscript, diaeresis) removed
+- lowercase, with final and lunate sigma folded to σ
+- SBLGNT textual-critical signs (⸀ ⸁ ⸂ ⸃ ⸄ ⸅ ...) and punctuation removed
+
+Posting lists hold verse ids, stored as varint-encoded deltas. Queries
+support implicit AND, OR, NOT (or a leading "-"), parentheses and
+"quoted phrases". Phrases are checked against the verse text, which is
+read back from the source file using the stored byte offsets.
+
+Usage:
+    python scripts/greek_index.py build
+    python scripts/greek_index.py query 'λογος θεου'
+    python scripts/greek_index.py query '"εν αρχη" OR (πνευμα NOT αγιον)' --show
+"""
+
+import argparse
+import json
+import mmap
+import re
+import struct
+import sys
+import unicodedata
+from array import array
+from pathlib import Path
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"IGGREEK1"
+DEFAULT_INDEX_PATH = Path("build/greek-index.bin")
+DEFAULT_SOURCES = ["sources/BIBLE-SBLGNT.txt", "sources/BIBLE-LXX.txt"]
+
+# SBLGNT verse lines: "Matt 1:1<TAB>text"
+SBLGNT_VERSE = re.compile(r'^(\S+ \d+:\d+)\t(.*)$')
+# LXX verse lines: "1:1 text" under a book header
+LXX_VERSE = re.compile(r'^(\d+:\d+) (.*)$')
+LXX_CHAPTER = re.compile(r'^--- Chapter \d+ ---$')
+
+# Textual-critical signs used in SBLGNT (U+2E00..U+2E0F) plus the bracket
+# forms Rahlfs and NA use for doubtful text
+CRITICAL_SIGNS = ''.join(chr(c) for c in range(0x2E00, 0x2E10)) + '⟦⟧[]'
+_FOLD_TABLE = str.maketrans({'ς': 'σ', 'ϲ': 'σ', 'Ϲ': 'σ', **{c: None for c in CRITICAL_SIGNS}})
+_TOKEN_SPLIT = re.compile(r'[^\w]+')
+
+
+def normalize_greek(text):
+    """Return text lowercased with diacritics, final sigma and critical signs folded."""
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.lower().translate(_FOLD_TABLE)
+
+
+def tokenize_greek(text):
+    """Split text into normalized tokens, dropping punctuation."""
+    return [t for t in _TOKEN_SPLIT.split(normalize_greek(text)) if t]
+
+
+def encode_postings(verse_ids):
+    """Varint-encode an ascending array of verse ids as deltas."""
+    out = bytearray()
+    previous = 0
+    for vid in verse_ids:
+        delta = vid - previous
+        previous = vid
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_postings(buf, start, length):
+    """Decode a varint delta posting list back into a list of verse ids."""
+    ids = []
+    value = 0
+    shift = 0
+    current = 0
+    for byte in buf[start:start + length]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        current += value
+        ids.append(current)
+        value = 0
+        shift = 0
+    return ids
+
+
+def iter_verse_matches(lines):
+    """
+    Stream (reference, line byte offset, match) for every verse line in an
+    iterable of raw lines from a consolidated SBLGNT or LXX file. The
+    verse text is match.group(2) of the decoded line, match.string.
+    """
+    book = None
+    header_lines = []
+    in_header = False
+    offset = 0
+
+    for raw in lines:
+        line_offset = offset
+        offset += len(raw)
+        line = raw.decode('utf-8').rstrip('\n')
+
+        match = SBLGNT_VERSE.match(line)
+        if match:
+            yield match.group(1), line_offset, match
+            continue
+
+        # LXX book headers are "=====", Greek title, English title, "====="
+        if line.startswith('=' * 20):
+            if in_header and len(header_lines) >= 2:
+                book = header_lines[1]
+            in_header = not in_header
+            header_lines = []
+            continue
+        if in_header:
+            header_lines.append(line.strip())
+            continue
+
+        match = LXX_VERSE.match(line)
+        if match and book and not LXX_CHAPTER.match(line):
+            yield f"{book} {match.group(1)}", line_offset, match
+
+
+def iter_verses(path):
+    """
+    Stream (reference, byte_offset, text) for every verse line in a
+    consolidated SBLGNT or LXX file.
+    """
+    with open(path, 'rb') as f:
+        for ref, line_offset, match in iter_verse_matches(f):
+            yield ref, line_offset, match.group(2)
+
+
+def build_index(source_paths, index_path=DEFAULT_INDEX_PATH):
+    """Build the index in one streaming pass over each source file."""
+    index_path = Path(index_path)
+    postings = {}
+    refs = []
+    locations = array('Q')  # (source_number << 40) | byte_offset
+    sources = []
+
+    for path in source_paths:
+        path = Path(path)
+        if not path.exists():
+            logger.warning(f"Source not found, skipping: {path}")
+            continue
+
+        stat = path.stat()
+        sources.append({"path": str(path), "size": stat.st_size, "mtime": stat.st_mtime})
+        verse_count = 0
+
+        for ref, offset, text in iter_verses(path):
+            vid = len(refs)
+            refs.append(ref)
+            locations.append((len(sources) - 1) << 40 | offset)
+            verse_count += 1
+
+            for token in tokenize_greek(text):
+                ids = postings.get(token)
+                if ids is None:
+                    postings[token] = ids = array('I')
+                if not ids or ids[-1] != vid:
+                    ids.append(vid)
+
+        logger.info(f"{path}: {verse_count} verses")
+
+    blob = bytearray()
+    terms = {}
+    for term in sorted(postings):
+        encoded = encode_postings(postings[term])
+        terms[term] = [len(blob), len(encoded), len(postings[term])]
+        blob.extend(encoded)
+
+    header = json.dumps({
+        "sources": sources,
+        "refs": refs,
+        "terms": terms,
+    }, ensure_ascii=False).encode('utf-8')
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_path, 'wb') as f:
+        f.write(INDEX_MAGIC)
+        f.write(struct.pack('<QQ', len(header), len(locations)))
+        f.write(header)
+        f.write(locations.tobytes())
+        f.write(blob)
+
+    logger.info(f"Indexed {len(refs)} verses, {len(terms)} terms -> {index_path} "
+                f"({index_path.stat().st_size / 1024 / 1024:.1f} MB)")
+    return index_path
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for malformed search queries."""
+
+
+class GreekIndex:
+    """Read-only view of an index written by build_index()."""
+
+    def __init__(self, index_path=DEFAULT_INDEX_PATH):
+        self.index_path = Path(index_path)
+        self._file = open(self.index_path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"Not a Greek index file: {self.index_path}")
+
+        pos = len(INDEX_MAGIC)
+        header_len, location_count = struct.unpack_from('<QQ', self._mmap, pos)
+        pos += 16
+        header = json.loads(self._mmap[pos:pos + header_len].decode('utf-8'))
+        pos += header_len
+
+        self.sources = header["sources"]
+        self.refs = header["refs"]
+        self.terms = header["terms"]
+        self.locations = array('Q')
+        self.locations.frombytes(self._mmap[pos:pos + location_count * 8])
+        self._postings_start = pos + location_count * 8
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_stale(self):
+        """True if any source file changed size or mtime since the build."""
+        for source in self.sources:
+            path = Path(source["path"])
+            if not path.exists():
+                return True
+            stat = path.stat()
+            if stat.st_size != source["size"] or stat.st_mtime != source["mtime"]:
+                return True
+        return False
+
+    def postings(self, term):
+        """Return the sorted verse ids containing a (normalized) term."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return []
+        start, length, _ = entry
+        return decode_postings(self._mmap, self._postings_start + start, length)
+
+    def verse_text(self, vid):
+        """Read one verse's text back from its source file."""
+        location = self.locations[vid]
+        path = self.sources[location >> 40]["path"]
+        with open(path, 'rb') as f:
+            f.seek(location & ((1 << 40) - 1))
+            line = f.readline().decode('utf-8').rstrip('\n')
+        for separator in ('\t', ' '):
+            if separator in line:
+                return line.split(separator, 1)[1]
+        return line
+
+    def phrase(self, tokens):
+        """Return verse ids containing tokens as a contiguous phrase."""
+        if not tokens:
+            return []
+        candidates = self.postings(tokens[0])
+        for token in tokens[1:]:
+            candidates = _intersect(candidates, self.postings(token))
+            if not candidates:
+                return []
+        if len(tokens) == 1:
+            return candidates
+
+        n = len(tokens)
+        matches = []
+        for vid in candidates:
+            words = tokenize_greek(self.verse_text(vid))
+            if any(words[i:i + n] == tokens for i in range(len(words) - n + 1)):
+                matches.append(vid)
+        return matches
+
+    def search(self, query):
+        """Evaluate a boolean/phrase query and return matching verse ids."""
+        return _QueryParser(query, self).parse()
+
+    def search_refs(self, query):
+        """Evaluate a query and return verse references."""
+        return [self.refs[vid] for vid in self.search(query)]
+
+
+def _intersect(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    other = set(b)
+    return [x for x in a if x in other]
+
+
+def _union(a, b):
+    return sorted(set(a).union(b))
+
+
+def _difference(a, b):
+    other = set(b)
+    return [x for x in a if x not in other]
+
+
+class _QueryParser:
+    """
+    Recursive-descent parser for:
+
+        expr   := term ("OR" term)*
+        term   := factor (["AND"] factor)*
+        factor := ("NOT" | "-") factor | "(" expr ")" | '"' phrase '"' | word
+    """
+
+    TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|(-)(?=\S)|([^\s()"]+))')
+
+    def __init__(self, query, index):
+        self.index = index
+        self.tokens = []
+        pos = 0
+        query = query.strip()
+        while pos < len(query):
+            match = self.TOKEN.match(query, pos)
+            if not match or match.end() == pos:
+                raise QuerySyntaxError(f"Cannot parse query near: {query[pos:]!r}")
+            pos = match.end()
+            lparen, rparen, phrase, minus, word = match.groups()
+            if lparen:
+                self.tokens.append(('(', None))
+            elif rparen:
+                self.tokens.append((')', None))
+            elif phrase is not None:
+                self.tokens.append(('PHRASE', tokenize_greek(phrase)))
+            elif minus:
+                self.tokens.append(('NOT', None))
+            elif word in ('AND', 'OR', 'NOT'):
+                self.tokens.append((word, None))
+            else:
+                self.tokens.append(('PHRASE', tokenize_greek(word)))
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            return []
+        result = self.expr()
+        if self.pos != len(self.tokens):
+            raise QuerySyntaxError(f"Unexpected {self.peek()!r} in query")
+        return result
+
+    def expr(self):
+        result = self.term()
+        while self.peek() == 'OR':
+            self.take()
+            result = _union(result, self.term())
+        return result
+
+    def term(self):
+        include = None
+        exclude = []
+        while self.peek() not in (None, 'OR', ')'):
+            if self.peek() == 'AND':
+                self.take()
+            if self.peek() == 'NOT':
+                self.take()
+                exclude.append(self.factor())
+                continue
+            ids = self.factor()
+            include = ids if include is None else _intersect(include, ids)
+
+        if include is None:
+            if not exclude:
+                raise QuerySyntaxError("Empty query clause")
+            # A purely negative clause ranges over every verse
+            include = list(range(len(self.index.refs)))
+        for ids in exclude:
+            include = _difference(include, ids)
+        return include
+
+    def factor(self):
+        kind = self.peek()
+        if kind == 'NOT':
+            self.take()
+            return _difference(list(range(len(self.index.refs))), self.factor())
+        if kind == '(':
+            self.take()
+            result = self.expr()
+            if self.peek() != ')':
+                raise QuerySyntaxError("Missing closing parenthesis")
+            self.take()
+            return result
+        if kind == 'PHRASE':
+            return self.index.phrase(self.take()[1])
+        raise QuerySyntaxError(f"Unexpected {kind!r} in query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Greek search index for SBLGNT and LXX")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX_PATH), help="Index file path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the index")
+    build_parser.add_argument("sources", nargs="*", help="Consolidated Greek text files")
+
+    query_parser = subparsers.add_parser("query", help="Search the index")
+    query_parser.add_argument("query", help="Boolean/phrase query")
+    query_parser.add_argument("--show", action="store_true", help="Print verse text")
+    query_parser.add_argument("--limit", type=int, default=50, help="Maximum verses to print")
+
+    args = parser.parse_args()
+    corpus_root = Path(args.corpus_root)
+    index_path = corpus_root / args.index
+
+    if args.command == "build":
+        sources = args.sources or [corpus_root / s for s in DEFAULT_SOURCES]
+        build_index(sources, index_path)
+        return
+
+    if not index_path.exists():
+        logger.error(f"Index not found at {index_path}; run 'build' first")
+        sys.exit(1)
+
+    with GreekIndex(index_path) as index:
+        if index.is_stale():
+            logger.warning("Index is older than its source files; consider rebuilding")
+        try:
+            ids = index.search(args.query)
+        except QuerySyntaxError as e:
+            logger.error(str(e))
+            sys.exit(2)
+
+        print(f"{len(ids)} verses")
+        for vid in ids[:args.limit]:
+            if args.show:
+                print(f"{index.refs[vid]}\t{index.verse_text(vid)}")
+            else:
+                print(index.refs[vid])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the corpus tools.
+
+Each subcommand maps to one script in this directory. Only the script for
+the chosen command is loaded, as `__main__` as if it had been run directly,
+so `ignaria --help` and light commands do not pay for imports that other
+commands need.
+
+Usage:
+    python scripts/ignaria.py --help
+    python scripts/ignaria.py validate --report validation_report.yaml
+    python scripts/ignaria.py consolidate sblgnt --workers 4
+    python scripts/ignaria.py sections index --check
+    python scripts/ignaria.py download --list-sources
+
+Add an alias for the short form:
+    alias ignaria="python /path/to/ignaria-corpus/scripts/ignaria.py"
+"""
+
+import ast
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# command -> (script, help) or command -> {subcommand: (script, help)}
+COMMANDS = {
+    "validate": ("validate.py", "Validate manifest, texts and metadata"),
+    "clean": ("clean.py", "Normalize text formatting"),
+    "mojibake": ("mojibake.py", "Find or repair mojibake in texts and start_markers"),
+    "apparatus": ("apparatus.py", "Split footnotes and page markers from body text"),
+    "stats": ("corpus_stats.py", "Vocabulary, n-gram and per-section token statistics"),
+    "download": ("download.py", "Download a text and add it to the manifest"),
+    "consolidate": {
+        "lxx": ("consolidate-lxx.py", "Build BIBLE-LXX.txt from LXX_final_main.csv"),
+        "sblgnt": ("consolidate-sblgnt.py", "Build BIBLE-SBLGNT.txt and the token table"),
+    },
+    "sections": {
+        "index": ("section_index.py", "Build section byte-offset tables"),
+        "sentences": ("sentence_index.py", "Build sentence and paragraph offset tables"),
+        "extract": ("extract-anthology-sections.py", "List candidate section markers"),
+        "generate": ("generate-anthology-sections-full.py", "Propose sections for each anthology"),
+        "add": ("add-anthology-sections.py", "Write hand-curated sections into metadata"),
+        "check-temporal": ("validate-temporal-metadata.py", "Check section dates and regions"),
+        "filter": ("section_catalog.py", "Find sections by date, region, location or author"),
+    },
+    "metadata": {
+        "compile": ("metadata_compiler.py", "Write all generated metadata and manifest entries that changed"),
+        "lint": ("metadata_lint.py", "Check all metadata files against the lint rules"),
+    },
+    "files": ("corpus_files.py", "Show, hydrate or verify git-lfs texts"),
+    "embed": ("embedding_cache.py", "Embed new or changed chunks with a persistent cache"),
+    "ingest": ("ingest_pipeline.py", "Stream active texts through chunking, embedding and a sink"),
+    "diff": ("corpus_diff.py", "Chunk-level upserts and deletes between two snapshots"),
+    "search": ("greek_index.py", "Build or query the Greek search index"),
+    "betacode": ("betacode.py", "Convert Betacode to Unicode Greek or check it against the sed scripts"),
+    "bm25": ("bm25_index.py", "Build or query the BM25 index over active texts"),
+    "verses": ("parallel_verses.py", "Show KJV verses beside the LXX and SBLGNT"),
+    "dedup": ("near_duplicates.py", "Find near-duplicate chunks across volumes"),
+    "build": ("build_graph.py", "Incrementally rebuild LXX pipeline stages"),
+    "blobs": ("blob_store.py", "Content-addressed store for LXX artifacts"),
+    "archive": ("corpus_archive.py", "Pack or read the compressed corpus archive"),
+    "serve": ("corpus_service.py", "Serve corpus lookups over local HTTP"),
+    "bench": ("benchmark.py", "Run benchmarks on a synthetic corpus"),
+}
+
+
+def print_usage(commands, prefix="ignaria", file=sys.stdout):
+    print(f"usage: {prefix} <command> [args...]\n", file=file)
+    print("commands:", file=file)
+    for name, entry in commands.items():
+        if isinstance(entry, dict):
+            print(f"  {name:<16} {', '.join(entry)}", file=file)
+        else:
+            print(f"  {name:<16} {entry[1]}", file=file)
+    print(f"\nRun '{prefix} <command> --help' for command options.", file=file)
+
+
+def resolve(argv):
+    """Return (script, prog, remaining args) for a command line; exit on --help or errors."""
+    commands = COMMANDS
+    prog = "ignaria"
+    while True:
+        if not argv:
+            print_usage(commands, prog, file=sys.stderr)
+            sys.exit(2)
+        if argv[0] in ("-h", "--help"):
+            print_usage(commands, prog)
+            sys.exit(0)
+        name, argv = argv[0], argv[1:]
+        entry = commands.get(name)
+        if entry is None:
+            print(f"{prog}: unknown command '{name}'\n", file=sys.stderr)
+            print_usage(commands, prog, file=sys.stderr)
+            sys.exit(2)
+        prog = f"{prog} {name}"
+        if isinstance(entry, dict):
+            commands = entry
+            continue
+        return SCRIPTS_DIR / entry[0], prog, argv
+
+
+def print_script_help(script, prog):
+    """Show the docstring of a script that has no argument parser of its own."""
+    tree = ast.parse(script.read_text(encoding='utf-8'))
+    print(f"usage: {prog}\n")
+    print((ast.get_docstring(tree) or "").strip())
+
+
+def main():
+    script, prog, args = resolve(sys.argv[1:])
+
+    # Several older scripts take no arguments and would run on --help
+    if ("-h" in args or "--help" in args) and "ArgumentParser(" not in script.read_text(encoding='utf-8'):
+        print_script_help(script, prog)
+        sys.exit(0)
+    sys.argv = [prog] + args
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+    # Load the script as __main__ so its `if __name__ == "__main__"` block
+    # runs and worker processes can find its functions
+    spec = importlib.util.spec_from_file_location("__main__", script)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["__main__"] = module
+    spec.loader.exec_module(module)
+
+
+if __name__ == "__main__":
+    main()
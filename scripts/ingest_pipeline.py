@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Streaming RAG ingestion as an asyncio pipeline with bounded queues.
+
+The documented path (load_text_with_metadata -> prepare_for_rag in
+SYSTEM_GUIDE.md) builds a list holding every volume at once. Here each
+text flows through stages connected by bounded queues:
+
+    manifest -> read -> split -> chunk -> embed -> sink
+
+File reads and embedder calls run in worker threads so the event loop
+stays free. A full queue blocks the stage feeding it, so a slow
+embedder or sink throttles reading, and memory is bounded by a few
+volumes (--read-ahead) plus --queue-size chunks regardless of corpus size.
+
+Chunks are the ones embedding_cache.py produces: cut from the source
+bytes, section-bounded, with section attribution, so their hashes and
+offsets are the ones embedding_cache.py and corpus_diff.py use. Only
+uncached chunks reach the embedder, and only their text is cleaned
+(clean.py's basic passes) on the way; vectors of cleaned text are cached
+under "<embedder>+clean", next to the cache embedding_cache.py fills,
+which --no-clean shares. The default sink writes chunk records with their
+vectors as JSON lines; any class with async `write(records)` and
+`close()` can be used with --sink module:Class.
+
+Usage:
+    python scripts/ingest_pipeline.py                          # all active texts
+    python scripts/ingest_pipeline.py --ids anf-01 --embed-workers 4
+    python scripts/ingest_pipeline.py --embedder mypkg.embed:MyEmbedder --sink mypkg.store:QdrantSink
+    python scripts/ingest_pipeline.py --progress 5             # log queue depths every 5s
+"""
+
+import argparse
+import asyncio
+import functools
+import importlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from clean import TextCleaner
+from corpus_files import CorpusFiles, LfsObjectMissing
+from embedding_cache import (DEFAULT_CACHE_ROOT, DEFAULT_CHUNK_BYTES, EmbeddingCache,
+                             iter_segment_chunks, load_embedder, text_segments)
+from instrumentation import add_profile_arguments, peak_rss_kb, profile_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = Path("build/ingest.jsonl")
+
+_END = object()
+
+
+class JsonlSink:
+    """Writes chunk records with their vectors as JSON lines."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _write(self, lines):
+        self._file.writelines(lines)
+
+    async def write(self, records):
+        lines = [json.dumps(record, ensure_ascii=False) + "\n" for record in records]
+        await asyncio.to_thread(self._write, lines)
+
+    async def close(self):
+        self._file.close()
+
+
+def load_sink(spec, output):
+    """Return the JSON lines sink, or a sink class given as 'module:Class'."""
+    if not spec:
+        return JsonlSink(output)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Sink must be 'module:Class', got {spec!r}")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class StageStats:
+    """Counters for one stage and the queue feeding it."""
+
+    def __init__(self, name, queue):
+        self.name = name
+        self.queue = queue
+        self.items_in = 0
+        self.items_out = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+
+    def snapshot(self):
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "bytes": self.bytes,
+            "busy_seconds": round(self.busy, 3),
+            "blocked_seconds": round(self.blocked, 3),
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_max": self.queue.maxsize if self.queue else 0,
+            "max_depth": self.max_depth,
+        }
+
+
+class Pipeline:
+    def __init__(self, corpus_root, embedder, cache, sink, text_ids=None, clean=True,
+                 chunk_bytes=DEFAULT_CHUNK_BYTES, batch_size=64, read_ahead=2,
+                 read_workers=2, embed_workers=2, queue_size=256):
+        self.corpus_root = Path(corpus_root)
+        self.files = CorpusFiles(corpus_root)
+        self.cleaner = TextCleaner(corpus_root) if clean else None
+        self.embedder = embedder
+        self.cache = cache
+        self.sink = sink
+        self.text_ids = set(text_ids) if text_ids else None
+        self.chunk_bytes = chunk_bytes
+        self.batch_size = batch_size
+        self.read_workers = read_workers
+        self.embed_workers = embed_workers
+
+        # Queued volumes and sections keep their volume's bytes alive, so
+        # those queues stay short; chunk queues are longer
+        self.queues = {
+            "read": asyncio.Queue(maxsize=read_ahead * 2),
+            "split": asyncio.Queue(maxsize=read_ahead),
+            "chunk": asyncio.Queue(maxsize=read_ahead * 8),
+            "embed": asyncio.Queue(maxsize=queue_size),
+            "sink": asyncio.Queue(maxsize=max(1, queue_size // batch_size)),
+        }
+        self.stats = {"manifest": StageStats("manifest", None)}
+        for name, queue in self.queues.items():
+            self.stats[name] = StageStats(name, queue)
+        self.cached = 0
+        self.embedded = 0
+
+    # Stage handlers: async generators from one input item to output items
+
+    async def read(self, text_entry):
+        try:
+            data = await asyncio.to_thread(self.files.read_bytes, text_entry["file"])
+        except (LfsObjectMissing, FileNotFoundError) as e:
+            logger.warning(f"{text_entry['id']}: skipped ({e})")
+            return
+        metadata = None
+        meta_path = self.corpus_root / text_entry.get("metadata", "")
+        if "metadata" in text_entry and meta_path.exists():
+            metadata = await asyncio.to_thread(self._load_yaml, meta_path)
+        self.stats["read"].bytes += len(data)
+        yield text_entry, data, metadata
+
+    @staticmethod
+    def _load_yaml(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f)
+
+    async def split(self, item):
+        text_entry, data, metadata = item
+        text_info = metadata.get("text_info", {}) if metadata else {}
+        for segment in text_segments(data, text_info.get("sections") or []):
+            yield text_entry, data, segment
+
+    async def chunk(self, item):
+        text_entry, data, segment = item
+        self.stats["chunk"].bytes += segment[1] - segment[0]
+        for record in iter_segment_chunks(text_entry, data, segment, self.chunk_bytes):
+            yield record
+
+    async def embed(self, record):
+        # Take whatever else is already queued, up to a full batch
+        queue = self.queues["embed"]
+        batch = [record]
+        while len(batch) < self.batch_size and not queue.empty():
+            extra = queue.get_nowait()
+            if extra is _END:
+                queue.put_nowait(_END)
+                break
+            batch.append(extra)
+        self.stats["embed"].items_in += len(batch) - 1
+
+        vectors = {}
+        missing = {}
+        for chunk in batch:
+            vector = self.cache.get(chunk["hash"])
+            if vector is not None:
+                vectors[chunk["hash"]] = vector.tolist()
+            else:
+                missing[chunk["hash"]] = chunk["content"]
+        self.cached += len(batch) - len(missing)
+        if missing:
+            hashes = list(missing)
+            embedded = await asyncio.to_thread(self._embed, [missing[h] for h in hashes])
+            for chunk_hash, vector in zip(hashes, embedded):
+                self.cache.put(chunk_hash, vector)
+                vectors[chunk_hash] = list(vector)
+            self.embedded += len(hashes)
+
+        out = []
+        for chunk in batch:
+            record = {k: v for k, v in chunk.items() if k != "content"}
+            record["vector"] = vectors[chunk["hash"]]
+            out.append(record)
+        yield out
+
+    def _embed(self, texts):
+        if self.cleaner is not None:
+            # Chunks keep their source hash and offsets; only the embedder sees cleaned text
+            passes = self.cleaner.passes()
+            texts = [functools.reduce(lambda text, clean_pass: clean_pass(text), passes, text)
+                     for text in texts]
+        return self.embedder.embed(texts)
+
+    async def write(self, batch):
+        await self.sink.write(batch)
+        yield batch
+
+    # Plumbing
+
+    async def produce(self):
+        """Manifest filter: queue the texts to ingest."""
+        with open(self.corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+            manifest = yaml.safe_load(f)
+        stats = self.stats["manifest"]
+        for text_entry in manifest.get("texts", []):
+            if "file" not in text_entry:
+                continue
+            if self.text_ids is not None and text_entry["id"] not in self.text_ids:
+                continue
+            if self.text_ids is None and text_entry.get("status", "active") != "active":
+                continue
+            stats.items_out += 1
+            start = time.perf_counter()
+            await self.queues["read"].put(text_entry)
+            stats.blocked += time.perf_counter() - start
+        await self.queues["read"].put(_END)
+
+    async def run_stage(self, name, handler, outq, workers=1):
+        """Run `workers` consumers of a stage's queue until it is exhausted."""
+        inq = self.queues[name]
+        stats = self.stats[name]
+
+        async def worker():
+            while True:
+                item = await inq.get()
+                if item is _END:
+                    inq.put_nowait(_END)  # let sibling workers see it
+                    return
+                stats.items_in += 1
+                stats.max_depth = max(stats.max_depth, inq.qsize() + 1)
+                start = time.perf_counter()
+                async for out in handler(item):
+                    stats.items_out += 1
+                    if outq is not None:
+                        put_start = time.perf_counter()
+                        await outq.put(out)
+                        stats.blocked += time.perf_counter() - put_start
+                stats.busy += time.perf_counter() - start
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        # Time spent waiting on a full output queue is not work
+        stats.busy -= stats.blocked
+        if outq is not None:
+            await outq.put(_END)
+
+    async def report_progress(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            depths = ", ".join(f"{name} {queue.qsize()}/{queue.maxsize}"
+                               for name, queue in self.queues.items())
+            logger.info(f"queues: {depths}; {self.stats['sink'].items_in} batches written, "
+                        f"RSS {peak_rss_kb() / 1024:.0f} MB")
+
+    async def run(self, progress=None):
+        started = time.perf_counter()
+        reporter = asyncio.create_task(self.report_progress(progress)) if progress else None
+        try:
+            await asyncio.gather(
+                self.produce(),
+                self.run_stage("read", self.read, self.queues["split"], self.read_workers),
+                self.run_stage("split", self.split, self.queues["chunk"]),
+                self.run_stage("chunk", self.chunk, self.queues["embed"]),
+                self.run_stage("embed", self.embed, self.queues["sink"], self.embed_workers),
+                self.run_stage("sink", self.write, None),
+            )
+        finally:
+            if reporter:
+                reporter.cancel()
+            await self.sink.close()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, wall):
+        return {
+            "wall_seconds": round(wall, 3),
+            "peak_rss_kb": peak_rss_kb(),
+            "chunks": self.cached + self.embedded,
+            "cached": self.cached,
+            "embedded": self.embedded,
+            "stages": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
+
+
+def print_report(report, file=sys.stderr):
+    wall = report["wall_seconds"] or 1.0
+    print(f"\n{'stage':<10} {'in':>8} {'out':>8} {'busy s':>8} {'blocked s':>10} "
+          f"{'items/s':>9} {'MB/s':>7} {'max queue':>10}", file=file)
+    print("-" * 78, file=file)
+    for name, stage in report["stages"].items():
+        rate = stage["items_out"] / wall
+        mb_per_s = f"{stage['bytes'] / wall / 1e6:.1f}" if stage["bytes"] else "-"
+        depth = f"{stage['max_depth']}/{stage['queue_max']}" if stage["queue_max"] else "-"
+        print(f"{name:<10} {stage['items_in']:>8} {stage['items_out']:>8} {stage['busy_seconds']:>8.2f} "
+              f"{stage['blocked_seconds']:>10.2f} {rate:>9.1f} {mb_per_s:>7} {depth:>10}", file=file)
+    print("-" * 78, file=file)
+    print(f"wall {report['wall_seconds']:.2f}s, peak RSS {report['peak_rss_kb'] / 1024:.1f} MB", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream active texts through chunk, clean, embed and sink")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--ids", nargs="+", help="Only these text ids (default: active texts)")
+    parser.add_argument("--embedder", default="hashing",
+                        help="'hashing[:dim]' (deterministic stand-in) or 'module:Class'")
+    parser.add_argument("--cache-root", default=str(DEFAULT_CACHE_ROOT), help="Embedding cache directory")
+    parser.add_argument("--sink", help="Sink class as 'module:Class' (default: JSON lines)")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Output of the default sink")
+    parser.add_argument("--no-clean", action="store_true",
+                        help="Embed chunk text as is, sharing embedding_cache.py's cache")
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES,
+                        help="Maximum chunk size in bytes")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedder call")
+    parser.add_argument("--read-ahead", type=int, default=2, help="Volumes buffered between stages")
+    parser.add_argument("--read-workers", type=int, default=2, help="Concurrent file reads")
+    parser.add_argument("--embed-workers", type=int, default=2, help="Concurrent embedder calls")
+    parser.add_argument("--queue-size", type=int, default=256, help="Chunks buffered between stages")
+    parser.add_argument("--progress", type=float, metavar="SECONDS", help="Log queue depths periodically")
+    parser.add_argument("--stats", help="Write the per-stage report as JSON")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    embedder = load_embedder(args.embedder)
+    cache_name = re.sub(r'[^\w.-]+', '_', embedder.name) + ("" if args.no_clean else "+clean")
+    cache_dir = Path(args.corpus_root) / args.cache_root / cache_name
+
+    with profile_session(args), EmbeddingCache(cache_dir, embedder.dim) as cache:
+        sink = load_sink(args.sink, Path(args.corpus_root) / args.output)
+        pipeline = Pipeline(
+            args.corpus_root, embedder, cache, sink, text_ids=args.ids, clean=not args.no_clean,
+            chunk_bytes=args.chunk_bytes, batch_size=args.batch_size, read_ahead=args.read_ahead,
+            read_workers=args.read_workers, embed_workers=args.embed_workers, queue_size=args.queue_size,
+        )
+        report = asyncio.run(pipeline.run(args.progress))
+        cache.save()
+
+    print_report(report)
+    if args.stats:
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    logger.info(f"{report['chunks']} chunks: {report['cached']} cached, {report['embedded']} embedded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Shared timing spans, throughput counters and peak-RSS sampling for the
+corpus scripts.
+
+Scripts wrap their major stages in named spans:
+
+    from instrumentation import span
+
+    with span("clean.read") as s:
+        text = f.read()
+        s.add(bytes=len(text), lines=text.count('\\n'))
+
+Spans cost next to nothing until profiling is enabled, which scripts do
+through the shared `--profile` flag:
+
+    parser = argparse.ArgumentParser(...)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    with profile_session(args):
+        ...
+
+`--profile` prints a per-stage table to stderr when the script finishes,
+`--profile stages.json` also writes the breakdown as JSON, and
+`--profile-cprofile out.pstats` additionally dumps cProfile stats
+(read them with `python -m pstats out.pstats`).
+"""
+
+import cProfile
+import contextlib
+import json
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_kb():
+    """Return the process's peak resident set size in KiB (0 if unavailable)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class _NullSpan:
+    """Returned by span() while profiling is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, bytes=0, lines=0):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, name, bytes, lines):
+        self.profiler = profiler
+        self.name = name
+        self.bytes = bytes
+        self.lines = lines
+
+    def __enter__(self):
+        self.rss_before = peak_rss_kb()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        rss_after = peak_rss_kb()
+        stage = self.profiler.stages.setdefault(self.name, {
+            "calls": 0, "seconds": 0.0, "bytes": 0, "lines": 0,
+            "peak_rss_kb": 0, "rss_growth_kb": 0,
+        })
+        stage["calls"] += 1
+        stage["seconds"] += elapsed
+        stage["bytes"] += self.bytes
+        stage["lines"] += self.lines
+        stage["peak_rss_kb"] = max(stage["peak_rss_kb"], rss_after)
+        stage["rss_growth_kb"] += rss_after - self.rss_before
+        return False
+
+    def add(self, bytes=0, lines=0):
+        """Attribute processed bytes/lines to this span."""
+        self.bytes += bytes
+        self.lines += lines
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.started = None
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.stages = {}
+        self.started = time.perf_counter() if self.enabled else None
+
+    def span(self, name, bytes=0, lines=0):
+        """Time a named stage; bytes/lines may be given here or via .add()."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, bytes, lines)
+
+    def report(self):
+        """Return the per-stage breakdown as a JSON-serializable dict."""
+        wall = time.perf_counter() - self.started if self.started else 0.0
+        stages = {}
+        for name, stage in self.stages.items():
+            entry = dict(stage)
+            entry["seconds"] = round(stage["seconds"], 6)
+            if stage["seconds"] > 0 and stage["bytes"]:
+                entry["mb_per_s"] = round(stage["bytes"] / stage["seconds"] / 1e6, 2)
+            if stage["seconds"] > 0 and stage["lines"]:
+                entry["lines_per_s"] = round(stage["lines"] / stage["seconds"])
+            stages[name] = entry
+        return {
+            "wall_seconds": round(wall, 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": stages,
+        }
+
+    def print_table(self, file=sys.stderr):
+        report = self.report()
+        print(f"\n{'stage':<36} {'calls':>7} {'seconds':>9} {'%wall':>6} "
+              f"{'MB/s':>8} {'lines/s':>10} {'+RSS MB':>8}", file=file)
+        print("-" * 90, file=file)
+        wall = report["wall_seconds"] or 1.0
+        for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            mb_per_s = f"{stage['mb_per_s']:.1f}" if "mb_per_s" in stage else "-"
+            lines_per_s = f"{stage['lines_per_s']:,}" if "lines_per_s" in stage else "-"
+            print(f"{name:<36} {stage['calls']:>7} {stage['seconds']:>9.3f} "
+                  f"{100 * stage['seconds'] / wall:>5.1f}% {mb_per_s:>8} {lines_per_s:>10} "
+                  f"{stage['rss_growth_kb'] / 1024:>8.1f}", file=file)
+        print("-" * 90, file=file)
+        print(f"wall {report['wall_seconds']:.3f}s, peak RSS {report['peak_rss_kb'] / 1024:.1f} MB",
+              file=file)
+
+
+PROFILER = Profiler()
+span = PROFILER.span
+
+
+def add_profile_arguments(parser):
+    """Add the shared --profile/--profile-cprofile flags to a script's parser."""
+    parser.add_argument("--profile", nargs="?", const="-", metavar="JSON",
+                        help="Print a per-stage timing breakdown; with a path, also write it as JSON")
+    parser.add_argument("--profile-cprofile", metavar="PSTATS",
+                        help="Also dump cProfile stats to this file")
+
+
+@contextlib.contextmanager
+def profile_session(args):
+    """Enable profiling for the body if --profile was given, then report."""
+    if not getattr(args, "profile", None) and not getattr(args, "profile_cprofile", None):
+        yield
+        return
+
+    PROFILER.reset()
+    PROFILER.enable()
+    profiler = cProfile.Profile() if args.profile_cprofile else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile_cprofile)
+        PROFILER.disable()
+        PROFILER.print_table()
+        if args.profile and args.profile != "-":
+            path = Path(args.profile)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(PROFILER.report(), f, indent=2)
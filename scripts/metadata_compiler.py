@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Declarative metadata compiler for sources/*.meta.yaml and manifest.yaml.
+
+The metadata is declared in six places, merged in this order (later
+sources win on the keys they set):
+
+  1. generate-church-fathers-metadata.py  ANF/NPNF volume metadata
+  2. generate-bible-metadata.py           KJV and SBLGNT metadata and book sections
+  3. generate-lxx-metadata.py             LXX metadata and book sections
+  4. add-anthology-sections.py            hand-curated ANF-01 sections
+  5. anthology-sections-complete.yaml     sections of the other anthology volumes
+  6. update-manifest-church-fathers.py    manifest entries and categories
+
+Every output is built in memory from the file on disk plus these sources.
+Declared keys replace existing values; keys found only on disk are kept,
+such as hand edits and the temporal fields added to sections. Sections
+are matched by author and title (or start_marker): declared fields win,
+other fields survive, and existing sections that no source declares
+stay after the declared ones.
+
+Because declared values win, a start_marker rewritten only in a
+.meta.yaml file would be reverted by the next compile. Tools that rewrite
+markers (mojibake.py repair, clean.py --repair-mojibake) call
+replace_declared_markers so the declaring source changes with them.
+
+`created` and `last_modified` are never taken from the sources. A file
+keeps its dates unless its content changes, in which case last_modified
+(or the manifest's last_updated) becomes today. Only files whose content
+changed are written, so a second run writes nothing. Written anthology
+metadata also refreshes the text's section offset table when the text is
+hydrated.
+
+Usage:
+    python scripts/metadata_compiler.py            # write changed files
+    python scripts/metadata_compiler.py --diff     # show what would change
+    python scripts/metadata_compiler.py --check    # exit 1 if anything would change
+"""
+
+import argparse
+import ast
+import copy
+import difflib
+import importlib.util
+import json
+import re
+import sys
+from datetime import date
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import parse_lfs_pointer
+from instrumentation import span, add_profile_arguments, profile_session
+from section_index import load_section_index
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MANIFEST = Path("manifest.yaml")
+# Sources that declare start_markers, with the pattern of a marker and its literal
+DECLARED_MARKERS = {
+    Path("scripts/add-anthology-sections.py"): (re.compile(r'("start_marker":\s*)("(?:[^"\\]|\\.)*")'),
+                                               ast.literal_eval),
+    Path("anthology-sections-complete.yaml"): (re.compile(r'^(\s*(?:-\s*)?start_marker:\s*)(.+?)\s*$', re.M),
+                                               yaml.safe_load),
+}
+MANAGED_DATES = ("created", "last_modified")
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _load_script(name, filename):
+    # Hyphenated file names cannot be imported by module name
+    spec = importlib.util.spec_from_file_location(name, Path(__file__).parent / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def dump(data):
+    return yaml.dump(data, default_flow_style=False, sort_keys=False, allow_unicode=True)
+
+
+def _section_match(existing, section, used):
+    for key in (("author", "title"), ("start_marker",)):
+        wanted = tuple(section.get(field) for field in key)
+        if not any(wanted):
+            continue
+        for candidate in existing:
+            if id(candidate) not in used and tuple(candidate.get(field) for field in key) == wanted:
+                return candidate
+    return None
+
+
+def merge_sections(existing, declared):
+    """
+    Merge a declared section list into an existing one without dropping
+    sections. The existing order is kept; a newly declared section goes
+    right after the section declared before it.
+    """
+    slots = {id(section): [copy.deepcopy(section)] for section in existing}
+    leading, used, last = [], set(), None
+    for section in declared:
+        previous = _section_match(existing, section, used)
+        if previous is None:
+            (last if last is not None else leading).append(copy.deepcopy(section))
+            continue
+        used.add(id(previous))
+        last = slots[id(previous)]
+        last[0] = merge(previous, section)
+    return leading + [section for existing_section in existing for section in slots[id(existing_section)]]
+
+
+def merge(existing, declared):
+    """Deep-merge declared into existing; declared wins, existing-only keys are kept."""
+    if not (isinstance(existing, dict) and isinstance(declared, dict)):
+        return copy.deepcopy(declared)
+    merged = copy.deepcopy(existing)
+    for key, value in declared.items():
+        if key == "sections" and isinstance(existing.get(key), list) and isinstance(value, list):
+            merged[key] = merge_sections(existing[key], value)
+        elif key in existing:
+            merged[key] = merge(existing[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _without_dates(metadata):
+    technical = metadata.get("technical")
+    if isinstance(technical, dict):
+        metadata = dict(metadata)
+        metadata["technical"] = {k: v for k, v in technical.items() if k not in MANAGED_DATES}
+    return metadata
+
+
+def declared_metadata(corpus_root="."):
+    """
+    Return {metadata path: (declared metadata, is_full_document)} with all
+    sources merged in order. Section-only declarations are not full documents
+    and are skipped for volumes without a metadata file.
+    """
+    corpus_root = Path(corpus_root)
+    declared = {}
+
+    def declare(path, metadata, full=True):
+        metadata = _without_dates(metadata)
+        if path in declared:
+            previous, was_full = declared[path]
+            declared[path] = (merge(previous, metadata), was_full or full)
+        else:
+            declared[path] = (metadata, full)
+
+    church_fathers = _load_script("generate_church_fathers_metadata", "generate-church-fathers-metadata.py")
+    for volume_id, info in church_fathers.CHURCH_FATHERS_METADATA.items():
+        declare(Path(f"sources/{volume_id}.meta.yaml"), church_fathers.generate_metadata(volume_id, info))
+
+    bible = _load_script("generate_bible_metadata", "generate-bible-metadata.py")
+    declare(Path("sources/BIBLE-KJV.meta.yaml"), bible.kjv_metadata())
+    declare(Path("sources/BIBLE-SBLGNT.meta.yaml"), bible.sblgnt_metadata())
+
+    lxx = _load_script("generate_lxx_metadata", "generate-lxx-metadata.py")
+    declare(Path("sources/BIBLE-LXX.meta.yaml"), lxx.lxx_metadata())
+
+    curated = _load_script("add_anthology_sections", "add-anthology-sections.py")
+    for volume_id, sections in curated.ANTHOLOGY_SECTIONS.items():
+        declare(Path(f"sources/{volume_id}.meta.yaml"),
+                {"text_info": {"is_anthology": True, "sections": sections}}, full=False)
+
+    anthology = _load_script("update_anthology_metadata", "update-anthology-metadata.py")
+    for volume_id, section_data in anthology.load_anthology_sections(corpus_root).items():
+        declare(Path(f"sources/{volume_id}.meta.yaml"),
+                {"text_info": {"is_anthology": section_data["is_anthology"],
+                               "sections": section_data["sections"]}}, full=False)
+    return declared
+
+
+def compile_manifest(manifest, today):
+    """Return a copy of manifest with the Church Fathers entries and categories applied."""
+    church_fathers = _load_script("generate_church_fathers_metadata", "generate-church-fathers-metadata.py")
+    manifest_source = _load_script("update_manifest_church_fathers", "update-manifest-church-fathers.py")
+    manifest = copy.deepcopy(manifest)
+
+    texts = manifest.setdefault("texts", [])
+    known = {text["id"] for text in texts}
+    for volume_id, info in church_fathers.CHURCH_FATHERS_METADATA.items():
+        if volume_id.lower() not in known:
+            entry = manifest_source.text_entry(volume_id, info)
+            entry["added"] = today
+            texts.append(entry)
+
+    categories = manifest.get("categories") or {}
+    manifest["categories"] = categories
+    categories.update(manifest_source.church_fathers_categories(categories))
+    return manifest
+
+
+class Output:
+    """One compiled file: what is on disk and what the compiler produced."""
+
+    def __init__(self, path, old_text, old_data, new_data):
+        self.path = path
+        self.old_text = old_text
+        self.old_data = old_data
+        self.new_data = new_data
+        self.new_text = old_text if new_data == old_data else dump(new_data)
+
+    @property
+    def changed(self):
+        return self.new_text != self.old_text
+
+
+def _read(path):
+    if not path.exists():
+        return None, None
+    text = path.read_text(encoding='utf-8')
+    return text, yaml.load(text, Loader=SafeLoader)
+
+
+def compile_all(corpus_root=".", today=None):
+    """Build every output in memory; return a list of Output in a fixed order."""
+    corpus_root = Path(corpus_root)
+    today = today or date.today().isoformat()
+    outputs = []
+
+    with span("metadata.declare"):
+        declared = declared_metadata(corpus_root)
+
+    with span("metadata.merge", lines=len(declared)):
+        for path in sorted(declared):
+            metadata, full = declared[path]
+            old_text, existing = _read(corpus_root / path)
+            if existing is None and not full:
+                logger.warning(f"{path}: metadata file not found; sections not applied")
+                continue
+            compiled = merge(existing, metadata) if existing is not None else copy.deepcopy(metadata)
+            technical = compiled.get("technical")
+            if isinstance(technical, dict):
+                if existing is None:
+                    technical["created"] = technical["last_modified"] = today
+                elif compiled != existing and "last_modified" in technical:
+                    technical["last_modified"] = today
+            outputs.append(Output(path, old_text, existing, compiled))
+
+        old_text, manifest = _read(corpus_root / MANIFEST)
+        compiled = compile_manifest(manifest or {}, today)
+        if compiled != manifest and isinstance(compiled.get("corpus"), dict):
+            compiled["corpus"]["last_updated"] = today
+        outputs.append(Output(MANIFEST, old_text, manifest, compiled))
+    return outputs
+
+
+def replace_declared_markers(corpus_root, replacements):
+    """
+    Rewrite start_markers in the declaring sources: {old marker: new marker}.
+    Only the marker literals change; returns the paths written.
+    """
+    written = []
+    for relative, (pattern, parse) in DECLARED_MARKERS.items():
+        path = Path(corpus_root) / relative
+        if not path.exists():
+            continue
+        text = path.read_text(encoding='utf-8')
+
+        def replace(match):
+            marker = parse(match.group(2))
+            if marker not in replacements:
+                return match.group()
+            # A JSON string is a valid Python and YAML double-quoted literal
+            return match.group(1) + json.dumps(replacements[marker], ensure_ascii=False)
+
+        new_text = pattern.sub(replace, text)
+        if new_text != text:
+            tmp_path = path.with_name(path.name + '.tmp')
+            tmp_path.write_text(new_text, encoding='utf-8')
+            tmp_path.replace(path)
+            written.append(relative)
+            logger.info(f"Updated start_markers in {relative}")
+    return written
+
+
+def refresh_section_index(corpus_root, output, manifest):
+    """Rebuild the offset table of a written metadata file's text, if hydrated."""
+    sections = ((output.new_data or {}).get("text_info") or {}).get("sections")
+    if not sections:
+        return
+    for text in manifest.get("texts", []):
+        if text.get("metadata") == output.path.as_posix() and "file" in text:
+            text_path = Path(corpus_root) / text["file"]
+            if text_path.exists() and not parse_lfs_pointer(text_path):
+                with span("metadata.section_index", bytes=text_path.stat().st_size):
+                    load_section_index(text_path, sections)
+
+
+def write_outputs(corpus_root, outputs):
+    """Write changed outputs; return how many were written."""
+    corpus_root = Path(corpus_root)
+    manifest = next(output.new_data for output in outputs if output.path == MANIFEST)
+    written = 0
+    for output in outputs:
+        if not output.changed:
+            continue
+        path = corpus_root / output.path
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(output.new_text, encoding='utf-8')
+        tmp_path.replace(path)
+        written += 1
+        logger.info(f"Wrote {output.path}")
+        if output.path != MANIFEST:
+            refresh_section_index(corpus_root, output, manifest)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile corpus metadata from its declarative sources")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--diff", action="store_true", help="Print a diff of the changes without writing")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any file would change, without writing")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    with profile_session(args):
+        outputs = compile_all(args.corpus_root)
+        changed = [output for output in outputs if output.changed]
+
+        if args.diff:
+            for output in changed:
+                sys.stdout.writelines(difflib.unified_diff(
+                    (output.old_text or "").splitlines(keepends=True), output.new_text.splitlines(keepends=True),
+                    f"a/{output.path.as_posix()}", f"b/{output.path.as_posix()}"))
+        if args.check or args.diff:
+            logger.info(f"{len(changed)} of {len(outputs)} files would change")
+            sys.exit(1 if args.check and changed else 0)
+
+        written = write_outputs(args.corpus_root, outputs)
+    logger.info(f"{written} of {len(outputs)} files changed")
+
+
+if __name__ == "__main__":
+    main()
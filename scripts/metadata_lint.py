@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Metadata linting in one pass.
+
+Each sources/*.meta.yaml file is parsed exactly once, in a worker pool, and
+every registered rule runs over the parsed object. Findings from all files
+and rules are combined into one report (same layout as validate.py's).
+
+Built-in rules:
+  required_sections      text_info/publication/technical and text_info id, title, author
+  temporal_completeness  anthology sections have composition_year, author_region, author_location
+  marker_presence        every section's start_marker occurs in the text
+  year_sanity            composition_year is an integer in range; uncertainty is low/medium/high
+  region_vocabulary      author_region is Eastern or Western
+
+More rules can be added from other modules (--rules-module) with the
+@rule decorator:
+
+    from metadata_lint import rule
+
+    @rule("has_language", "publication.original_language is set")
+    def has_language(meta):
+        if not meta.metadata.get("publication", {}).get("original_language"):
+            yield "warning", "Missing publication.original_language"
+
+Usage:
+    python scripts/metadata_lint.py                          # all rules, all metadata files
+    python scripts/metadata_lint.py --rule temporal_completeness year_sanity
+    python scripts/metadata_lint.py --report metadata_report.yaml --workers 4
+    python scripts/metadata_lint.py --list-rules
+"""
+
+import argparse
+import importlib
+import sys
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing
+from instrumentation import span, add_profile_arguments, profile_session
+from section_index import load_section_index, locate_sections
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("error", "warning", "info")
+
+REQUIRED_METADATA_SECTIONS = ["text_info", "publication", "technical"]
+REQUIRED_TEXT_INFO_FIELDS = ["id", "title", "author"]
+TEMPORAL_FIELDS = ["composition_year", "author_region", "author_location"]
+UNCERTAINTY_VALUES = ("low", "medium", "high")
+REGIONS = ("Eastern", "Western")
+# Oldest biblical material to the latest Church Fathers
+YEAR_RANGE = (-2000, 1000)
+
+Rule = namedtuple("Rule", ["name", "description", "check"])
+Finding = namedtuple("Finding", ["file", "rule", "severity", "message"])
+
+RULES = {}
+
+# Rule modules import this file as `metadata_lint`; when it runs as a script
+# make that the same module so their rules land in this registry
+if __name__ in ("__main__", "__mp_main__"):
+    sys.modules.setdefault("metadata_lint", sys.modules[__name__])
+
+
+def rule(name, description):
+    """Register a rule: a generator taking a MetadataFile and yielding (severity, message)."""
+    def register(check):
+        RULES[name] = Rule(name, description, check)
+        return check
+    return register
+
+
+class MetadataFile:
+    """One parsed metadata file and the manifest entry that refers to it."""
+
+    def __init__(self, corpus_root, path, metadata, text_entry=None):
+        self.corpus_root = Path(corpus_root)
+        self.path = path
+        self.metadata = metadata if isinstance(metadata, dict) else {}
+        self.text_entry = text_entry
+        self._ranges = None
+
+    @property
+    def text_info(self):
+        return self.metadata.get("text_info") or {}
+
+    @property
+    def sections(self):
+        return self.text_info.get("sections") or []
+
+    def section_label(self, index):
+        section = self.sections[index]
+        return f"section {index} ({section.get('author', 'Unknown')}: {section.get('title', 'Unknown')})"
+
+    def section_ranges(self):
+        """
+        Byte ranges of the sections in the text (None where a marker is not
+        found), from the cached offset table when the text is hydrated.
+        Raises LfsObjectMissing/FileNotFoundError if the text is unavailable.
+        """
+        if self._ranges is None:
+            if not self.text_entry or "file" not in self.text_entry:
+                raise FileNotFoundError(f"{self.path} is not referenced by a manifest text")
+            files = CorpusFiles(self.corpus_root)
+            text_path = self.corpus_root / self.text_entry["file"]
+            if files.is_pointer(text_path):
+                self._ranges = locate_sections(files.read_bytes(text_path), self.sections)
+            else:
+                table = load_section_index(text_path, self.sections)
+                self._ranges = [
+                    (entry["start_offset"], entry["end_offset"]) if entry["start_offset"] is not None else None
+                    for entry in table["sections"]
+                ]
+        return self._ranges
+
+
+@rule("required_sections", "text_info/publication/technical and text_info id, title, author")
+def check_required_sections(meta):
+    for field in REQUIRED_METADATA_SECTIONS:
+        if field not in meta.metadata:
+            yield "warning", f"Missing metadata section '{field}'"
+    if "text_info" in meta.metadata:
+        for field in REQUIRED_TEXT_INFO_FIELDS:
+            if field not in meta.text_info:
+                yield "warning", f"Missing text_info field '{field}'"
+
+
+@rule("temporal_completeness", "Anthology sections have composition_year, author_region, author_location")
+def check_temporal_completeness(meta):
+    if not meta.text_info.get("is_anthology", False):
+        return
+    for index, section in enumerate(meta.sections):
+        missing = [field for field in TEMPORAL_FIELDS if field not in section]
+        if missing:
+            yield "error", f"{meta.section_label(index)}: missing {', '.join(missing)}"
+
+
+@rule("marker_presence", "Every section's start_marker occurs in the text")
+def check_marker_presence(meta):
+    if not meta.sections:
+        return
+    try:
+        ranges = meta.section_ranges()
+    except (LfsObjectMissing, FileNotFoundError) as e:
+        yield "info", f"Markers not checked: {e}"
+        return
+    seen = {}
+    for index, (section, found) in enumerate(zip(meta.sections, ranges)):
+        if not section.get("start_marker"):
+            yield "error", f"{meta.section_label(index)}: no start_marker"
+        elif found is None:
+            yield "warning", f"{meta.section_label(index)}: start_marker not found in text"
+        elif found[0] in seen:
+            yield "warning", (f"{meta.section_label(index)}: start_marker resolves to the same "
+                              f"position as section {seen[found[0]]}")
+        else:
+            seen[found[0]] = index
+
+
+@rule("year_sanity", "composition_year is an integer in range; uncertainty is low/medium/high")
+def check_year_sanity(meta):
+    low, high = YEAR_RANGE
+    for index, section in enumerate(meta.sections):
+        year = section.get("composition_year")
+        if year is not None:
+            if not isinstance(year, int) or isinstance(year, bool):
+                yield "error", f"{meta.section_label(index)}: composition_year {year!r} is not an integer"
+            elif not low <= year <= high:
+                yield "error", f"{meta.section_label(index)}: composition_year {year} outside {low}..{high}"
+        uncertainty = section.get("composition_uncertainty")
+        if uncertainty is not None and uncertainty not in UNCERTAINTY_VALUES:
+            yield "warning", (f"{meta.section_label(index)}: composition_uncertainty {uncertainty!r} "
+                              f"not one of {', '.join(UNCERTAINTY_VALUES)}")
+
+
+@rule("region_vocabulary", "author_region is Eastern or Western")
+def check_region_vocabulary(meta):
+    for index, section in enumerate(meta.sections):
+        region = section.get("author_region")
+        if region is not None and region not in REGIONS:
+            yield "warning", f"{meta.section_label(index)}: author_region {region!r} not one of {', '.join(REGIONS)}"
+
+
+def load_rule_modules(modules):
+    for module_name in modules or []:
+        importlib.import_module(module_name)
+
+
+def lint_file(corpus_root, path, text_entry, rule_names):
+    """Parse one metadata file and run the rules; return (findings, stats)."""
+    corpus_root = Path(corpus_root)
+    findings = []
+    try:
+        with open(corpus_root / path, 'r', encoding='utf-8') as f:
+            metadata = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        return [Finding(path, "parse", "error", f"Cannot load metadata: {e}")], {}
+
+    meta = MetadataFile(corpus_root, path, metadata, text_entry)
+    for name in rule_names:
+        try:
+            for severity, message in RULES[name].check(meta):
+                findings.append(Finding(path, name, severity, message))
+        except Exception as e:
+            findings.append(Finding(path, name, "error", f"Rule failed: {e!r}"))
+
+    stats = {"sections": len(meta.sections)}
+    if meta.text_info.get("is_anthology", False):
+        stats["anthology_sections"] = len(meta.sections)
+        stats["anthology_sections_with_temporal"] = sum(
+            1 for section in meta.sections if all(field in section for field in TEMPORAL_FIELDS)
+        )
+    return findings, stats
+
+
+def _init_worker(modules):
+    load_rule_modules(modules)
+
+
+def _lint_task(task):
+    return lint_file(*task)
+
+
+def metadata_targets(corpus_root, paths=None):
+    """Return (relative metadata path, manifest entry or None) pairs to lint."""
+    corpus_root = Path(corpus_root)
+    entries = {}
+    manifest_path = corpus_root / "manifest.yaml"
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = yaml.safe_load(f) or {}
+        for text_entry in manifest.get("texts", []):
+            if "metadata" in text_entry:
+                entries[Path(text_entry["metadata"]).as_posix()] = text_entry
+    if paths is None:
+        paths = [p.relative_to(corpus_root).as_posix() for p in sorted(corpus_root.glob("sources/*.meta.yaml"))]
+    return [(Path(path).as_posix(), entries.get(Path(path).as_posix())) for path in paths]
+
+
+def lint_metadata(corpus_root=".", paths=None, rule_names=None, workers=None, rule_modules=None):
+    """
+    Lint metadata files (default: sources/*.meta.yaml) with the named rules
+    (default: all). Returns (findings, stats).
+    """
+    load_rule_modules(rule_modules)
+    rule_names = list(rule_names or RULES)
+    unknown = [name for name in rule_names if name not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown rule(s): {', '.join(unknown)}")
+
+    targets = metadata_targets(corpus_root, paths)
+    tasks = [(str(corpus_root), path, text_entry, rule_names) for path, text_entry in targets]
+    with span("lint.files", lines=len(tasks)):
+        if workers == 1 or len(tasks) <= 1:
+            results = [_lint_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(rule_modules,)) as executor:
+                results = list(executor.map(_lint_task, tasks))
+
+    findings = []
+    stats = Counter(files=len(tasks))
+    for file_findings, file_stats in results:
+        findings.extend(file_findings)
+        stats.update(file_stats)
+    return findings, dict(stats)
+
+
+def build_report(findings, stats):
+    """Combined report: summary, per-rule counts and findings grouped by file."""
+    counts = Counter(finding.severity for finding in findings)
+    by_rule = {}
+    by_file = {}
+    for finding in findings:
+        by_rule.setdefault(finding.rule, Counter())[finding.severity] += 1
+        by_file.setdefault(finding.file, []).append(
+            {"rule": finding.rule, "severity": finding.severity, "message": finding.message}
+        )
+    return {
+        "metadata_summary": {
+            "files": stats.get("files", 0),
+            "sections": stats.get("sections", 0),
+            "anthology_sections": stats.get("anthology_sections", 0),
+            "anthology_sections_with_temporal": stats.get("anthology_sections_with_temporal", 0),
+            "errors": counts["error"],
+            "warnings": counts["warning"],
+            "info": counts["info"],
+            "status": "PASS" if counts["error"] == 0 else "FAIL",
+        },
+        "rules": {name: dict(counter) for name, counter in sorted(by_rule.items())},
+        "findings": by_file,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lint corpus metadata files in one parallel pass")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("files", nargs="*", help="Metadata files relative to the corpus root (default: sources/*.meta.yaml)")
+    parser.add_argument("--rule", nargs="+", help="Rules to run (default: all)")
+    parser.add_argument("--rules-module", action="append", help="Import a module that registers more rules")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--report", help="Save the report to a YAML file")
+    parser.add_argument("--list-rules", action="store_true", help="List rules and exit")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    load_rule_modules(args.rules_module)
+
+    if args.list_rules:
+        for name, registered in RULES.items():
+            print(f"{name:<24} {registered.description}")
+        return
+
+    with profile_session(args):
+        try:
+            findings, stats = lint_metadata(args.corpus_root, args.files or None, args.rule,
+                                            args.workers, args.rules_module)
+        except ValueError as e:
+            parser.error(str(e))
+        report = build_report(findings, stats)
+
+    for finding in findings:
+        log = {"error": logger.error, "warning": logger.warning}.get(finding.severity, logger.info)
+        log(f"{finding.file} [{finding.rule}] {finding.message}")
+
+    summary = report["metadata_summary"]
+    logger.info(f"{summary['files']} metadata files, {summary['sections']} sections: "
+                f"{summary['errors']} errors, {summary['warnings']} warnings")
+    if summary["anthology_sections"]:
+        logger.info(f"Temporal metadata: {summary['anthology_sections_with_temporal']}/"
+                    f"{summary['anthology_sections']} anthology sections complete")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            yaml.dump(report, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+        logger.info(f"Report saved to {args.report}")
+
+    sys.exit(0 if summary["status"] == "PASS" else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Detect and repair UTF-8-read-as-cp1252 mojibake.
+
+The CCEL-derived volumes contain UTF-8 text that was once decoded as
+cp1252 (or Latin-1) and re-encoded: "æ" became "Ã¦", "’" became "â€™".
+The damage reached curated metadata too, as start_markers such as
+"SmyrnÃ¦ans", and a marker only matches while the text stays broken in the
+same way.
+
+MOJIBAKE_PATTERN matches runs of such sequences: a UTF-8 lead byte
+followed by the right number of continuation bytes, each shown as its
+cp1252 (or, for the five bytes cp1252 leaves undefined, Latin-1)
+character. One re.sub pass over a volume maps every run back to bytes and
+decodes it as UTF-8, repeating for doubly encoded runs.
+
+Correct text can match the pattern too: an uppercase accented letter is a
+lead byte and a smart quote or dash is a continuation byte, so "CAFÉ”"
+would decode to "CAFɔ". A decoded run is therefore only accepted when
+every character is one cp1252 text is made of (Latin-1, Latin
+Extended-A, General Punctuation and the other cp1252 characters); any
+other run is repaired sequence by sequence under the same rule or left
+alone. REGRESSION_CASES lists the inputs this must get right and
+`self-test` checks them.
+
+`repair` rewrites each text and, in the same step, replaces every broken
+start_marker whose repaired form occurs in the repaired text, both in the
+.meta.yaml file and in the source that declares it (see
+metadata_compiler.replace_declared_markers), so a later compile keeps it.
+
+Usage:
+    python scripts/mojibake.py scan                    # per-file counts
+    python scripts/mojibake.py scan anf-01 --report 10
+    python scripts/mojibake.py repair                  # texts and metadata
+    python scripts/mojibake.py self-test
+"""
+
+import argparse
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing
+from instrumentation import span, add_profile_arguments, profile_session
+from metadata_compiler import replace_declared_markers
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _byte_char(b):
+    try:
+        return bytes([b]).decode('cp1252')
+    except UnicodeDecodeError:
+        return chr(b)  # 0x81, 0x8D, 0x8F, 0x90, 0x9D pass through as C1 controls
+
+
+# Character -> original byte, for the 128 high bytes as cp1252 shows them
+# and their Latin-1 C1 readings
+BYTE_OF = {_byte_char(b): b for b in range(0x80, 0x100)}
+BYTE_OF.update({chr(b): b for b in range(0x80, 0xA0)})
+
+
+def _char_class(low, high):
+    chars = {_byte_char(b) for b in range(low, high + 1)}
+    if low < 0xA0:
+        chars |= {chr(b) for b in range(max(low, 0x80), min(high, 0x9F) + 1)}
+    return "[" + "".join(re.escape(c) for c in sorted(chars)) + "]"
+
+
+_CONT = _char_class(0x80, 0xBF)
+_SEQUENCE = f"(?:{_char_class(0xC2, 0xDF)}{_CONT}|{_char_class(0xE0, 0xEF)}{_CONT}{{2}}" \
+            f"|{_char_class(0xF0, 0xF4)}{_CONT}{{3}})"
+MOJIBAKE_PATTERN = re.compile(f"{_SEQUENCE}+")
+SEQUENCE_PATTERN = re.compile(_SEQUENCE)
+MAX_ENCODINGS = 3
+
+# What a repaired run may decode to: the characters cp1252 text is made of,
+# plus the rest of Latin Extended-A and General Punctuation
+PLAUSIBLE = frozenset(BYTE_OF) - {chr(b) for b in range(0x80, 0xA0)}
+PLAUSIBLE |= {chr(c) for c in range(0x0100, 0x0180)} | {chr(c) for c in range(0x2000, 0x2070)}
+
+# (input, expected repair): real mojibake, and correct text that looks like it
+REGRESSION_CASES = [
+    ("SmyrnÃ¦ans", "Smyrnæans"),
+    ("Irenâ€™s", "Iren’s"),
+    ("â€œQuodâ€\x9d", "“Quod”"),
+    ("Ã¢â‚¬â„¢", "’"),
+    ("Ã©tÃ© â€” Å“uvre", "été — œuvre"),
+    ("“CAFÉ”", "“CAFÉ”"),
+    ("NOË’s", "NOË’s"),
+    ("Ò—", "Ò—"),
+    ("É\xa0Paris", "É\xa0Paris"),
+    ("“ÉTÉ”—Ã©tÃ©", "“ÉTÉ”—été"),
+    ("MÜ–", "MÜ–"),
+]
+
+
+def _decode(run):
+    """UTF-8 reading of a mojibake run, or None if it is not valid UTF-8."""
+    try:
+        return bytes(BYTE_OF[c] for c in run).decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+
+def _plausible(text):
+    return text is not None and all(c in PLAUSIBLE for c in text)
+
+
+def _repair_sequence(sequence):
+    fixed = _decode(sequence)
+    return fixed if _plausible(fixed) else sequence
+
+
+def repair_run(run):
+    """Repair one matched run, undoing up to MAX_ENCODINGS layers."""
+    fixed = _decode(run)
+    for _ in range(MAX_ENCODINGS - 1):
+        if fixed is None or not MOJIBAKE_PATTERN.fullmatch(fixed):
+            break
+        again = _decode(fixed)
+        if not _plausible(again) and _plausible(fixed):
+            break
+        fixed = again
+    if _plausible(fixed):
+        return fixed
+    # Mixed or implausible run: repair the sequences that pass on their own
+    return SEQUENCE_PATTERN.sub(lambda m: _repair_sequence(m.group()), run)
+
+
+def repair_mojibake(text):
+    """Return (repaired text, Counter of broken -> repaired sequences)."""
+    counts = Counter()
+
+    def replace(match):
+        run = match.group()
+        fixed = repair_run(run)
+        if fixed != run:
+            counts[(run, fixed)] += 1
+        return fixed
+
+    return MOJIBAKE_PATTERN.sub(replace, text), counts
+
+
+def self_test():
+    """Check REGRESSION_CASES; return the failures as (input, expected, actual)."""
+    failures = []
+    for text, expected in REGRESSION_CASES:
+        actual, _ = repair_mojibake(text)
+        if actual != expected:
+            failures.append((text, expected, actual))
+    return failures
+
+
+def reconcile_markers(metadata, text):
+    """
+    Repair broken start_markers of metadata text_info.sections in place
+    where the repaired marker occurs in the (repaired) text. Returns
+    (fixed markers as (old, new) pairs, markers still unmatched).
+    """
+    sections = ((metadata or {}).get("text_info") or {}).get("sections") or []
+    fixed, unmatched = [], []
+    for section in sections:
+        marker = section.get("start_marker")
+        if not marker:
+            continue
+        repaired, counts = repair_mojibake(marker)
+        if not counts:
+            continue
+        if repaired in text:
+            section["start_marker"] = repaired
+            fixed.append((marker, repaired))
+        else:
+            unmatched.append(marker)
+    return fixed, unmatched
+
+
+def manifest_entries(corpus_root, text_ids=None):
+    with open(Path(corpus_root) / "manifest.yaml", 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f)
+    for entry in manifest.get("texts", []):
+        if "file" in entry and (not text_ids or entry["id"] in text_ids):
+            yield entry
+
+
+def format_counts(counts, top):
+    return ", ".join(f"{broken!r} -> {fixed!r} x{n}" for (broken, fixed), n in counts.most_common(top))
+
+
+def scan(corpus_root=".", text_ids=None, report=0):
+    """Log per-file mojibake counts; return {text_id: Counter}."""
+    files = CorpusFiles(corpus_root)
+    results = {}
+    for entry in manifest_entries(corpus_root, text_ids):
+        try:
+            with span("mojibake.read") as s:
+                text = files.read_text(entry["file"])
+                s.add(bytes=len(text))
+        except (LfsObjectMissing, FileNotFoundError) as e:
+            logger.warning(f"{entry['id']}: skipped ({e})")
+            continue
+        with span("mojibake.scan", bytes=len(text)):
+            _, counts = repair_mojibake(text)
+        results[entry["id"]] = counts
+        logger.info(f"{entry['id']}: {sum(counts.values())} mojibake sequences ({len(counts)} distinct)")
+        if report and counts:
+            logger.info(f"  {format_counts(counts, report)}")
+    return results
+
+
+def repair(corpus_root=".", text_ids=None, backup=True):
+    """Repair texts and reconcile their metadata; return {text_id: Counter}."""
+    corpus_root = Path(corpus_root)
+    files = CorpusFiles(corpus_root)
+    results = {}
+    for entry in manifest_entries(corpus_root, text_ids):
+        path = corpus_root / entry["file"]
+        try:
+            if files.hydrate(path):
+                logger.info(f"Hydrated git-lfs pointer {path}")
+        except (LfsObjectMissing, FileNotFoundError) as e:
+            logger.warning(f"{entry['id']}: skipped ({e})")
+            continue
+
+        with span("mojibake.read") as s:
+            original = path.read_text(encoding='utf-8')
+            s.add(bytes=len(original))
+        with span("mojibake.repair", bytes=len(original)):
+            text, counts = repair_mojibake(original)
+        results[entry["id"]] = counts
+        if counts:
+            if backup:
+                path.with_suffix(path.suffix + '.bak').write_text(original, encoding='utf-8')
+            with span("mojibake.write", bytes=len(text)):
+                path.write_text(text, encoding='utf-8')
+        logger.info(f"{entry['id']}: repaired {sum(counts.values())} mojibake sequences ({len(counts)} distinct)")
+
+        meta_path = corpus_root / entry.get("metadata", "")
+        if "metadata" not in entry or not meta_path.is_file():
+            continue
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metadata = yaml.safe_load(f)
+        fixed, unmatched = reconcile_markers(metadata, text)
+        for old, new in fixed:
+            logger.info(f"  {meta_path.name}: start_marker {old!r} -> {new!r}")
+        for marker in unmatched:
+            logger.warning(f"  {meta_path.name}: start_marker {marker!r} has mojibake but its repair "
+                           f"is not in the text")
+        if fixed:
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                yaml.dump(metadata, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+            replace_declared_markers(corpus_root, dict(fixed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect and repair mojibake in corpus texts")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = subparsers.add_parser("scan", help="Count mojibake sequences per file")
+    scan_parser.add_argument("ids", nargs="*", help="Text ids (default: all)")
+    scan_parser.add_argument("--report", type=int, default=0, metavar="N",
+                             help="Also list the N most frequent repairs per file")
+    add_profile_arguments(scan_parser)
+
+    repair_parser = subparsers.add_parser("repair", help="Repair texts and reconcile start_markers")
+    repair_parser.add_argument("ids", nargs="*", help="Text ids (default: all)")
+    repair_parser.add_argument("--no-backup", action="store_true", help="Don't create backup files")
+    add_profile_arguments(repair_parser)
+
+    subparsers.add_parser("self-test", help="Check the repair against known inputs")
+
+    args = parser.parse_args()
+
+    if args.command == "self-test":
+        failures = self_test()
+        for text, expected, actual in failures:
+            logger.error(f"{text!r}: expected {expected!r}, got {actual!r}")
+        logger.info(f"{len(REGRESSION_CASES) - len(failures)}/{len(REGRESSION_CASES)} cases passed")
+        sys.exit(1 if failures else 0)
+
+    with profile_session(args):
+        if args.command == "scan":
+            results = scan(args.corpus_root, args.ids, args.report)
+        else:
+            results = repair(args.corpus_root, args.ids, backup=not args.no_backup)
+    total = sum(sum(counts.values()) for counts in results.values())
+    logger.info(f"{total} mojibake sequences in {sum(1 for c in results.values() if c)}/{len(results)} texts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate chunk detection with MinHash and LSH.
+
+The ANF and NPNF volumes repeat a good deal of text: prefaces, indices,
+letters reprinted in more than one volume, CCEL boilerplate. This finds
+chunks (as produced by embedding_cache.py) whose word shingles overlap
+enough to be the same passage, so they are embedded and retrieved once.
+
+  1. Each chunk is reduced to the set of its word k-shingles (casefolded
+     word tokens, hashed to 64 bits).
+  2. A MinHash signature of --num-perm values is computed per chunk with
+     NumPy, batches of chunks spread over a process pool.
+  3. Signatures are split into --bands bands; chunks sharing any band
+     become candidates, which are kept only if their estimated Jaccard
+     similarity (fraction of equal signature values) reaches --threshold.
+  4. Accepted pairs are merged into clusters. The canonical member of a
+     cluster is its first chunk in manifest order; every other member is
+     written to the exclusion list.
+
+Chunks end at paragraph breaks, so a passage reprinted at a different
+offset usually realigns with the original after its first chunk or two.
+
+The result (default build/near_duplicates.json) holds the clusters and the
+exclusion list of (text_id, start_offset) pairs; a duplicate can be
+byte-identical to its canonical chunk, so hashes cannot tell them apart. embedding_cache.py ingest
+skips excluded chunks with --exclude-duplicates, and validate.py reports
+the duplicated share of each text when the file exists.
+
+Usage:
+    python scripts/near_duplicates.py                         # all active texts
+    python scripts/near_duplicates.py --ids npnf1-01 npnf1-02 --threshold 0.9
+    python scripts/near_duplicates.py --workers 8 --report 20
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import logging
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+from embedding_cache import DEFAULT_CHUNK_BYTES, DEFAULT_EXCLUSIONS, iter_corpus_chunks
+from instrumentation import span, add_profile_arguments, profile_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RESULT_VERSION = 2  # 2: exclusions keyed by start_offset
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_WORDS = 5
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_SEED = 1
+BATCH_CHUNKS = 256
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+# Odd 64-bit multiplier for rolling token hashes into shingle hashes
+SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingle_hashes(text, size=DEFAULT_SHINGLE_WORDS):
+    """Distinct 64-bit hashes of the text's word `size`-shingles."""
+    tokens = TOKEN_PATTERN.findall(text.casefold())
+    if len(tokens) < size:
+        if not tokens:
+            return np.empty(0, dtype=np.uint64)
+        size = len(tokens)
+    words = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens),
+                        dtype=np.uint64, count=len(tokens))
+    count = len(tokens) - size + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        shingles = shingles * SHINGLE_MULTIPLIER + words[offset:offset + count]
+    return np.unique(shingles)
+
+
+def permutations(num_perm=DEFAULT_NUM_PERM, seed=DEFAULT_SEED):
+    """Coefficients (a, b) of num_perm multiply-shift hash functions."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash(shingles, a, b):
+    """MinHash signature (uint32 per hash function) of one shingle set."""
+    if not len(shingles):
+        return np.full(len(a), np.iinfo(np.uint32).max, dtype=np.uint32)
+    # (a*x + b) mod 2**64, top 32 bits; uint64 arithmetic wraps
+    hashed = (np.outer(shingles, a) + b) >> np.uint64(32)
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def signature_batch(texts, num_perm, seed, shingle_words):
+    """Worker: signatures of a batch of chunk texts as a (len(texts), num_perm) array."""
+    a, b = permutations(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    empty = []
+    for row, text in enumerate(texts):
+        shingles = shingle_hashes(text, shingle_words)
+        if not len(shingles):
+            empty.append(row)
+        signatures[row] = minhash(shingles, a, b)
+    return signatures, empty
+
+
+class DisjointSet:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # The lower index (earlier in manifest order) stays the root
+            if second < first:
+                first, second = second, first
+            self.parent[second] = first
+
+
+def corpus_signatures(corpus_root, text_ids=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                      num_perm=DEFAULT_NUM_PERM, seed=DEFAULT_SEED,
+                      shingle_words=DEFAULT_SHINGLE_WORDS, workers=None):
+    """
+    Chunk the corpus and compute MinHash signatures in a process pool.
+    Returns (chunk records without content, signature matrix, empty-chunk mask).
+    """
+    workers = workers or os.cpu_count() or 1
+    records = []
+    parts = []
+    empty = []
+    pending = deque()
+
+    def collect(future, first_row):
+        signatures, empty_rows = future.result()
+        parts.append(signatures)
+        empty.extend(first_row + row for row in empty_rows)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batch, batch_start = [], 0
+        for record in iter_corpus_chunks(corpus_root, text_ids, chunk_bytes):
+            batch.append(record.pop("content"))
+            records.append(record)
+            if len(batch) == BATCH_CHUNKS:
+                pending.append((executor.submit(signature_batch, batch, num_perm, seed, shingle_words),
+                                batch_start))
+                batch, batch_start = [], len(records)
+                # Keep only a few batches in flight so chunk text is not all held at once
+                while len(pending) > workers * 2:
+                    collect(*pending.popleft())
+        if batch:
+            pending.append((executor.submit(signature_batch, batch, num_perm, seed, shingle_words),
+                            batch_start))
+        with span("dedup.minhash_wait"):
+            while pending:
+                collect(*pending.popleft())
+
+    signatures = np.concatenate(parts) if parts else np.empty((0, num_perm), dtype=np.uint32)
+    mask = np.zeros(len(records), dtype=bool)
+    mask[empty] = True
+    return records, signatures, mask
+
+
+def lsh_clusters(signatures, bands=DEFAULT_BANDS, threshold=DEFAULT_THRESHOLD, skip=None):
+    """
+    Group rows whose signatures collide in any LSH band and agree on at
+    least `threshold` of their values. Returns {root row: sorted rows} for
+    clusters of two or more rows; the root is the lowest row.
+    """
+    rows, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError(f"--num-perm ({num_perm}) must be divisible by --bands ({bands})")
+    width = num_perm // bands
+    candidates = np.flatnonzero(~skip) if skip is not None else np.arange(rows)
+    sets = DisjointSet(rows)
+
+    for band in range(bands):
+        with span("dedup.lsh_band", lines=len(candidates)):
+            block = signatures[candidates, band * width:(band + 1) * width]
+            _, buckets = np.unique(block, axis=0, return_inverse=True)
+            buckets = buckets.ravel()
+            order = np.argsort(buckets, kind='stable')
+            boundaries = np.flatnonzero(np.diff(buckets[order])) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) < 2:
+                    continue
+                members = candidates[bucket]
+                # Greedy verification: each member joins the first verified
+                # representative it matches, or becomes a representative
+                representatives = [members[0]]
+                for member in members[1:]:
+                    reps = np.array(representatives)
+                    similarity = (signatures[reps] == signatures[member]).mean(axis=1)
+                    match = np.flatnonzero(similarity >= threshold)
+                    if len(match):
+                        sets.union(int(reps[match[0]]), int(member))
+                    else:
+                        representatives.append(member)
+
+    clusters = {}
+    for row in candidates:
+        clusters.setdefault(sets.find(int(row)), []).append(int(row))
+    return {root: rows for root, rows in clusters.items() if len(rows) > 1}
+
+
+def find_near_duplicates(corpus_root, text_ids=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                         num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, threshold=DEFAULT_THRESHOLD,
+                         shingle_words=DEFAULT_SHINGLE_WORDS, seed=DEFAULT_SEED, workers=None):
+    """Run the whole detection; return the result as a JSON-serializable dict."""
+    if num_perm % bands:
+        raise ValueError(f"--num-perm ({num_perm}) must be divisible by --bands ({bands})")
+    records, signatures, empty = corpus_signatures(corpus_root, text_ids, chunk_bytes, num_perm,
+                                                   seed, shingle_words, workers)
+    clusters = lsh_clusters(signatures, bands, threshold, skip=empty)
+
+    def chunk_ref(row):
+        record = records[row]
+        return {key: record.get(key) for key in
+                ("text_id", "hash", "section_id", "start_offset", "end_offset")}
+
+    result_clusters = []
+    exclude = []
+    for root, rows in sorted(clusters.items()):
+        similarity = (signatures[rows[1:]] == signatures[root]).mean(axis=1)
+        members = []
+        for row, value in zip(rows[1:], similarity):
+            members.append(dict(chunk_ref(row), similarity=round(float(value), 4)))
+            exclude.append([records[row]["text_id"], records[row]["start_offset"]])
+        result_clusters.append({"canonical": chunk_ref(root), "duplicates": members})
+
+    chunks_per_text = Counter(record["text_id"] for record in records)
+    return {
+        "version": RESULT_VERSION,
+        "params": {"chunk_bytes": chunk_bytes, "num_perm": num_perm, "bands": bands,
+                   "threshold": threshold, "shingle_words": shingle_words, "seed": seed},
+        "chunks": len(records),
+        "chunks_per_text": dict(chunks_per_text),
+        "clusters": result_clusters,
+        "exclude": exclude,
+    }
+
+
+def text_overlaps(result):
+    """Count duplicated chunks per (duplicate text, canonical text) pair."""
+    overlaps = Counter()
+    for cluster in result["clusters"]:
+        canonical = cluster["canonical"]["text_id"]
+        for member in cluster["duplicates"]:
+            overlaps[(member["text_id"], canonical)] += 1
+    return overlaps
+
+
+def write_result(result, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate chunks with MinHash and LSH")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--ids", nargs="+", help="Only these text ids (default: active texts)")
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES,
+                        help="Maximum chunk size in bytes (as for embedding)")
+    parser.add_argument("--shingle-words", type=int, default=DEFAULT_SHINGLE_WORDS, help="Words per shingle")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM, help="MinHash signature length")
+    parser.add_argument("--bands", type=int, default=DEFAULT_BANDS, help="LSH bands (must divide --num-perm)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity of duplicates")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed for the hash functions")
+    parser.add_argument("--workers", type=int, help="Signature processes (default: CPU count)")
+    parser.add_argument("--output", default=str(DEFAULT_EXCLUSIONS), help="Clusters and exclusion list (JSON)")
+    parser.add_argument("--report", type=int, nargs="?", const=10, metavar="N",
+                        help="Print the N text pairs sharing the most chunks")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    if args.num_perm % args.bands:
+        parser.error(f"--num-perm ({args.num_perm}) must be divisible by --bands ({args.bands})")
+
+    with profile_session(args):
+        result = find_near_duplicates(args.corpus_root, args.ids, args.chunk_bytes, args.num_perm,
+                                      args.bands, args.threshold, args.shingle_words, args.seed,
+                                      args.workers)
+        output = Path(args.corpus_root) / args.output
+        write_result(result, output)
+
+    logger.info(f"{result['chunks']} chunks: {len(result['clusters'])} duplicate clusters, "
+                f"{len(result['exclude'])} chunks excluded -> {output}")
+
+    if args.report:
+        print(f"{'Duplicate text':<20} {'Canonical text':<20} {'Chunks':>8}")
+        for (text_id, canonical), count in text_overlaps(result).most_common(args.report):
+            total = result["chunks_per_text"].get(text_id, 0)
+            print(f"{text_id:<20} {canonical:<20} {count:>8}  ({count / total:.0%} of {text_id})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Aligned KJV / LXX / SBLGNT verse table.
+
+BIBLE-KJV.txt (Project Gutenberg) is streamed into (book, chapter, verse,
+offset, length) records: a book starts at a line equal to one of the
+file_marker titles in generate-bible-metadata.py, and a verse at its
+"chapter:verse " label; wrapped lines belong to the verse they continue.
+
+Each KJV verse is joined to its Greek counterparts:
+
+  - Old Testament: the LXX verses in BIBLE-LXX.txt, via the parallel
+    versification maps in sources/LXX-Rahlfs-1935/08_versification
+    (map_NRSV.csv row n corresponds to map_Rahlfs.csv row n). Verses not
+    in the maps have the same reference in both; KJV references are
+    taken as NRSV ones, which agree for the Protestant canon.
+  - New Testament: the verse with the same reference in BIBLE-SBLGNT.txt.
+
+The table (default build/parallel-verses.bin) stores only integer arrays
+of verse keys and byte spans into the three source files, so it is small
+and memory-mapped as is; verse text is read from memory maps of the
+sources. A lookup is a binary search plus three slices, with no scan.
+
+Usage:
+    python scripts/parallel_verses.py build
+    python scripts/parallel_verses.py show "John 3:16" "Ps 22:1-3"
+    python scripts/parallel_verses.py show "Jer 34:1" --format json
+"""
+
+import argparse
+import importlib.util
+import json
+import mmap
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+import logging
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing, iter_raw_lines
+from greek_index import iter_verse_matches
+from instrumentation import span, add_profile_arguments, profile_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _load_script(name, filename):
+    # Hyphenated file names cannot be imported by module name
+    spec = importlib.util.spec_from_file_location(name, Path(__file__).parent / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+KJV_BOOKS = _load_script("generate_bible_metadata", "generate-bible-metadata.py").KJV_BOOKS
+NT_BOOKS = _load_script("consolidate_sblgnt", "consolidate-sblgnt.py").NT_BOOKS
+
+TABLE_MAGIC = b"IGPARAL1"
+DEFAULT_TABLE = Path("build/parallel-verses.bin")
+DEFAULT_SOURCES = {
+    "kjv": "sources/BIBLE-KJV.txt",
+    "lxx": "sources/BIBLE-LXX.txt",
+    "sblgnt": "sources/BIBLE-SBLGNT.txt",
+}
+VERSIFICATION_DIR = Path("sources/LXX-Rahlfs-1935/08_versification")
+LXX_MAP = VERSIFICATION_DIR / "map_Rahlfs.csv"
+NRSV_MAP = VERSIFICATION_DIR / "map_NRSV.csv"
+MAP_BOOK_NAMES = VERSIFICATION_DIR / "resources_on_mapping" / "unbound_book_names.csv"
+
+# Rahlfs' Esdras B (map code 15O) includes Nehemiah as chapters 11-23;
+# BIBLE-LXX.txt may carry them as a separate book, numbered either way
+SPLIT_BOOKS = {"15O": ("nehemiah", 10)}
+
+KJV_VERSE = re.compile(rb'(?:^|(?<=\s))(\d{1,3}):(\d{1,3})\s')
+GUTENBERG_END = b"*** END OF"
+
+# Verse keys pack (book, chapter, verse) into one uint32
+_CHAPTER_BITS = 10
+_VERSE_BITS = 10
+
+
+def verse_key(book, chapter, verse):
+    return (book << (_CHAPTER_BITS + _VERSE_BITS)) | (chapter << _VERSE_BITS) | verse
+
+
+def split_key(key):
+    return (key >> (_CHAPTER_BITS + _VERSE_BITS), (key >> _VERSE_BITS) & ((1 << _CHAPTER_BITS) - 1),
+            key & ((1 << _VERSE_BITS) - 1))
+
+
+def book_key(name):
+    """Normalize a book name for matching: "1 Samuel (1 Kingdoms)" -> "1samuel"."""
+    return re.sub(r'[^0-9a-z]', '', re.sub(r'\(.*?\)', '', name).casefold())
+
+
+def iter_kjv_verses(lines):
+    """
+    Stream (book number, chapter, verse, offset, length) from the raw lines
+    of the Gutenberg KJV. Book numbers follow KJV_BOOKS (1-66); offset and
+    length delimit the verse text in bytes, trimmed of surrounding space.
+    """
+    titles = {' '.join(book["file_marker"].split()).casefold(): number
+              for number, book in enumerate(KJV_BOOKS, 1)}
+    book = None
+    current = None  # [chapter, verse, start, end]
+    offset = 0
+
+    for raw in lines:
+        line_offset = offset
+        offset += len(raw)
+        if raw.startswith(GUTENBERG_END):
+            break
+        stripped = raw.strip()
+        if not stripped:
+            continue
+
+        title = titles.get(' '.join(stripped.decode('utf-8', errors='replace').split()).casefold())
+        if title is not None:
+            if current:
+                yield (book, *current[:2], current[2], current[3] - current[2])
+            book, current = title, None
+            continue
+        if book is None:
+            continue  # Gutenberg header and table of contents
+
+        position = 0
+        for match in KJV_VERSE.finditer(raw):
+            if current:
+                before = raw[position:match.start()]
+                if before.strip():
+                    current[3] = line_offset + position + len(before.rstrip())
+                yield (book, *current[:2], current[2], current[3] - current[2])
+            start = line_offset + match.end()
+            current = [int(match.group(1)), int(match.group(2)), start, start]
+            position = match.end()
+        if current:
+            tail = raw[position:]
+            if tail.strip():
+                current[3] = line_offset + position + len(tail.rstrip())
+
+    if current:
+        yield (book, *current[:2], current[2], current[3] - current[2])
+
+
+def load_versification(corpus_root):
+    """
+    Read the parallel NRSV/Rahlfs maps. Returns (nrsv_to_lxx, mapped_lxx)
+    where nrsv_to_lxx maps (code, chapter, verse) to the list of LXX
+    (code, chapter, verse) it corresponds to (empty where the LXX has no
+    such verse) and mapped_lxx holds every LXX verse named in the maps.
+    """
+    corpus_root = Path(corpus_root)
+    nrsv_to_lxx = {}
+    mapped_lxx = set()
+    with open(corpus_root / LXX_MAP, 'r', encoding='utf-8-sig') as lxx_rows, \
+            open(corpus_root / NRSV_MAP, 'r', encoding='utf-8-sig') as nrsv_rows:
+        for lxx_row, nrsv_row in zip(lxx_rows, nrsv_rows):
+            lxx = lxx_row.rstrip('\r\n').split('\t')
+            nrsv = nrsv_row.rstrip('\r\n').split('\t')
+            try:
+                nrsv_ref = (nrsv[0], int(nrsv[1]), int(nrsv[2]))
+            except (IndexError, ValueError):
+                continue
+            targets = nrsv_to_lxx.setdefault(nrsv_ref, [])
+            if len(lxx) >= 5 and lxx[4] == '1':
+                continue  # no LXX counterpart
+            try:
+                lxx_ref = (lxx[0], int(lxx[1]), int(lxx[2]))
+            except (IndexError, ValueError):
+                continue
+            mapped_lxx.add(lxx_ref)
+            if lxx_ref not in targets:
+                targets.append(lxx_ref)
+    return nrsv_to_lxx, mapped_lxx
+
+
+def load_map_book_codes(corpus_root):
+    """Map code ("01O") -> normalized book name, from unbound_book_names.csv."""
+    codes = {}
+    with open(Path(corpus_root) / MAP_BOOK_NAMES, 'r', encoding='utf-8-sig') as f:
+        for row in f:
+            fields = row.rstrip('\r\n').split('\t')
+            if len(fields) >= 2:
+                codes[fields[0]] = book_key(fields[1])
+    return codes
+
+
+def read_greek_verses(files, path, source, greek_books):
+    """
+    Stream a consolidated Greek file into {(book key, chapter, verse):
+    (book number, offset, length)}, registering its books in greek_books.
+    """
+    verses = {}
+    numbers = {}
+    with files.open_binary(path) as f:
+        for ref, line_offset, match in iter_verse_matches(iter_raw_lines(f)):
+            book, chapter_verse = ref.rsplit(' ', 1)
+            chapter, verse = (int(part) for part in chapter_verse.split(':'))
+            number = numbers.get(book)
+            if number is None:
+                number = numbers[book] = len(greek_books)
+                greek_books.append({"source": source, "book": book})
+            text = match.group(2).rstrip()
+            start = line_offset + len(match.string[:match.start(2)].encode('utf-8'))
+            verses[(book_key(book), chapter, verse)] = (number, start, len(text.encode('utf-8')))
+    return verses
+
+
+def lxx_candidates(code, chapter, verse, codes):
+    """LXX verse keys to try for a map reference, in order."""
+    name = codes.get(code, code.casefold())
+    yield name, chapter, verse
+    if code in SPLIT_BOOKS:
+        split_name, shift = SPLIT_BOOKS[code]
+        if chapter > shift:
+            yield split_name, chapter - shift, verse
+        yield split_name, chapter, verse
+
+
+def source_stamp(corpus_root, path):
+    stat = (Path(corpus_root) / path).stat()
+    return {"path": str(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def build_table(corpus_root=".", table_path=None, sources=None):
+    """Parse the three texts, align them and write the table."""
+    corpus_root = Path(corpus_root)
+    table_path = Path(table_path) if table_path else corpus_root / DEFAULT_TABLE
+    sources = dict(DEFAULT_SOURCES, **(sources or {}))
+    files = CorpusFiles(corpus_root)
+
+    codes = load_map_book_codes(corpus_root)
+    book_codes = {name: code for code, name in codes.items()}
+    nrsv_to_lxx, mapped_lxx = load_versification(corpus_root)
+    nt_abbrevs = {book_key(english): book_key(Path(filename).stem) for filename, english, _ in NT_BOOKS}
+
+    greek_books = []
+    with span("parallel.read_lxx"):
+        lxx = read_greek_verses(files, sources["lxx"], "lxx", greek_books)
+    with span("parallel.read_sblgnt"):
+        sblgnt = read_greek_verses(files, sources["sblgnt"], "sblgnt", greek_books)
+
+    keys = array('I')
+    kjv_spans = array('I')
+    first_span = array('I', [0])
+    greek_spans = array('I')
+    unmatched = 0
+
+    with span("parallel.read_kjv") as s, files.open_binary(sources["kjv"]) as f:
+        for book, chapter, verse, offset, length in iter_kjv_verses(iter_raw_lines(f)):
+            s.add(lines=1)
+            keys.append(verse_key(book, chapter, verse))
+            kjv_spans.extend((offset, length))
+
+            info = KJV_BOOKS[book - 1]
+            name = book_key(info["title"])
+            matches = []
+            if info["testament"] == "NT":
+                match = sblgnt.get((nt_abbrevs.get(name, name), chapter, verse))
+                if match:
+                    matches.append((match, chapter, verse))
+            else:
+                code = book_codes.get(name)
+                ref = (code, chapter, verse)
+                if ref in nrsv_to_lxx:
+                    targets = nrsv_to_lxx[ref]
+                else:
+                    targets = [] if ref in mapped_lxx else [ref]
+                for target in targets:
+                    for candidate in lxx_candidates(*target, codes):
+                        if candidate in lxx:
+                            matches.append((lxx[candidate], candidate[1], candidate[2]))
+                            break
+            if not matches:
+                unmatched += 1
+            for (greek_book, greek_offset, greek_length), greek_chapter, greek_verse in matches:
+                greek_spans.extend((greek_book, verse_key(0, greek_chapter, greek_verse),
+                                    greek_offset, greek_length))
+            first_span.append(len(greek_spans) // 4)
+
+    if any(previous > following for previous, following in zip(keys, keys[1:])):
+        raise ValueError(f"{sources['kjv']}: verses are not in canonical order")
+
+    header = json.dumps({
+        "sources": {name: source_stamp(corpus_root, path) for name, path in sources.items()},
+        "books": [{"title": book["title"], "testament": book["testament"]} for book in KJV_BOOKS],
+        "greek_books": greek_books,
+    }, ensure_ascii=False).encode('utf-8')
+    header += b" " * (-len(header) % 4)
+
+    table_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = table_path.with_name(table_path.name + ".tmp")
+    with open(tmp_path, 'wb') as out:
+        out.write(TABLE_MAGIC)
+        out.write(struct.pack('<QQQ', len(header), len(keys), len(greek_spans) // 4))
+        out.write(header)
+        for values in (keys, kjv_spans, first_span, greek_spans):
+            out.write(values.tobytes())
+    tmp_path.replace(table_path)
+
+    logger.info(f"Aligned {len(keys)} KJV verses with {len(greek_spans) // 4} Greek verses "
+                f"({unmatched} without a Greek counterpart) -> {table_path} "
+                f"({table_path.stat().st_size / 1024:.0f} KB)")
+    return table_path
+
+
+class VerseReferenceError(ValueError):
+    """Raised for references that name no KJV book or are malformed."""
+
+
+REFERENCE = re.compile(r'^\s*(.+?)\s+(\d+)(?::(\d+)(?:\s*-\s*(\d+))?)?\s*$')
+
+
+class ParallelVerses:
+    """Read-only view of a table written by build_table()."""
+
+    def __init__(self, corpus_root=".", table_path=None):
+        self.corpus_root = Path(corpus_root)
+        self.table_path = Path(table_path) if table_path else self.corpus_root / DEFAULT_TABLE
+        self.files = CorpusFiles(corpus_root)
+        self._file = open(self.table_path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(TABLE_MAGIC)] != TABLE_MAGIC:
+            raise ValueError(f"Not a parallel verse table: {self.table_path}")
+        pos = len(TABLE_MAGIC)
+        header_len, verse_count, span_count = struct.unpack_from('<QQQ', self._mmap, pos)
+        pos += 24
+        header = json.loads(self._mmap[pos:pos + header_len].decode('utf-8'))
+        pos += header_len
+
+        self.sources = header["sources"]
+        self.books = header["books"]
+        self.greek_books = header["greek_books"]
+        view = memoryview(self._mmap)
+        sections = []
+        for count in (verse_count, verse_count * 2, verse_count + 1, span_count * 4):
+            sections.append(view[pos:pos + count * 4].cast('I'))
+            pos += count * 4
+        self.keys, self.kjv_spans, self.first_span, self.greek_spans = sections
+
+        self._aliases = {}
+        for number, book in enumerate(self.books, 1):
+            self._aliases[book_key(book["title"])] = number
+        for filename, english, _ in NT_BOOKS:
+            number = self._aliases.get(book_key(english))
+            if number:
+                self._aliases.setdefault(book_key(Path(filename).stem), number)
+        self._maps = {}
+
+    def close(self):
+        for view in (self.keys, self.kjv_spans, self.first_span, self.greek_spans):
+            view.release()
+        for source_file, source_map in self._maps.values():
+            source_map.close()
+            source_file.close()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def is_stale(self):
+        """True if any source file changed size or mtime since the build."""
+        for source in self.sources.values():
+            path = self.corpus_root / source["path"]
+            if not path.exists():
+                return True
+            stat = path.stat()
+            if stat.st_size != source["size"] or stat.st_mtime != source["mtime"]:
+                return True
+        return False
+
+    def _source(self, name):
+        """Memory map of a source file (its LFS object if it is a pointer)."""
+        if name not in self._maps:
+            path = self.corpus_root / self.sources[name]["path"]
+            pointer = self.files.pointer(path)
+            if pointer is not None:
+                object_path = self.files.object_path(pointer)
+                if object_path is None:
+                    raise LfsObjectMissing(f"{path} is a git-lfs pointer and its object is not in "
+                                           f"{self.files.lfs_store}")
+                path = object_path
+            source_file = open(path, 'rb')
+            self._maps[name] = (source_file, mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._maps[name][1]
+
+    def _text(self, name, offset, length):
+        return ' '.join(self._source(name)[offset:offset + length].decode('utf-8').split())
+
+    def book_number(self, name):
+        """Resolve a book name or abbreviation ("Gen", "1 Sam", "Phlm") to 1-66."""
+        name = book_key(name)
+        if name in self._aliases:
+            return self._aliases[name]
+        matches = {number for alias, number in self._aliases.items() if alias.startswith(name)}
+        if len(matches) != 1:
+            problem = "ambiguous" if matches else "unknown"
+            raise VerseReferenceError(f"{problem} book name {name!r}")
+        return matches.pop()
+
+    def parse(self, reference):
+        """Parse "Book C", "Book C:V" or "Book C:V-W" into (book, chapter, first, last)."""
+        match = REFERENCE.match(reference)
+        if not match:
+            raise VerseReferenceError(f"not a verse reference: {reference!r}")
+        book = self.book_number(match.group(1))
+        chapter = int(match.group(2))
+        first = int(match.group(3)) if match.group(3) else 0
+        last = int(match.group(4)) if match.group(4) else (first or (1 << _VERSE_BITS) - 1)
+        return book, chapter, first, last
+
+    def rows(self, reference):
+        """Table rows for a reference, in order."""
+        book, chapter, first, last = self.parse(reference)
+        start = bisect_left(self.keys, verse_key(book, chapter, first))
+        end = bisect_right(self.keys, verse_key(book, chapter, last))
+        return range(start, end)
+
+    def verse(self, row):
+        """One aligned verse as a dict with its KJV text and Greek counterparts."""
+        book, chapter, verse = split_key(self.keys[row])
+        title = self.books[book - 1]["title"]
+        result = {
+            "ref": f"{title} {chapter}:{verse}",
+            "kjv": self._text("kjv", self.kjv_spans[2 * row], self.kjv_spans[2 * row + 1]),
+            "lxx": [],
+            "sblgnt": [],
+        }
+        for span_number in range(self.first_span[row], self.first_span[row + 1]):
+            greek_book, key, offset, length = self.greek_spans[4 * span_number:4 * span_number + 4]
+            _, greek_chapter, greek_verse = split_key(key)
+            info = self.greek_books[greek_book]
+            result[info["source"]].append({
+                "ref": f"{info['book']} {greek_chapter}:{greek_verse}",
+                "text": self._text(info["source"], offset, length),
+            })
+        return result
+
+    def lookup(self, reference):
+        """Aligned verses for a reference such as "John 3:16" or "Ps 22:1-3"."""
+        return [self.verse(row) for row in self.rows(reference)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aligned KJV/LXX/SBLGNT verse table")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--table", help=f"Table file (default: {DEFAULT_TABLE})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Parse the three Bibles and build the table")
+    for name, path in DEFAULT_SOURCES.items():
+        build_parser.add_argument(f"--{name}", default=path, help=f"Consolidated text (default: {path})")
+    add_profile_arguments(build_parser)
+
+    show_parser = subparsers.add_parser("show", help="Print KJV verses beside the Greek")
+    show_parser.add_argument("references", nargs="+", help='References such as "John 3:16" or "Ps 22:1-3"')
+    show_parser.add_argument("--format", choices=("text", "json"), default="text", help="Output format")
+
+    args = parser.parse_args()
+    table_path = Path(args.table) if args.table else Path(args.corpus_root) / DEFAULT_TABLE
+
+    if args.command == "build":
+        with profile_session(args):
+            try:
+                build_table(args.corpus_root, table_path, {name: getattr(args, name) for name in DEFAULT_SOURCES})
+            except LfsObjectMissing as e:
+                logger.error(f"{e}; run 'ignaria files hydrate' or git lfs pull first")
+                sys.exit(1)
+        return
+
+    if not table_path.exists():
+        logger.error(f"Table not found at {table_path}; run 'build' first")
+        sys.exit(1)
+
+    with ParallelVerses(args.corpus_root, table_path) as table:
+        if table.is_stale():
+            logger.warning("Table is older than its source files; consider rebuilding")
+        verses = []
+        for reference in args.references:
+            try:
+                found = table.lookup(reference)
+            except VerseReferenceError as e:
+                logger.error(str(e))
+                sys.exit(2)
+            if not found:
+                logger.warning(f"{reference}: no such verse in the KJV")
+            verses.extend(found)
+
+        if args.format == "json":
+            print(json.dumps(verses, ensure_ascii=False, indent=2))
+            return
+        for verse in verses:
+            print(verse["ref"])
+            print(f"  KJV     {verse['kjv']}")
+            for source in ("lxx", "sblgnt"):
+                for greek in verse[source]:
+                    print(f"  {source.upper():<7} {greek['ref']}  {greek['text']}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
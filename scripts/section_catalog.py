@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Temporal and regional filter index over metadata sections.
+
+Compiles every section in sources/*.meta.yaml into one catalog, cached in
+build/section_catalog.json and rebuilt only when a metadata file changes:
+
+  - composition years as sorted arrays: the stated year, and an interval
+    view widened by composition_uncertainty (low ±10, medium ±25,
+    high ±50 years; medium when unstated)
+  - bitmaps of sections per author_region, author_location, author and text
+
+A query intersects the bitmaps of its filters with the year range found by
+binary search, so it touches neither the YAML files nor unmatched sections.
+Results are section ids (<text_id>#<index in text_info.sections>), the same
+section_id carried by chunk records from embedding_cache.py, for use as a
+pre-filter in vector search.
+
+Year matching (--uncertainty):
+  point    the stated composition_year is in range (default)
+  overlap  the widened interval overlaps the range (may be in range)
+  within   the widened interval lies inside the range (surely in range)
+
+Usage:
+    python scripts/section_catalog.py --region Eastern --before 325
+    python scripts/section_catalog.py --from 100 --to 199 --author Irenaeus Tertullian
+    python scripts/section_catalog.py --location Alexandria --uncertainty overlap --format json
+    python scripts/section_catalog.py --rebuild --format count
+
+Library use:
+    catalog = SectionCatalog.load(".")
+    ids = catalog.query(end=324, regions=["Eastern"])
+"""
+
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from embedding_cache import section_id
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION = 1
+DEFAULT_CATALOG = Path("build/section_catalog.json")
+
+# Half-width in years of the interval around composition_year
+UNCERTAINTY_YEARS = {"low": 10, "medium": 25, "high": 50}
+DEFAULT_UNCERTAINTY = "medium"
+
+# Bitmap name -> section field
+BITMAP_FIELDS = {
+    "region": "author_region",
+    "location": "author_location",
+    "author": "author",
+    "text": "text_id",
+}
+
+YEAR_MODES = ("point", "overlap", "within")
+
+
+def meta_files(corpus_root):
+    return sorted(Path(corpus_root).glob("sources/*.meta.yaml"))
+
+
+def source_stamp(corpus_root):
+    """Cheap fingerprint of the metadata files: path, size and mtime."""
+    corpus_root = Path(corpus_root)
+    stamp = []
+    for path in meta_files(corpus_root):
+        stat = path.stat()
+        stamp.append([path.relative_to(corpus_root).as_posix(), stat.st_size, stat.st_mtime_ns])
+    return stamp
+
+
+def _sorted_pairs(pairs):
+    pairs.sort()
+    return [value for value, _ in pairs], [row for _, row in pairs]
+
+
+def compile_catalog(corpus_root):
+    """Read all metadata files and return the catalog as a JSON-serializable dict."""
+    corpus_root = Path(corpus_root)
+    stamp = source_stamp(corpus_root)
+    rows = []
+    for relative, _, _ in stamp:
+        with open(corpus_root / relative, 'r', encoding='utf-8') as f:
+            metadata = yaml.safe_load(f) or {}
+        text_info = metadata.get("text_info") or {}
+        text_id = text_info.get("id") or Path(relative).name.split('.')[0].lower()
+        for index, section in enumerate(text_info.get("sections") or []):
+            rows.append({
+                "id": section_id(text_id, index),
+                "text_id": text_id,
+                "title": section.get("title"),
+                "author": section.get("author"),
+                "composition_year": section.get("composition_year"),
+                "composition_uncertainty": section.get("composition_uncertainty"),
+                "author_region": section.get("author_region"),
+                "author_location": section.get("author_location"),
+            })
+
+    points, lows, highs = [], [], []
+    for row_number, row in enumerate(rows):
+        year = row["composition_year"]
+        if not isinstance(year, int):
+            continue
+        width = UNCERTAINTY_YEARS.get(row["composition_uncertainty"] or DEFAULT_UNCERTAINTY,
+                                      UNCERTAINTY_YEARS[DEFAULT_UNCERTAINTY])
+        points.append((year, row_number))
+        lows.append((year - width, row_number))
+        highs.append((year + width, row_number))
+
+    bitmaps = {}
+    for name, field in BITMAP_FIELDS.items():
+        values = {}
+        for row_number, row in enumerate(rows):
+            if row[field]:
+                key = str(row[field]).casefold()
+                values[key] = values.get(key, 0) | (1 << row_number)
+        bitmaps[name] = {key: format(bits, 'x') for key, bits in values.items()}
+
+    year_values, year_rows = _sorted_pairs(points)
+    low_values, low_rows = _sorted_pairs(lows)
+    high_values, high_rows = _sorted_pairs(highs)
+    return {
+        "version": CATALOG_VERSION,
+        "sources": stamp,
+        "uncertainty_years": UNCERTAINTY_YEARS,
+        "rows": rows,
+        "years": {"values": year_values, "rows": year_rows},
+        "interval_low": {"values": low_values, "rows": low_rows},
+        "interval_high": {"values": high_values, "rows": high_rows},
+        "bitmaps": bitmaps,
+    }
+
+
+def write_catalog(catalog, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _bitmap(rows):
+    bits = 0
+    for row_number in rows:
+        bits |= 1 << row_number
+    return bits
+
+
+class SectionCatalog:
+    def __init__(self, catalog):
+        self.rows = catalog["rows"]
+        self.years = catalog["years"]
+        self.low = catalog["interval_low"]
+        self.high = catalog["interval_high"]
+        self.bitmaps = {
+            name: {key: int(bits, 16) for key, bits in values.items()}
+            for name, values in catalog["bitmaps"].items()
+        }
+        self.all = (1 << len(self.rows)) - 1
+
+    @classmethod
+    def load(cls, corpus_root=".", path=None, rebuild=False):
+        """Load the cached catalog, recompiling it if metadata has changed."""
+        path = Path(path) if path else Path(corpus_root) / DEFAULT_CATALOG
+        if not rebuild and path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+            if (catalog.get("version") == CATALOG_VERSION
+                    and catalog.get("uncertainty_years") == UNCERTAINTY_YEARS
+                    and catalog.get("sources") == source_stamp(corpus_root)):
+                return cls(catalog)
+        logger.info(f"Compiling section catalog into {path}")
+        catalog = compile_catalog(corpus_root)
+        write_catalog(catalog, path)
+        return cls(catalog)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def year_bitmap(self, start=None, end=None, mode="point"):
+        """Sections whose composition year matches [start, end] (inclusive)."""
+        start = float('-inf') if start is None else start
+        end = float('inf') if end is None else end
+        if mode == "point":
+            values, rows = self.years["values"], self.years["rows"]
+            return _bitmap(rows[bisect_left(values, start):bisect_right(values, end)])
+        if mode == "overlap":
+            # low <= end and high >= start
+            begins = _bitmap(self.low["rows"][:bisect_right(self.low["values"], end)])
+            ends = _bitmap(self.high["rows"][bisect_left(self.high["values"], start):])
+        elif mode == "within":
+            # low >= start and high <= end
+            begins = _bitmap(self.low["rows"][bisect_left(self.low["values"], start):])
+            ends = _bitmap(self.high["rows"][:bisect_right(self.high["values"], end)])
+        else:
+            raise ValueError(f"Unknown year mode {mode!r}; expected one of {', '.join(YEAR_MODES)}")
+        return begins & ends
+
+    def field_bitmap(self, name, values):
+        """Union of the bitmaps for any of the given values (case-insensitive)."""
+        bitmap = self.bitmaps[name]
+        bits = 0
+        for value in values:
+            bits |= bitmap.get(str(value).casefold(), 0)
+        return bits
+
+    def match(self, start=None, end=None, mode="point", regions=None, locations=None,
+              authors=None, texts=None):
+        """Return the bitmap of sections matching every given filter."""
+        bits = self.all
+        for name, values in (("region", regions), ("location", locations),
+                             ("author", authors), ("text", texts)):
+            if values:
+                bits &= self.field_bitmap(name, values)
+        if start is not None or end is not None:
+            bits &= self.year_bitmap(start, end, mode)
+        return bits
+
+    def rows_for(self, bits):
+        """Yield catalog rows for the set bits, in catalog order."""
+        while bits:
+            lowest = bits & -bits
+            yield self.rows[lowest.bit_length() - 1]
+            bits ^= lowest
+
+    def query(self, start=None, end=None, mode="point", regions=None, locations=None,
+              authors=None, texts=None):
+        """Return the ids of matching sections."""
+        bits = self.match(start, end, mode, regions, locations, authors, texts)
+        return [row["id"] for row in self.rows_for(bits)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter metadata sections by date, region, location and author")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--catalog", help=f"Catalog cache (default: {DEFAULT_CATALOG})")
+    parser.add_argument("--rebuild", action="store_true", help="Recompile the catalog even if it is current")
+    parser.add_argument("--from", dest="start", type=int, metavar="YEAR", help="Earliest year (inclusive; BC negative)")
+    parser.add_argument("--to", dest="end", type=int, metavar="YEAR", help="Latest year (inclusive)")
+    parser.add_argument("--before", type=int, metavar="YEAR", help="Before this year")
+    parser.add_argument("--after", type=int, metavar="YEAR", help="After this year")
+    parser.add_argument("--uncertainty", choices=YEAR_MODES, default="point",
+                        help="How composition_uncertainty widens year matching")
+    parser.add_argument("--region", nargs="+", help="author_region values (any of)")
+    parser.add_argument("--location", nargs="+", help="author_location values (any of)")
+    parser.add_argument("--author", nargs="+", help="Section authors (any of)")
+    parser.add_argument("--text", nargs="+", help="Text ids (any of)")
+    parser.add_argument("--format", choices=("ids", "json", "count"), default="ids", help="Output format")
+
+    args = parser.parse_args()
+    start, end = args.start, args.end
+    if args.after is not None:
+        start = args.after + 1 if start is None else max(start, args.after + 1)
+    if args.before is not None:
+        end = args.before - 1 if end is None else min(end, args.before - 1)
+
+    catalog = SectionCatalog.load(args.corpus_root, args.catalog, args.rebuild)
+    bits = catalog.match(start, end, args.uncertainty, args.region, args.location, args.author, args.text)
+
+    if args.format == "count":
+        print(bin(bits).count("1"))
+    elif args.format == "json":
+        print(json.dumps(list(catalog.rows_for(bits)), ensure_ascii=False, indent=2))
+    else:
+        for row in catalog.rows_for(bits):
+            print(row["id"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Precomputed section offset tables for anthology and Bible volumes.
+
+For every text whose metadata lists `text_info.sections`, this writes a
+`<ID>.sections.json` file next to the text with, per section:
+
+- start_offset / end_offset: byte offsets into the UTF-8 text file
+- start_line: 1-based line number of the start marker
+- sha256: hash of the section's bytes
+
+Start offsets follow the documented attribution rule (SYSTEM_GUIDE.md,
+Example 4): the first occurrence of `start_marker` in the volume. A
+section ends where the next located section starts, or at end of file.
+Sections whose marker is not found are kept with null offsets.
+
+The table records the text's size, mtime and sha256 plus a hash of the
+section list, so load_section_index() rebuilds it automatically when the
+text or the metadata changes.
+
+Usage:
+    python scripts/section_index.py                 # all volumes with sections
+    python scripts/section_index.py --id anf-01
+    python scripts/section_index.py --check         # report stale tables only
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import parse_lfs_pointer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2  # 2: ends no longer depend on section order
+INDEX_SUFFIX = ".sections.json"
+
+
+def index_path_for(text_path):
+    """Return where the offset table for a text file is stored."""
+    text_path = Path(text_path)
+    return text_path.with_name(text_path.stem + INDEX_SUFFIX)
+
+
+def sections_digest(sections):
+    """Hash the fields of the section list that affect offsets and labels."""
+    digest = hashlib.sha256()
+    for section in sections:
+        for field in ("start_marker", "title", "author"):
+            digest.update(str(section.get(field, "")).encode('utf-8'))
+            digest.update(b"\0")
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def locate_sections(data, sections):
+    """
+    Return (start, end) byte ranges for each section in data (bytes or
+    mmap), or None for sections whose marker is not found.
+    """
+    starts = [
+        data.find(str(section.get("start_marker", "")).encode('utf-8'))
+        if section.get("start_marker") else -1
+        for section in sections
+    ]
+    ranges = []
+    for i, start in enumerate(starts):
+        if start < 0:
+            ranges.append(None)
+            continue
+        # A section ends at the nearest later start, whatever its place in the list
+        end = min((s for s in starts if s > start), default=len(data))
+        ranges.append((start, end))
+    return ranges
+
+
+def compute_section_offsets(text_path, sections):
+    """Locate every section marker in a text file and return the offset table."""
+    text_path = Path(text_path)
+    stat = text_path.stat()
+
+    with open(text_path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+        try:
+            ranges = locate_sections(data, sections)
+
+            # Line numbers: count newlines between successive located starts
+            line_of = {}
+            position, line = 0, 1
+            for start in sorted(set(r[0] for r in ranges if r)):
+                line += data[position:start].count(b'\n')
+                position = start
+                line_of[start] = line
+
+            entries = []
+            for section, found in zip(sections, ranges):
+                entry = {
+                    "title": section.get("title"),
+                    "author": section.get("author"),
+                    "start_marker": section.get("start_marker"),
+                    "start_offset": None,
+                    "end_offset": None,
+                    "start_line": None,
+                    "sha256": None,
+                }
+                if found:
+                    start, end = found
+                    entry.update({
+                        "start_offset": start,
+                        "end_offset": end,
+                        "start_line": line_of[start],
+                        "sha256": hashlib.sha256(data[start:end]).hexdigest(),
+                    })
+                entries.append(entry)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    return {
+        "version": INDEX_VERSION,
+        "text_file": text_path.name,
+        "text_size": stat.st_size,
+        "text_mtime_ns": stat.st_mtime_ns,
+        "text_sha256": file_sha256(text_path),
+        "sections_sha256": sections_digest(sections),
+        "sections": entries,
+    }
+
+
+def write_section_index(text_path, sections):
+    """Compute and persist the offset table for a text; return the table."""
+    table = compute_section_offsets(text_path, sections)
+    path = index_path_for(text_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return table
+
+
+def is_stale(table, text_path, sections):
+    """True if a stored table no longer matches the text or section list."""
+    if table.get("version") != INDEX_VERSION:
+        return True
+    if table.get("sections_sha256") != sections_digest(sections):
+        return True
+    stat = Path(text_path).stat()
+    if table.get("text_size") != stat.st_size:
+        return True
+    if table.get("text_mtime_ns") == stat.st_mtime_ns:
+        return False
+    # mtime moved (checkout, touch); only the content hash is authoritative
+    return table.get("text_sha256") != file_sha256(text_path)
+
+
+def load_section_index(text_path, sections, rebuild=True):
+    """
+    Return the offset table for a text, rebuilding and persisting it if
+    it is missing or stale. With rebuild=False a stale table returns None.
+    """
+    path = index_path_for(text_path)
+    table = None
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        if not is_stale(table, text_path, sections):
+            return table
+    if not rebuild:
+        return None
+    logger.info(f"Rebuilding section offsets for {text_path}")
+    return write_section_index(text_path, sections)
+
+
+def read_section(text_path, entry):
+    """Read one section's text by seeking straight to its byte range."""
+    if entry.get("start_offset") is None:
+        return None
+    with open(text_path, 'rb') as f:
+        f.seek(entry["start_offset"])
+        return f.read(entry["end_offset"] - entry["start_offset"]).decode('utf-8')
+
+
+def iter_sectioned_texts(corpus_root, text_ids=None):
+    """Yield (text_entry, text_path, sections) for manifest texts with sections."""
+    corpus_root = Path(corpus_root)
+    with open(corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f)
+
+    for text_entry in manifest.get("texts", []):
+        if text_ids and text_entry["id"] not in text_ids:
+            continue
+        if "metadata" not in text_entry or "file" not in text_entry:
+            continue
+        meta_path = corpus_root / text_entry["metadata"]
+        if not meta_path.exists():
+            continue
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metadata = yaml.safe_load(f)
+        sections = metadata.get("text_info", {}).get("sections") or []
+        if sections:
+            yield text_entry, corpus_root / text_entry["file"], sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build section byte-offset tables")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--id", action="append", dest="ids", help="Only this text id (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    parser.add_argument("--check", action="store_true", help="Only report missing or stale tables")
+
+    args = parser.parse_args()
+
+    stale = 0
+    for text_entry, text_path, sections in iter_sectioned_texts(args.corpus_root, args.ids):
+        if not text_path.exists():
+            logger.warning(f"{text_entry['id']}: text not found: {text_path}")
+            continue
+        if parse_lfs_pointer(text_path):
+            logger.warning(f"{text_entry['id']}: git-lfs pointer, hydrate it first (corpus_files.py hydrate)")
+            continue
+
+        if args.check:
+            if load_section_index(text_path, sections, rebuild=False) is None:
+                logger.warning(f"{text_entry['id']}: offset table missing or stale")
+                stale += 1
+            continue
+
+        if args.force:
+            table = write_section_index(text_path, sections)
+        else:
+            table = load_section_index(text_path, sections)
+
+        located = sum(1 for s in table["sections"] if s["start_offset"] is not None)
+        logger.info(f"{text_entry['id']}: {located}/{len(sections)} sections located")
+        for entry in table["sections"]:
+            if entry["start_offset"] is None:
+                logger.warning(f"  start_marker not found: {entry['title']!r}")
+
+    if args.check:
+        sys.exit(1 if stale else 0)
+
+
+if __name__ == "__main__":
+    main()
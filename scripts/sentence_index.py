@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Sentence and paragraph offset tables for active texts.
+
+Chunking, citation display and snippet highlighting all need sentence and
+paragraph boundaries. This segments each text once per version and writes
+`<ID>.segments.bin` next to it:
+
+- paragraphs: runs of text between blank lines, trimmed of whitespace
+- sentences: spans within a paragraph ending at ".", "!" or "?" (plus
+  closing quotes and brackets) where the next word starts with a capital
+  or digit
+
+The sentence rules are tuned for 19th-century English editions: no break
+after abbreviations common in the ANF/NPNF apparatus ("Vol.", "c.",
+"ch.", "cf.", "Ep.", "Matt."), after initials ("J. B. Lightfoot"),
+dotted forms ("A.D.", "i.e."), or Roman numerals followed by a digit
+("ch. iv. 5") or preceded by "Book", "Chap.", "Vol." and the like.
+
+Offsets are UTF-8 byte offsets stored as packed uint32 arrays after a
+small JSON header that records the text's sha256, size and mtime; the
+table is rebuilt when the content hash changes. For git-lfs pointers the
+pointer's oid is the hash and the text is read from the object store.
+SentenceIndex memory-maps a table without re-segmenting.
+
+Usage:
+    python scripts/sentence_index.py                  # active texts, in a process pool
+    python scripts/sentence_index.py --id anf-01 --force
+    python scripts/sentence_index.py --check          # report missing or stale tables
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import logging
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent))
+from corpus_files import CorpusFiles, LfsObjectMissing
+from instrumentation import span, add_profile_arguments, profile_session
+from section_index import file_sha256
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".segments.bin"
+INDEX_MAGIC = b"IGSEGMT1"
+
+PARAGRAPH_BREAK = re.compile(rb'\n[ \t\r]*\n')
+SENTENCE_END = re.compile(
+    rb'(?<!\S)(?P<token>\S*?)(?P<end>[.!?])(?:["\')\]]|\xe2\x80[\x99\x9d])*'
+    rb'(?P<space>\s+)(?=(?:["\'(\[]|\xe2\x80[\x98\x9c])?[A-Z0-9\xc3-\xcf])'
+)
+ROMAN = re.compile(rb'(?i:m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3}))')
+
+# Abbreviated book names of scripture references ("Matt.", "1 Cor.")
+BOOK_ABBREVIATIONS = frozenset(word.encode('ascii') for word in """
+    gen ex exod lev num deut josh judg sam kgs chron neh esth ps pss prov eccl eccles cant
+    isa jer lam ezek dan hos obad mic nah hab zeph hag zech mal
+    matt mt mk lk jn rom cor gal eph phil col thess tim tit philem heb jas pet rev
+    esd tob jud wisd sir ecclus bar macc
+""".split())
+
+ABBREVIATIONS = frozenset(word.encode('ascii') for word in """
+    vol vols ch chap chaps cf p pp ver vv viz sc ibid id op cit loc al seq sqq ff fol
+    lib bk tom pt sect sec art no nos ep epp hom serm orat comm can ed eds edd tr trans
+    mr mrs messrs dr st ss rev fr bp abp ven mt gr lat heb eng ms mss cod lxx vulg
+""".split()) | BOOK_ABBREVIATIONS
+
+# Words after which a Roman numeral is a number, not a sentence end
+NUMBERED = frozenset(word.encode('ascii') for word in """
+    book books chapter chapters chap ch part parts vol volume sect section lib tom
+    art article epistle letter psalm ps homily hom sermon serm oration orat canon no
+""".split())
+
+
+def _ends_sentence(paragraph, match):
+    """Decide whether a SENTENCE_END candidate is a real boundary."""
+    token = match.group('token').lstrip(b'"\'([').lstrip(b'\xe2\x80\x98\x9c')
+    if match.group('end') != b'.':
+        return True
+    stripped = token.rstrip(b'.')
+    if not stripped:
+        return True  # a lone "." or an ellipsis
+    word = stripped.lower()
+    if word in ABBREVIATIONS or b'.' in stripped:
+        return False
+    if len(stripped) == 1 and stripped.isalpha():
+        return False  # an initial
+    if ROMAN.fullmatch(stripped):
+        following = paragraph[match.end():match.end() + 1]
+        if following.isdigit():
+            return False
+        before = paragraph[:match.start('token')].rstrip()
+        previous = before[before.rfind(b' ') + 1:].rstrip(b'.,').lower()
+        if previous in NUMBERED or previous in ABBREVIATIONS:
+            return False
+    return True
+
+
+def segment(data):
+    """
+    Return (paragraph starts, paragraph ends, first sentence of each
+    paragraph plus a final sentence count, sentence starts, sentence ends)
+    as uint32 arrays of byte offsets into data.
+    """
+    paragraph_starts, paragraph_ends = array('I'), array('I')
+    first_sentence = array('I')
+    sentence_starts, sentence_ends = array('I'), array('I')
+
+    def add_paragraph(start, end):
+        paragraph = data[start:end]
+        stripped = paragraph.strip()
+        if not stripped:
+            return
+        start += len(paragraph) - len(paragraph.lstrip())
+        end = start + len(stripped)
+        paragraph_starts.append(start)
+        paragraph_ends.append(end)
+        first_sentence.append(len(sentence_starts))
+        sentence_start = 0
+        for match in SENTENCE_END.finditer(stripped):
+            if _ends_sentence(stripped, match):
+                sentence_starts.append(start + sentence_start)
+                sentence_ends.append(start + match.start('space'))
+                sentence_start = match.end()
+        sentence_starts.append(start + sentence_start)
+        sentence_ends.append(end)
+
+    position = 0
+    for match in PARAGRAPH_BREAK.finditer(data):
+        add_paragraph(position, match.start())
+        position = match.end()
+    add_paragraph(position, len(data))
+    first_sentence.append(len(sentence_starts))
+    return paragraph_starts, paragraph_ends, first_sentence, sentence_starts, sentence_ends
+
+
+def index_path_for(text_path):
+    """Return where the segment table for a text file is stored."""
+    text_path = Path(text_path)
+    return text_path.with_name(text_path.stem + INDEX_SUFFIX)
+
+
+def text_stamp(files, text_path):
+    """(sha256, size) of a text; a pointer's oid and size stand for its content."""
+    pointer = files.pointer(text_path)
+    if pointer is not None:
+        return pointer.oid, pointer.size
+    return file_sha256(text_path), Path(text_path).stat().st_size
+
+
+def write_segment_index(corpus_root, text_path):
+    """Segment one text and persist its table; return (paragraphs, sentences)."""
+    files = CorpusFiles(corpus_root)
+    data = files.read_bytes(text_path)
+    sha256, size = text_stamp(files, text_path)
+    arrays = segment(data)
+
+    header = json.dumps({
+        "version": INDEX_VERSION,
+        "text_file": Path(text_path).name,
+        "text_size": size,
+        "text_mtime_ns": Path(text_path).stat().st_mtime_ns,
+        "text_sha256": sha256,
+    }).encode('utf-8')
+    header += b" " * (-len(header) % 4)
+
+    path = index_path_for(text_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as out:
+        out.write(INDEX_MAGIC)
+        out.write(struct.pack('<QQQ', len(header), len(arrays[0]), len(arrays[3])))
+        out.write(header)
+        for values in arrays:
+            out.write(values.tobytes())
+    os.replace(tmp_path, path)
+    return len(arrays[0]), len(arrays[3])
+
+
+class SentenceIndex:
+    """Read-only, memory-mapped view of a table written by write_segment_index()."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"Not a segment table: {self.path}")
+        pos = len(INDEX_MAGIC)
+        header_len, paragraphs, sentences = struct.unpack_from('<QQQ', self._mmap, pos)
+        pos += 24
+        self.header = json.loads(self._mmap[pos:pos + header_len].decode('utf-8'))
+        pos += header_len
+        view = memoryview(self._mmap)
+        arrays = []
+        for count in (paragraphs, paragraphs, paragraphs + 1, sentences, sentences):
+            arrays.append(view[pos:pos + count * 4].cast('I'))
+            pos += count * 4
+        (self.paragraph_starts, self.paragraph_ends, self.first_sentence,
+         self.sentence_starts, self.sentence_ends) = arrays
+
+    def close(self):
+        for view in (self.paragraph_starts, self.paragraph_ends, self.first_sentence,
+                     self.sentence_starts, self.sentence_ends):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def paragraph_count(self):
+        return len(self.paragraph_starts)
+
+    @property
+    def sentence_count(self):
+        return len(self.sentence_starts)
+
+    def sentence(self, i):
+        """(start, end) byte span of sentence i."""
+        return self.sentence_starts[i], self.sentence_ends[i]
+
+    def paragraph(self, i):
+        """(start, end) byte span of paragraph i."""
+        return self.paragraph_starts[i], self.paragraph_ends[i]
+
+    def sentence_at(self, offset):
+        """Index of the sentence containing offset (or the last one before it), or None."""
+        i = bisect_right(self.sentence_starts, offset) - 1
+        return i if i >= 0 else None
+
+    def paragraph_at(self, offset):
+        """Index of the paragraph containing offset (or the last one before it), or None."""
+        i = bisect_right(self.paragraph_starts, offset) - 1
+        return i if i >= 0 else None
+
+    def paragraph_sentences(self, i):
+        """range of the sentence indices in paragraph i."""
+        return range(self.first_sentence[i], self.first_sentence[i + 1])
+
+    def sentences_between(self, start, end):
+        """range of the sentences overlapping the byte range [start, end)."""
+        return range(bisect_right(self.sentence_ends, start), bisect_left(self.sentence_starts, end))
+
+
+def is_stale(header, files, text_path):
+    """True if a stored table no longer matches the text."""
+    if header.get("version") != INDEX_VERSION:
+        return True
+    pointer = files.pointer(text_path)
+    if pointer is not None:
+        return header.get("text_sha256") != pointer.oid
+    stat = Path(text_path).stat()
+    if header.get("text_size") != stat.st_size:
+        return True
+    if header.get("text_mtime_ns") == stat.st_mtime_ns:
+        return False
+    # mtime moved (checkout, touch); only the content hash is authoritative
+    return header.get("text_sha256") != file_sha256(text_path)
+
+
+def load_sentence_index(corpus_root, text_path):
+    """Return a SentenceIndex for a text, or None if its table is missing or stale."""
+    path = index_path_for(text_path)
+    if not path.exists():
+        return None
+    index = SentenceIndex(path)
+    if is_stale(index.header, CorpusFiles(corpus_root), text_path):
+        index.close()
+        return None
+    return index
+
+
+def _segment_worker(corpus_root, text_id, text_path):
+    started = time.perf_counter()
+    try:
+        paragraphs, sentences = write_segment_index(corpus_root, text_path)
+    except LfsObjectMissing as e:
+        return text_id, None, str(e), 0.0
+    return text_id, (paragraphs, sentences), None, time.perf_counter() - started
+
+
+def iter_active_texts(corpus_root, text_ids=None):
+    """Yield (text_id, text_path) for active manifest texts, or the given ids."""
+    corpus_root = Path(corpus_root)
+    with open(corpus_root / "manifest.yaml", 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f)
+    for text_entry in manifest.get("texts", []):
+        if "file" not in text_entry:
+            continue
+        if text_ids and text_entry["id"] not in text_ids:
+            continue
+        if not text_ids and text_entry.get("status", "active") != "active":
+            continue
+        yield text_entry["id"], corpus_root / text_entry["file"]
+
+
+def build(corpus_root=".", text_ids=None, force=False, workers=None):
+    """Segment every requested text whose table is missing or stale; return the count."""
+    pending = []
+    for text_id, text_path in iter_active_texts(corpus_root, text_ids):
+        if not text_path.exists():
+            logger.warning(f"{text_id}: text not found: {text_path}")
+            continue
+        if not force:
+            index = load_sentence_index(corpus_root, text_path)
+            if index is not None:
+                index.close()
+                continue
+        pending.append((text_id, text_path))
+
+    if not pending:
+        logger.info("All segment tables are up to date")
+        return 0
+
+    built = 0
+    with span("segments.build", lines=len(pending)), \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_segment_worker, str(corpus_root), text_id, text_path)
+                   for text_id, text_path in pending]
+        for future in as_completed(futures):
+            text_id, counts, error, seconds = future.result()
+            if error:
+                logger.warning(f"{text_id}: skipped ({error})")
+                continue
+            built += 1
+            logger.info(f"{text_id}: {counts[0]} paragraphs, {counts[1]} sentences ({seconds:.2f}s)")
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build sentence and paragraph offset tables")
+    parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
+    parser.add_argument("--id", action="append", dest="ids", help="Only this text id (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    parser.add_argument("--check", action="store_true", help="Only report missing or stale tables")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    if args.check:
+        stale = 0
+        for text_id, text_path in iter_active_texts(args.corpus_root, args.ids):
+            if not text_path.exists():
+                continue
+            index = load_sentence_index(args.corpus_root, text_path)
+            if index is None:
+                logger.warning(f"{text_id}: segment table missing or stale")
+                stale += 1
+            else:
+                index.close()
+        sys.exit(1 if stale else 0)
+
+    with profile_session(args):
+        built = build(args.corpus_root, args.ids, args.force, args.workers)
+    logger.info(f"Segmented {built} texts")
+
+
+if __name__ == "__main__":
+    main()
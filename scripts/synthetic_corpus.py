@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic corpus for benchmarks.
+
+Most checkouts only have git-lfs pointers for sources/*.txt, so timings on
+the real corpus are not reproducible. This generates a corpus tree with the
+same shapes the scripts expect:
+
+- CCEL-like English volumes (sources/SYN-NN.txt) with anthology section
+  headers, bracketed footnote markers and footnote blocks, page numbers,
+  rule lines and a sprinkling of UTF-8-read-as-cp1252 mojibake
+- matching .meta.yaml files with text_info.sections
+- a Greek verse file in SBLGNT layout (sources/SYN-GREEK.txt)
+- an LXX_final_main.csv with <S>/<m> markup at the path consolidate-lxx.py reads
+- manifest.yaml listing all of the above
+
+The same seed and sizes always produce byte-identical files.
+
+Usage:
+    python scripts/synthetic_corpus.py /tmp/syn
+    python scripts/synthetic_corpus.py /tmp/syn --volumes 8 --volume-kb 2048 --lxx-verses 50000
+"""
+
+import argparse
+import random
+from pathlib import Path
+import logging
+
+import yaml
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LXX_CSV = Path("sources/LXX-Rahlfs-1935/11_end-users_files/MyBible/Bibles/LXX_final_main.csv")
+
+ENGLISH_WORDS = (
+    "the of and to in that is which he it not be as for they by his with this but "
+    "God Lord Christ church faith grace spirit father son truth law love flesh "
+    "blessed apostle brethren bishop heresy scripture wisdom glory salvation "
+    "therefore also unto them those whom things shall hath were said according"
+).split()
+
+GREEK_WORDS = (
+    "καὶ ὁ ἡ τὸ τοῦ τῆς τῷ ἐν εἰς αὐτοῦ αὐτῷ λέγει ἐστιν ἦν θεὸς κύριος "
+    "Ἰησοῦ Χριστοῦ λόγος ἀγάπη πνεῦμα ἄνθρωπος οὐρανοῦ γῆς ἐγένετο ἀπὸ "
+    "πρὸς ἐπὶ διὰ ὅτι δὲ γὰρ οὐκ μὴ ἀλλὰ ἵνα ὡς υἱὸς πατὴρ βασιλεία"
+).split()
+
+AUTHORS = [
+    ("Clement of Rome", "Western", "Rome"),
+    ("Ignatius", "Eastern", "Antioch"),
+    ("Polycarp", "Eastern", "Smyrna"),
+    ("Irenaeus", "Western", "Lyons"),
+    ("Tertullian", "Western", "Carthage"),
+    ("Origen", "Eastern", "Alexandria"),
+]
+
+WORK_KINDS = ["Epistle to the", "Treatise on the", "Homily on the", "Fragments of the"]
+WORK_SUBJECTS = ["Ephesians", "Resurrection", "Trinity", "Martyrs", "Prayer", "Smyrnaeans"]
+
+# UTF-8 text decoded as cp1252: what the real CCEL dumps contain
+MOJIBAKE = ["SmyrnÃ¦ans", "IrenÃ¦us", "â€œtruthâ€\x9d", "Godâ€™s", "â€”"]
+
+GREEK_BOOKS = ["Matt", "Mark", "Luke", "John", "Acts", "Rom"]
+
+
+def english_paragraph(rng, words):
+    sentence_words = [rng.choice(ENGLISH_WORDS) for _ in range(words)]
+    sentence_words[0] = sentence_words[0].capitalize()
+    if rng.random() < 0.05:
+        sentence_words[rng.randrange(words)] = rng.choice(MOJIBAKE)
+    text = " ".join(sentence_words) + "."
+    if rng.random() < 0.3:
+        text += f" [{rng.randint(1, 400)}]"
+    return text
+
+
+def generate_volume(rng, number, target_bytes):
+    """Return (text, sections) for one anthology volume of about target_bytes."""
+    lines = [
+        f"Synthetic Fathers, Vol. {number}",
+        "",
+        "=" * 60,
+        "",
+        "Introductory Note",
+        "",
+    ]
+    sections = []
+    section_count = max(2, target_bytes // 200_000)
+    per_section = target_bytes // section_count
+    page = 1
+
+    for s in range(section_count):
+        author, region, location = AUTHORS[(number + s) % len(AUTHORS)]
+        title = f"{WORK_KINDS[s % len(WORK_KINDS)]} {WORK_SUBJECTS[(number + s) % len(WORK_SUBJECTS)]}"
+        marker = f"The {title} of {author} ({number}.{s + 1})"
+        sections.append({
+            "author": author,
+            "title": title,
+            "start_marker": marker,
+            "composition_year": 90 + 20 * ((number + s) % 15),
+            "composition_uncertainty": ["low", "medium", "high"][s % 3],
+            "author_region": region,
+            "author_location": location,
+        })
+        lines.extend(["", marker, "", "-" * 40, ""])
+
+        written = 0
+        chapter = 1
+        while written < per_section:
+            if written and rng.random() < 0.05:
+                chapter += 1
+                lines.extend(["", f"Chapter {chapter}.", ""])
+            paragraph = english_paragraph(rng, rng.randint(40, 160))
+            lines.extend([paragraph, ""])
+            written += len(paragraph) + 1
+            if rng.random() < 0.1:
+                lines.extend([f"Page {page}", ""])
+                page += 1
+
+        footnotes = [
+            f"{n}. See {rng.choice(ENGLISH_WORDS)} {rng.randint(1, 30)}:{rng.randint(1, 40)}."
+            for n in range(1, rng.randint(5, 20))
+        ]
+        lines.extend(["", "Footnotes", ""] + footnotes + [""])
+
+    return "\n".join(lines) + "\n", sections
+
+
+def volume_metadata(number, sections):
+    authors = []
+    for section in sections:
+        if section["author"] not in authors:
+            authors.append(section["author"])
+    return {
+        "text_info": {
+            "id": f"syn-{number:02d}",
+            "title": f"Synthetic Fathers, Vol. {number}",
+            "author": "Various Early Church Fathers",
+            "authors": authors,
+            "series": "Synthetic Fathers",
+            "volume": number,
+            "is_anthology": True,
+            "sections": sections,
+        },
+        "publication": {"original_language": "English", "genre": "Patristic Theology"},
+        "technical": {"encoding": "UTF-8", "format": "Plain text", "line_endings": "Unix (LF)"},
+    }
+
+
+def _book_positions(books, verses):
+    """Spread verses over books in order; yield (book, index within the book)."""
+    previous, position = None, 0
+    for i in range(verses):
+        book = books[i * len(books) // verses]
+        position = position + 1 if book == previous else 0
+        previous = book
+        yield book, position
+
+
+def generate_greek(rng, verses):
+    lines = []
+    for book, position in _book_positions(GREEK_BOOKS, verses):
+        chapter, verse = 1 + position // 30, 1 + position % 30
+        words = [rng.choice(GREEK_WORDS) for _ in range(rng.randint(8, 30))]
+        lines.append(f"{book} {chapter}:{verse}\t{' '.join(words)}.")
+    return "\n".join(lines) + "\n"
+
+
+def generate_lxx_csv(rng, verses):
+    """Rows of book_id, chapter, verse, and words tagged like LXX_final_main.csv."""
+    book_ids = [10, 20, 30, 40, 50, 230, 290]
+    lines = []
+    for book_id, position in _book_positions(book_ids, verses):
+        chapter, verse = 1 + position // 25, 1 + position % 25
+        tagged = []
+        for _ in range(rng.randint(6, 24)):
+            word = rng.choice(GREEK_WORDS)
+            strong = rng.randint(1, 5624)
+            tagged.append(f"{word}<S>{strong}</S><m>V-PAI-3S</m><S>{strong + 1}</S>")
+        lines.append(f"{book_id}\t{chapter}\t{verse}\t{' '.join(tagged)}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(root, volumes=4, volume_kb=512, greek_verses=8000, lxx_verses=10000, seed=1):
+    """Write a synthetic corpus under root and return the manifest dict."""
+    root = Path(root)
+    sources = root / "sources"
+    sources.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    texts = []
+
+    for number in range(1, volumes + 1):
+        text, sections = generate_volume(rng, number, volume_kb * 1024)
+        stem = f"SYN-{number:02d}"
+        (sources / f"{stem}.txt").write_text(text, encoding='utf-8')
+        with open(sources / f"{stem}.meta.yaml", 'w', encoding='utf-8') as f:
+            yaml.dump(volume_metadata(number, sections), f,
+                      default_flow_style=False, sort_keys=False, allow_unicode=True)
+        texts.append({
+            "id": f"syn-{number:02d}",
+            "title": f"Synthetic Fathers, Vol. {number}",
+            "author": "Various Early Church Fathers",
+            "file": f"sources/{stem}.txt",
+            "metadata": f"sources/{stem}.meta.yaml",
+            "status": "active",
+        })
+
+    (sources / "SYN-GREEK.txt").write_text(generate_greek(rng, greek_verses), encoding='utf-8')
+    texts.append({
+        "id": "syn-greek",
+        "title": "Synthetic Greek Verses",
+        "author": "Multiple Biblical Authors",
+        "file": "sources/SYN-GREEK.txt",
+        "status": "reference",
+    })
+
+    csv_path = root / LXX_CSV
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    csv_path.write_text(generate_lxx_csv(rng, lxx_verses), encoding='utf-8')
+
+    manifest = {
+        "corpus": {"name": "Synthetic Corpus", "version": "0.0.0", "seed": seed},
+        "texts": texts,
+    }
+    with open(root / "manifest.yaml", 'w', encoding='utf-8') as f:
+        yaml.dump(manifest, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic corpus")
+    parser.add_argument("root", help="Directory to write the corpus into")
+    parser.add_argument("--volumes", type=int, default=4, help="Number of English anthology volumes")
+    parser.add_argument("--volume-kb", type=int, default=512, help="Approximate size of each volume")
+    parser.add_argument("--greek-verses", type=int, default=8000, help="Verses in the Greek verse file")
+    parser.add_argument("--lxx-verses", type=int, default=10000, help="Rows in the LXX CSV")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+
+    args = parser.parse_args()
+    manifest = generate_corpus(args.root, args.volumes, args.volume_kb,
+                               args.greek_verses, args.lxx_verses, args.seed)
+    logger.info(f"Wrote {len(manifest['texts'])} texts and the LXX CSV to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,94 +1,62 @@
 #!/usr/bin/env python3
 """
-Update manifest.yaml to include all Church Fathers volumes.
+Manifest entries and categories for all Church Fathers volumes.
+metadata_compiler.py adds the missing entries and applies the categories
+to manifest.yaml; running this script runs the compiler.
 """
 
-import yaml
-from pathlib import Path
-from datetime import date
-
-# Import the metadata from the generation script
 import sys
-sys.path.append(str(Path(__file__).parent))
-from generate_church_fathers_metadata import CHURCH_FATHERS_METADATA
-
-def update_manifest():
-    """Add all Church Fathers volumes to manifest."""
-    corpus_root = Path(__file__).parent.parent
-    manifest_path = corpus_root / "manifest.yaml"
-
-    # Load current manifest
-    with open(manifest_path, 'r', encoding='utf-8') as f:
-        manifest = yaml.safe_load(f)
-
-    # Update version and date
-    manifest['corpus']['version'] = "2.0.0"
-    manifest['corpus']['last_updated'] = str(date.today())
-
-    # Add Church Fathers volumes
-    for volume_id, info in CHURCH_FATHERS_METADATA.items():
-        volume_id_lower = volume_id.lower()
-
-        # Check if already exists
-        existing = any(text['id'] == volume_id_lower for text in manifest['texts'])
-        if existing:
-            print(f"  Skipping {volume_id} (already exists)")
-            continue
-
-        # Create text entry
-        text_entry = {
-            "id": volume_id_lower,
-            "title": info['title'],
-            "author": ", ".join(info['authors'][:3]) + (" et al." if len(info['authors']) > 3 else ""),
-            "period": info['period'],
-            "genre": "Patristic Collection",
-            "file": f"sources/{volume_id}.txt",
-            "metadata": f"sources/{volume_id}.meta.yaml",
-            "status": "active",
-            "added": str(date.today())
-        }
-
-        manifest['texts'].append(text_entry)
-        print(f"✓ Added {volume_id}")
-
-    # Update categories
-    if 'categories' not in manifest:
-        manifest['categories'] = {}
+from pathlib import Path
 
-    # Add all Church Fathers to patristic category
+# Import the metadata from the generation script (hyphenated file name,
+# so it cannot be imported by module name)
+import importlib.util
+_spec = importlib.util.spec_from_file_location(
+    "generate_church_fathers_metadata",
+    Path(__file__).parent / "generate-church-fathers-metadata.py",
+)
+_metadata_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_metadata_module)
+CHURCH_FATHERS_METADATA = _metadata_module.CHURCH_FATHERS_METADATA
+
+def text_entry(volume_id, info):
+    """Manifest entry for a volume; the compiler stamps `added`."""
+    return {
+        "id": volume_id.lower(),
+        "title": info['title'],
+        "author": ", ".join(info['authors'][:3]) + (" et al." if len(info['authors']) > 3 else ""),
+        "period": info['period'],
+        "genre": "Patristic Collection",
+        "file": f"sources/{volume_id}.txt",
+        "metadata": f"sources/{volume_id}.meta.yaml",
+        "status": "active"
+    }
+
+def church_fathers_categories(categories):
+    """Return the Church Fathers categories, given the manifest's current ones."""
     church_fathers_ids = [vid.lower() for vid in CHURCH_FATHERS_METADATA.keys()]
 
-    if 'patristic' not in manifest['categories']:
-        manifest['categories']['patristic'] = []
-
-    # Add new volumes to patristic category (avoid duplicates)
-    for cf_id in church_fathers_ids:
-        if cf_id not in manifest['categories']['patristic']:
-            manifest['categories']['patristic'].append(cf_id)
-
-    # Add series-specific categories
-    anf_ids = [vid.lower() for vid in CHURCH_FATHERS_METADATA.keys() if vid.startswith("ANF")]
-    npnf1_ids = [vid.lower() for vid in CHURCH_FATHERS_METADATA.keys() if vid.startswith("NPNF1")]
-    npnf2_ids = [vid.lower() for vid in CHURCH_FATHERS_METADATA.keys() if vid.startswith("NPNF2")]
-
-    manifest['categories']['ante-nicene'] = anf_ids
-    manifest['categories']['nicene-post-nicene-1'] = npnf1_ids
-    manifest['categories']['nicene-post-nicene-2'] = npnf2_ids
-
-    # Augustine-specific (NPNF1 volumes 1-8)
-    manifest['categories']['augustine'] = [f"npnf1-{str(i).zfill(2)}" for i in range(1, 9)] + ["augustine-confessions"]
-
-    # Chrysostom-specific (NPNF1 volumes 9-14)
-    manifest['categories']['chrysostom'] = [f"npnf1-{str(i).zfill(2)}" for i in range(9, 15)]
-
-    # Save updated manifest
-    with open(manifest_path, 'w', encoding='utf-8') as f:
-        yaml.dump(manifest, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
-
-    print(f"\n✅ Updated manifest.yaml successfully!")
-    print(f"   Version: {manifest['corpus']['version']}")
-    print(f"   Total texts: {len(manifest['texts'])}")
-    print(f"   Categories: {len(manifest['categories'])}")
+    # Add all Church Fathers to patristic category (avoid duplicates)
+    patristic = list(categories.get('patristic') or [])
+    patristic += [cf_id for cf_id in church_fathers_ids if cf_id not in patristic]
+
+    return {
+        'patristic': patristic,
+        # Series-specific categories
+        'ante-nicene': [vid for vid in church_fathers_ids if vid.startswith("anf")],
+        'nicene-post-nicene-1': [vid for vid in church_fathers_ids if vid.startswith("npnf1")],
+        'nicene-post-nicene-2': [vid for vid in church_fathers_ids if vid.startswith("npnf2")],
+        # Augustine-specific (NPNF1 volumes 1-8)
+        'augustine': [f"npnf1-{str(i).zfill(2)}" for i in range(1, 9)] + ["augustine-confessions"],
+        # Chrysostom-specific (NPNF1 volumes 9-14)
+        'chrysostom': [f"npnf1-{str(i).zfill(2)}" for i in range(9, 15)],
+    }
+
+def main():
+    """Compile all metadata files."""
+    sys.path.append(str(Path(__file__).parent))
+    from metadata_compiler import main as compile_metadata
+    compile_metadata()
 
 if __name__ == "__main__":
-    update_manifest()
+    main()
@@ -7,31 +7,44 @@ ensuring consistency and detecting issues.
 """
 
 import argparse
+import json
 import os
 import sys
-import yaml
 import hashlib
 from pathlib import Path
 import logging
 import re
 
+sys.path.append(str(Path(__file__).parent))
+from instrumentation import span, add_profile_arguments, profile_session
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class CorpusValidator:
-    def __init__(self, corpus_root):
+    def __init__(self, corpus_root, duplicates_path=None):
+        # Imported here so --help stays fast (these pull in yaml)
+        from corpus_files import CorpusFiles
+        from embedding_cache import DEFAULT_EXCLUSIONS
+        
         self.corpus_root = Path(corpus_root)
+        self.duplicates_path = Path(duplicates_path) if duplicates_path else self.corpus_root / DEFAULT_EXCLUSIONS
         self.sources_dir = self.corpus_root / "sources"
         self.manifest_path = self.corpus_root / "manifest.yaml"
+        self.files = CorpusFiles(corpus_root)
         self.errors = []
         self.warnings = []
+        self.text_stats = {}
     
     def load_manifest(self):
         """Load the corpus manifest."""
+        import yaml
+        
         try:
-            with open(self.manifest_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            with span("validate.load_manifest"):
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    return yaml.safe_load(f)
         except FileNotFoundError:
             self.errors.append(f"Manifest not found at {self.manifest_path}")
             return None
@@ -72,46 +85,56 @@ class CorpusValidator:
     
     def validate_text_file(self, file_path):
         """Validate a text file."""
+        from corpus_files import LfsObjectMissing
+        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            with span("validate.read_text") as s:
+                try:
+                    content = self.files.read_text(file_path)
+                except LfsObjectMissing as e:
+                    # A bare pointer says nothing about the text; don't validate it
+                    self.warnings.append(f"Content not checked: {e}")
+                    return None
+                s.add(bytes=len(content))
             
-            # Check encoding
-            try:
-                content.encode('utf-8')
-            except UnicodeEncodeError:
-                self.errors.append(f"Invalid UTF-8 encoding in {file_path}")
+            with span("validate.text_checks", bytes=len(content)):
+                # Check encoding
+                try:
+                    content.encode('utf-8')
+                except UnicodeEncodeError:
+                    self.errors.append(f"Invalid UTF-8 encoding in {file_path}")
             
-            # Check for common issues
-            if len(content.strip()) == 0:
-                self.warnings.append(f"Empty file: {file_path}")
+                # Check for common issues
+                if len(content.strip()) == 0:
+                    self.warnings.append(f"Empty file: {file_path}")
             
-            # Check for suspicious characters
-            if '\x00' in content:
-                self.errors.append(f"Null bytes found in {file_path}")
+                # Check for suspicious characters
+                if '\x00' in content:
+                    self.errors.append(f"Null bytes found in {file_path}")
             
-            # Check line endings consistency
-            lines = content.splitlines()
-            if content.endswith('\r\n'):
-                line_ending = 'CRLF'
-            elif content.endswith('\n'):
-                line_ending = 'LF'
-            elif content.endswith('\r'):
-                line_ending = 'CR'
-            else:
-                line_ending = 'Unknown'
+                # Check line endings consistency
+                lines = content.splitlines()
+                if content.endswith('\r\n'):
+                    line_ending = 'CRLF'
+                elif content.endswith('\n'):
+                    line_ending = 'LF'
+                elif content.endswith('\r'):
+                    line_ending = 'CR'
+                else:
+                    line_ending = 'Unknown'
             
-            # Check for mixed line endings
-            crlf_count = content.count('\r\n')
-            lf_count = content.count('\n') - crlf_count
-            cr_count = content.count('\r') - crlf_count
+                # Check for mixed line endings
+                crlf_count = content.count('\r\n')
+                lf_count = content.count('\n') - crlf_count
+                cr_count = content.count('\r') - crlf_count
             
-            if sum([bool(crlf_count), bool(lf_count), bool(cr_count)]) > 1:
-                self.warnings.append(f"Mixed line endings in {file_path}")
+                if sum([bool(crlf_count), bool(lf_count), bool(cr_count)]) > 1:
+                    self.warnings.append(f"Mixed line endings in {file_path}")
             
             # Basic text statistics
-            word_count = len(content.split())
-            char_count = len(content)
+            with span("validate.text_stats", bytes=len(content), lines=len(lines)):
+                word_count = len(content.split())
+                char_count = len(content)
             
             logger.info(f"{file_path}: {char_count} chars, {word_count} words, {len(lines)} lines")
             
@@ -128,35 +151,45 @@ class CorpusValidator:
     
     def validate_metadata_file(self, meta_path):
         """Validate a metadata file."""
-        try:
-            with open(meta_path, 'r', encoding='utf-8') as f:
-                metadata = yaml.safe_load(f)
-            
-            # Check required metadata fields
-            required_fields = ["text_info", "publication", "technical"]
-            
-            for field in required_fields:
-                if field not in metadata:
-                    self.warnings.append(f"Missing metadata section '{field}' in {meta_path}")
-            
-            # Validate text_info section
-            if "text_info" in metadata:
-                text_info = metadata["text_info"]
-                required_text_fields = ["id", "title", "author"]
-                
-                for field in required_text_fields:
-                    if field not in text_info:
-                        self.warnings.append(f"Missing text_info field '{field}' in {meta_path}")
-            
-            return metadata
-            
-        except yaml.YAMLError as e:
-            self.errors.append(f"Invalid YAML in metadata file {meta_path}: {e}")
-            return None
-        except Exception as e:
-            self.errors.append(f"Error reading metadata file {meta_path}: {e}")
-            return None
+        self.validate_metadata_files([meta_path])
+
+    def validate_metadata_files(self, meta_paths):
+        """Run all metadata lint rules over the files in one parallel pass."""
+        from metadata_lint import lint_metadata
+        
+        relative = [Path(os.path.relpath(meta_path, self.corpus_root)).as_posix() for meta_path in meta_paths]
+        with span("validate.lint_metadata"):
+            findings, _ = lint_metadata(self.corpus_root, relative)
+        for finding in findings:
+            message = f"{finding.message} in {self.corpus_root / finding.file}"
+            if finding.severity == "error":
+                self.errors.append(message)
+            elif finding.severity == "warning":
+                self.warnings.append(message)
+            else:
+                logger.debug(message)
     
+    def validate_duplicates(self, manifest):
+        """Report the near-duplicate share of each text from near_duplicates.py output."""
+        with open(self.duplicates_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        text_ids = {entry.get("id") for entry in manifest.get("texts", [])}
+        duplicated = {}
+        for cluster in result.get("clusters", []):
+            canonical = cluster["canonical"]["text_id"]
+            for member in cluster["duplicates"]:
+                duplicated.setdefault(member["text_id"], {}).setdefault(canonical, 0)
+                duplicated[member["text_id"]][canonical] += 1
+        for text_id, sources in sorted(duplicated.items()):
+            if text_id not in text_ids:
+                self.warnings.append(f"Near-duplicate list {self.duplicates_path} names unknown text {text_id}")
+                continue
+            count = sum(sources.values())
+            total = result.get("chunks_per_text", {}).get(text_id, 0)
+            others = ", ".join(f"{other} ({n})" for other, n in sorted(sources.items()))
+            self.warnings.append(f"{count} of {total} chunks in {text_id} are near-duplicates "
+                                 f"(excluded from embedding) of: {others}")
+
     def validate_corpus_integrity(self):
         """Perform comprehensive corpus validation."""
         logger.info("Starting corpus validation...")
@@ -168,31 +201,41 @@ class CorpusValidator:
             
             # Validate each text and its metadata
             if "texts" in manifest:
+                meta_paths = []
                 for text_entry in manifest["texts"]:
                     if "file" in text_entry:
                         file_path = self.corpus_root / text_entry["file"]
-                        self.validate_text_file(file_path)
+                        stats = self.validate_text_file(file_path)
+                        if stats:
+                            self.text_stats[text_entry.get("id", text_entry["file"])] = stats
                     
                     if "metadata" in text_entry:
                         meta_path = self.corpus_root / text_entry["metadata"]
-                        self.validate_metadata_file(meta_path)
+                        if meta_path.exists():
+                            meta_paths.append(meta_path)
+                self.validate_metadata_files(meta_paths)
+
+            if self.duplicates_path.exists():
+                with span("validate.duplicates"):
+                    self.validate_duplicates(manifest)
         
         # Check for orphaned files
-        if self.sources_dir.exists():
-            for file_path in self.sources_dir.iterdir():
-                if file_path.is_file() and file_path.suffix == '.txt':
-                    # Check if this file is referenced in manifest
-                    relative_path = file_path.relative_to(self.corpus_root)
-                    found_in_manifest = False
+        with span("validate.orphan_scan"):
+            if self.sources_dir.exists():
+                for file_path in self.sources_dir.iterdir():
+                    if file_path.is_file() and file_path.suffix == '.txt':
+                        # Check if this file is referenced in manifest
+                        relative_path = file_path.relative_to(self.corpus_root)
+                        found_in_manifest = False
                     
-                    if manifest and "texts" in manifest:
-                        for text_entry in manifest["texts"]:
-                            if text_entry.get("file") == str(relative_path):
-                                found_in_manifest = True
-                                break
+                        if manifest and "texts" in manifest:
+                            for text_entry in manifest["texts"]:
+                                if text_entry.get("file") == str(relative_path):
+                                    found_in_manifest = True
+                                    break
                     
-                    if not found_in_manifest:
-                        self.warnings.append(f"Orphaned text file: {file_path}")
+                        if not found_in_manifest:
+                            self.warnings.append(f"Orphaned text file: {file_path}")
         
         # Report results
         logger.info(f"Validation complete. Errors: {len(self.errors)}, Warnings: {len(self.warnings)}")
@@ -211,6 +254,8 @@ class CorpusValidator:
     
     def generate_report(self, output_file=None):
         """Generate a validation report."""
+        import yaml
+        
         report = {
             "validation_summary": {
                 "errors": len(self.errors),
@@ -218,7 +263,8 @@ class CorpusValidator:
                 "status": "PASS" if len(self.errors) == 0 else "FAIL"
             },
             "errors": self.errors,
-            "warnings": self.warnings
+            "warnings": self.warnings,
+            "text_statistics": self.text_stats
         }
         
         if output_file:
@@ -233,19 +279,22 @@ def main():
     parser.add_argument("--corpus-root", default=".", help="Root directory of the corpus")
     parser.add_argument("--report", help="Save validation report to file")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+    parser.add_argument("--duplicates", help="near_duplicates.py output to report (default: build/near_duplicates.json if present)")
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
     
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
-    validator = CorpusValidator(args.corpus_root)
-    success = validator.validate_corpus_integrity()
-    
-    if args.report:
-        validator.generate_report(args.report)
-    elif args.verbose:
-        validator.generate_report()
+    validator = CorpusValidator(args.corpus_root, args.duplicates)
+    with profile_session(args):
+        success = validator.validate_corpus_integrity()
+        
+        if args.report:
+            validator.generate_report(args.report)
+        elif args.verbose:
+            validator.generate_report()
     
     sys.exit(0 if success else 1)
 